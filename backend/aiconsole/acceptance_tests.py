@@ -1,9 +1,11 @@
 from pathlib import Path
 
 import pytest
+import pytest_asyncio
 from fastapi import BackgroundTasks
 
 from aiconsole.api.endpoints.projects.services import ProjectDirectory
+from aiconsole.core.code_running.interpreter_pool import interpreter_pool
 from aiconsole.core.gpt.check_key import cached_good_keys, check_key
 from aiconsole.core.project.project import choose_project
 from aiconsole.core.recent_projects.recent_projects import get_recent_project
@@ -15,9 +17,13 @@ def background_tasks() -> BackgroundTasks:
     return BackgroundTasks()
 
 
-@pytest.fixture
-def project_directory() -> ProjectDirectory:
-    return ProjectDirectory()
+@pytest_asyncio.fixture
+async def project_directory():
+    yield ProjectDirectory()
+
+    # Stops the interpreters the opened project has started, before the event loop of the test is closed
+    interpreter_pool.close()
+    await interpreter_pool.wait_closed()
 
 
 @pytest.mark.asyncio
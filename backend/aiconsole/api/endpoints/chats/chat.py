@@ -18,9 +18,14 @@ from fastapi import APIRouter, Response, status
 from fastapi.responses import JSONResponse
 from send2trash import send2trash
 
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_headlines_index import get_chat_headlines_index
+from aiconsole.core.chat.chat_journal import get_chat_journal
+from aiconsole.core.chat.chat_mutation_buffer import chat_mutation_buffer
 from aiconsole.core.chat.load_chat_history import load_chat_history
 from aiconsole.core.chat.save_chat_history import save_chat_history
 from aiconsole.core.chat.types import Chat
+from aiconsole.core.code_running.run_code import code_interpreter_sessions
 from aiconsole.core.project.paths import get_history_directory
 
 router = APIRouter()
@@ -29,8 +34,18 @@ router = APIRouter()
 @router.delete("/{chat_id}")
 async def delete_history(chat_id: str):
     file_path = get_history_directory() / f"{chat_id}.json"
-    if file_path.exists():
-        send2trash(file_path)
+    journal = get_chat_journal(chat_id)
+    if file_path.exists() or journal.path.exists():
+        if journal.path.exists():
+            # Fold the journal into the snapshot, so a chat restored from the trash has all of its messages
+            save_chat_history(await load_chat_history(chat_id))
+        journal.delete()
+        if file_path.exists():
+            send2trash(file_path)
+        chat_cache.invalidate(chat_id)
+        chat_mutation_buffer.clear(chat_id)
+        get_chat_headlines_index().remove(chat_id)
+        code_interpreter_sessions.close(chat_id)
         return Response(
             status_code=status.HTTP_200_OK,
             content="Chat history deleted successfully",
@@ -14,33 +14,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import logging
-
 from aiconsole.api.endpoints.chats.chat import router
-from aiconsole.core.chat.list_possible_historic_chat_ids import (
-    list_possible_historic_chat_ids,
-)
-from aiconsole.core.chat.load_chat_history import load_chat_history
-from aiconsole.core.chat.types import ChatHeadline
-
-_log = logging.getLogger(__name__)
+from aiconsole.core.chat.chat_headlines_index import get_chat_headlines_index
 
 
 @router.get("/")
-async def get_history_headlines():
-    headlines = []
-
-    for chat_id in list_possible_historic_chat_ids():
-        try:
-            chat = await load_chat_history(chat_id)
-
-            if chat:
-                headlines.append(
-                    ChatHeadline(id=chat_id, name=chat.name, last_modified=chat.last_modified).model_dump()
-                )
-
-        except Exception as e:
-            _log.exception(e)
-            _log.error(f"Failed to get history: {e} {chat_id}")
-
-    return headlines
+async def get_history_headlines(offset: int = 0, limit: int | None = None):
+    return [headline.model_dump() for headline in get_chat_headlines_index().headlines(offset=offset, limit=limit)]
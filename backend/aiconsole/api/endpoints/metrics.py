@@ -0,0 +1,44 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fastapi import APIRouter
+
+from aiconsole.api.websockets import connection_manager
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.code_running.interpreter_pool import interpreter_pool
+from aiconsole.core.code_running.run_code import code_interpreter_sessions
+from aiconsole.core.gpt.request_metrics import gpt_request_metrics
+from aiconsole.core.gpt.request_scheduler import gpt_request_scheduler
+from aiconsole.core.gpt.response_cache import gpt_response_cache
+
+router = APIRouter()
+
+
+@router.get("/api/metrics")
+async def get_metrics():
+    return {
+        "chat_cache": chat_cache.stats(),
+        "websockets": connection_manager.stats(),
+        "gpt_cache": gpt_response_cache.stats(),
+        "gpt_scheduler": gpt_request_scheduler.stats(),
+        "code_interpreters": code_interpreter_sessions.stats(),
+        "code_interpreter_pool": interpreter_pool.stats(),
+    }
+
+
+@router.get("/api/metrics/gpt")
+async def get_gpt_metrics(recent: int = 20):
+    return gpt_request_metrics.stats(recent=recent)
@@ -1,12 +1,18 @@
 import pytest
+import pytest_asyncio
 from fastapi import BackgroundTasks
 
 from aiconsole.api.endpoints.projects.services import ProjectDirectory
+from aiconsole.core.code_running.interpreter_pool import interpreter_pool
 
 
-@pytest.fixture
-def project_directory() -> ProjectDirectory:
-    return ProjectDirectory()
+@pytest_asyncio.fixture
+async def project_directory():
+    yield ProjectDirectory()
+
+    # Stops the interpreters the opened project has started, before the event loop of the test is closed
+    interpreter_pool.close()
+    await interpreter_pool.wait_closed()
 
 
 @pytest.mark.asyncio
@@ -21,6 +21,9 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from aiconsole.api.websockets import connection_manager
 from aiconsole.api.websockets.handle_incoming_message import handle_incoming_message
+from aiconsole.api.websockets.incoming_message_dispatcher import (
+    IncomingMessageDispatcher,
+)
 from aiconsole.api.websockets.server_messages import (
     DebugJSONServerMessage,
     ErrorServerMessage,
@@ -38,18 +41,26 @@ async def websocket_endpoint(websocket: WebSocket):
     connection = await connection_manager.connect(websocket)
     await project.send_project_init(connection)
 
+    async def handle(json_data: dict):
+        try:
+            await handle_incoming_message(connection, json_data)
+        except Exception as e:
+            await ErrorServerMessage(
+                error=f"Error handling message: {e} type={e.__class__.__name__}"
+            ).send_to_connection(connection)
+            _log.exception(e)
+            _log.error(f"Error handling message: {e}")
+
+    # Long running messages (e.g. processing a chat) must not block the messages of other chats
+    dispatcher = IncomingMessageDispatcher(handle)
+
     try:
         while True:
             _log.debug("Waiting for message")
             json_data = await websocket.receive_json()
             _log.debug(f"Received message: {json_data}")
-            try:
-                await handle_incoming_message(connection, json_data)
-            except Exception as e:
-                await ErrorServerMessage(
-                    error=f"Error handling message: {e} type={e.__class__.__name__}"
-                ).send_to_connection(connection)
-                _log.exception(e)
-                _log.error(f"Error handling message: {e}")
+            dispatcher.dispatch(json_data)
     except WebSocketDisconnect:
         connection_manager.disconnect(connection)
+    finally:
+        await dispatcher.cancel()
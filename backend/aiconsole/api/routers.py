@@ -23,6 +23,7 @@ from aiconsole.api.endpoints import (
     commands_history,
     image,
     materials,
+    metrics,
     ping,
     profile,
     project_settings,
@@ -33,6 +34,7 @@ from aiconsole.api.endpoints import (
 app_router = APIRouter()
 
 app_router.include_router(ping.router)
+app_router.include_router(metrics.router)
 app_router.include_router(image.router)
 app_router.include_router(check_key.router)
 app_router.include_router(profile.router, tags=["Profile"])
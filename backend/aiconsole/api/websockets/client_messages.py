@@ -48,6 +48,8 @@ class ReleaseLockClientMessage(BaseClientMessage):
 
 class OpenChatClientMessage(BaseClientMessage):
     chat_id: str
+    # mutation_seq of the copy of the chat the client already has, if any
+    from_seq: int | None = None
 
 
 class CloseChatClientMessage(BaseClientMessage):
@@ -20,16 +20,22 @@ Connection manager for websockets. Keeps track of all active connections
 
 """
 
+import asyncio
 import logging
 from dataclasses import dataclass
-from uuid import uuid4
+from typing import Iterable
 
 from fastapi import WebSocket
 
 from aiconsole.api.websockets.server_messages import BaseServerMessage
+from aiconsole.consts import (
+    WEBSOCKET_SEND_QUEUE_OVERFLOW_POLICY,
+    WEBSOCKET_SEND_QUEUE_SIZE,
+)
 
 _log = logging.getLogger(__name__)
 _active_connections: list["AICConnection"] = []
+_overflows = 0
 
 
 @dataclass(frozen=True)
@@ -39,15 +45,71 @@ class AcquiredLock:
 
 
 class AICConnection:
+    """
+    Messages are not written to the websocket by the sender, but put on a bounded queue drained by a writer task
+    owned by the connection, so a slow client does not slow down the producer or the other clients.
+    """
+
     _websocket: WebSocket
-    open_chats_ids: set[str] = set()
-    acquired_locks: list[AcquiredLock] = []
 
     def __init__(self, websocket: WebSocket):
         self._websocket = websocket
+        self.open_chats_ids: set[str] = set()
+        self.acquired_locks: list[AcquiredLock] = []
+
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=WEBSOCKET_SEND_QUEUE_SIZE)
+        self._closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
 
     async def send(self, msg: BaseServerMessage):
-        await self._websocket.send_json({"type": msg.get_type(), **msg.model_dump(mode="json")})
+        await self.send_encoded(msg.encode())
+
+    async def send_encoded(self, text: str):
+        if self._closed:
+            return
+
+        if WEBSOCKET_SEND_QUEUE_OVERFLOW_POLICY == "block":
+            # Backpressure, the producer waits for this client to catch up
+            await self._queue.put(text)
+        else:
+            try:
+                self._queue.put_nowait(text)
+            except asyncio.QueueFull:
+                await self._overflow()
+                return
+
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def close(self):
+        self._closed = True
+        self._writer.cancel()
+
+    async def _overflow(self):
+        global _overflows
+        _overflows += 1
+
+        # The client reconnects and reopens its chat from the last seq it has seen, which resyncs it
+        _log.warning(f"Send queue of a websocket connection is full ({self._queue.maxsize}), disconnecting it")
+        self.close()
+        try:
+            await self._websocket.close(code=1013)  # Try Again Later
+        except Exception as e:
+            _log.debug(f"Failed to close websocket: {e}")
+
+    async def _write_loop(self):
+        while True:
+            text = await self._queue.get()
+            try:
+                await self._websocket.send_text(text)
+            except Exception as e:
+                _log.info(f"Stopped writing to websocket: {e}")
+                self._closed = True
+                return
 
 
 async def connect(websocket: WebSocket):
@@ -59,21 +121,49 @@ async def connect(websocket: WebSocket):
 
 
 def disconnect(connection: AICConnection):
+    connection.close()
     _active_connections.remove(connection)
     _log.info("Disconnected")
 
 
+def stats() -> dict:
+    depths = [connection.queue_depth for connection in _active_connections]
+
+    return {
+        "connections": len(_active_connections),
+        "queue_size": WEBSOCKET_SEND_QUEUE_SIZE,
+        "overflow_policy": WEBSOCKET_SEND_QUEUE_OVERFLOW_POLICY,
+        "queue_depths": depths,
+        "max_queue_depth": max((connection.max_queue_depth for connection in _active_connections), default=0),
+        "overflows": _overflows,
+    }
+
+
 async def send_message_to_chat(
     chat_id: str, msg: BaseServerMessage, source_connection_to_ommit: AICConnection | None = None
 ):
     # _log.debug(f"Sending message to {chat_id}: {msg}")
-    for connection in _active_connections:
-        if chat_id in connection.open_chats_ids and connection != source_connection_to_ommit:
-            await connection.send(msg)
+    await _fan_out(
+        msg,
+        (
+            connection
+            for connection in _active_connections
+            if chat_id in connection.open_chats_ids and connection != source_connection_to_ommit
+        ),
+    )
 
 
 async def send_message_to_all(msg: BaseServerMessage, source_connection_to_ommit: AICConnection | None = None):
     # _log.debug(f"Sending message to all: {msg}")
-    for connection in _active_connections:
-        if connection != source_connection_to_ommit:
-            await connection.send(msg)
+    await _fan_out(msg, (connection for connection in _active_connections if connection != source_connection_to_ommit))
+
+
+async def _fan_out(msg: BaseServerMessage, connections: Iterable[AICConnection]):
+    # Encoded lazily, a message without recipients is never serialised
+    text: str | None = None
+
+    for connection in list(connections):
+        if text is None:
+            text = msg.encode()
+
+        await connection.send_encoded(text)
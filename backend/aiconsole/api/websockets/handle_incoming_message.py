@@ -30,7 +30,10 @@ from aiconsole.api.websockets.client_messages import (
     ReleaseLockClientMessage,
 )
 from aiconsole.api.websockets.connection_manager import AcquiredLock, AICConnection
-from aiconsole.api.websockets.server_messages import ChatOpenedServerMessage
+from aiconsole.api.websockets.server_messages import (
+    ChatCaughtUpServerMessage,
+    ChatOpenedServerMessage,
+)
 from aiconsole.core.assets.agents.agent import Agent
 from aiconsole.core.assets.asset import AssetLocation
 from aiconsole.core.assets.materials.content_evaluation_context import (
@@ -38,6 +41,7 @@ from aiconsole.core.assets.materials.content_evaluation_context import (
 )
 from aiconsole.core.assets.materials.material import Material
 from aiconsole.core.assets.materials.rendered_material import RenderedMaterial
+from aiconsole.core.chat.chat_mutation_buffer import chat_mutation_buffer
 from aiconsole.core.chat.execution_modes.execution_mode import (
     AcceptCodeContext,
     ProcessChatContext,
@@ -45,7 +49,13 @@ from aiconsole.core.chat.execution_modes.execution_mode import (
 from aiconsole.core.chat.execution_modes.import_and_validate_execution_mode import (
     import_and_validate_execution_mode,
 )
-from aiconsole.core.chat.locking import DefaultChatMutator, acquire_lock, release_lock
+from aiconsole.core.chat.locking import (
+    DefaultChatMutator,
+    acquire_lock,
+    flush_chat_mutations,
+    get_loaded_chat,
+    release_lock,
+)
 from aiconsole.core.chat.types import AICMessageGroup, Chat
 from aiconsole.core.gpt.consts import GPTMode
 from aiconsole.core.project import project
@@ -128,6 +138,12 @@ async def _handle_release_lock_ws_message(connection: AICConnection, message: Re
 async def _handle_open_chat_ws_message(connection: AICConnection, message: OpenChatClientMessage):
     temporary_request_id = str(uuid4())
 
+    # Neither the snapshot nor the mutations to catch up with may miss a streamed mutation that is still held back
+    await flush_chat_mutations(message.chat_id)
+
+    if message.from_seq is not None and await _catch_up(connection, message.chat_id, message.from_seq):
+        return
+
     try:
         chat = await acquire_lock(
             chat_id=message.chat_id,
@@ -137,6 +153,7 @@ async def _handle_open_chat_ws_message(connection: AICConnection, message: OpenC
 
         connection.open_chats_ids.add(message.chat_id)
 
+        # Nothing to catch up from or the buffer has been overrun, send the whole chat
         await ChatOpenedServerMessage(
             chat=chat,
         ).send_to_connection(connection)
@@ -144,6 +161,34 @@ async def _handle_open_chat_ws_message(connection: AICConnection, message: OpenC
         await release_lock(chat_id=message.chat_id, request_id=temporary_request_id)
 
 
+async def _catch_up(connection: AICConnection, chat_id: str, from_seq: int) -> bool:
+    """
+    Send a reopening client only the mutations it has missed. The chat is not locked, as it is usually reopened
+    while it is streaming. False if the whole chat has to be sent instead.
+    """
+    chat = get_loaded_chat(chat_id)
+
+    if chat is None:
+        return False
+
+    missed_mutations = chat_mutation_buffer.since(chat_id, from_seq, chat.mutation_seq)
+
+    if missed_mutations is None:
+        return False
+
+    # No awaits from here until the message is queued, so later mutations are sent to this connection after it
+    connection.open_chats_ids.add(chat_id)
+
+    await ChatCaughtUpServerMessage(
+        chat_id=chat_id,
+        lock_id=chat.lock_id,
+        mutation_seq=chat.mutation_seq,
+        mutations=missed_mutations,
+    ).send_to_connection(connection)
+
+    return True
+
+
 async def _handle_close_chat_ws_message(connection: AICConnection, message: CloseChatClientMessage):
     connection.open_chats_ids.remove(message.chat_id)
 
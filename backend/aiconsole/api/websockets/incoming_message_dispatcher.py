@@ -0,0 +1,89 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Dispatches incoming websocket messages of a connection to tasks, so a long running message (e.g. processing a chat)
+does not hold up the messages of other chats.
+
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiconsole.consts import WEBSOCKET_MAX_CONCURRENT_MESSAGES
+
+_log = logging.getLogger(__name__)
+
+
+class IncomingMessageDispatcher:
+    """
+    Messages of the same chat are handled one after another in the order they came in, messages of different chats
+    run concurrently, at most max_concurrent at a time.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[dict], Awaitable[Any]],
+        max_concurrent: int = WEBSOCKET_MAX_CONCURRENT_MESSAGES,
+    ):
+        self._handle = handle
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: set[asyncio.Task] = set()
+        # Last task dispatched for each chat, the next message of that chat waits for it
+        self._tails: dict[str | None, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def dispatch(self, json: dict):
+        chat_id = json.get("chat_id")
+
+        task = asyncio.create_task(self._run(self._tails.get(chat_id), json))
+        self._tasks.add(task)
+        self._tails[chat_id] = task
+
+        task.add_done_callback(lambda task: self._on_done(chat_id, task))
+
+    async def cancel(self):
+        """
+        Cancel all handled and waiting messages, e.g. when the connection is gone.
+        """
+        tasks = list(self._tasks)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, previous: asyncio.Task | None, json: dict):
+        if previous is not None:
+            # Failure of the previous message is already reported by its own task
+            await asyncio.wait([previous])
+
+        async with self._semaphore:
+            await self._handle(json)
+
+    def _on_done(self, chat_id: str | None, task: asyncio.Task):
+        self._tasks.discard(task)
+
+        if self._tails.get(chat_id) is task:
+            del self._tails[chat_id]
+
+        if not task.cancelled() and task.exception() is not None:
+            _log.error(f"Unhandled error in incoming message task: {task.exception()}")
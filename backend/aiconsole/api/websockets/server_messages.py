@@ -14,8 +14,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import typing
 
+from aiconsole.core.chat.chat_mutation_buffer import SequencedChatMutation
 from aiconsole.core.chat.chat_mutations import ChatMutation
 from aiconsole.core.chat.types import Chat
 
@@ -26,6 +28,21 @@ from pydantic import BaseModel
 
 from aiconsole.core.assets.asset import AssetType
 
+try:
+    import orjson
+
+    def _dumps(data: dict) -> str:
+        try:
+            return orjson.dumps(data).decode()
+        except TypeError:
+            # Values orjson does not support, e.g. integers wider than 64 bits
+            return json.dumps(data, separators=(",", ":"))
+
+except ImportError:
+
+    def _dumps(data: dict) -> str:
+        return json.dumps(data, separators=(",", ":"))
+
 
 class BaseServerMessage(BaseModel):
     def get_type(self):
@@ -48,6 +65,12 @@ class BaseServerMessage(BaseModel):
         # Don't include None values, call to super to avoid recursion
         return {k: v for k, v in super().model_dump(**kwargs).items() if v is not None}
 
+    def encode(self) -> str:
+        """
+        Wire format of the message, computed once and sent as is to every recipient.
+        """
+        return _dumps({"type": self.get_type(), **self.model_dump(mode="json")})
+
 
 class NotificationServerMessage(BaseServerMessage):
     title: str
@@ -95,6 +118,8 @@ class NotifyAboutChatMutationServerMessage(BaseServerMessage):
     request_id: str
     chat_id: str
     mutation: ChatMutation
+    # mutation_seq of the chat once this mutation is applied, lock mutations carry the current one
+    seq: int | None = None
 
     def model_dump(self, **kwargs):
         # include type of mutation in the dump of "mutation"
@@ -104,5 +129,26 @@ class NotifyAboutChatMutationServerMessage(BaseServerMessage):
         }
 
 
+class ChatMutationAcknowledgedServerMessage(BaseServerMessage):
+    """
+    Sent to the connection a mutation came from instead of the mutation itself, with the seq it was given.
+    """
+
+    request_id: str
+    chat_id: str
+    seq: int
+
+
 class ChatOpenedServerMessage(BaseServerMessage):
     chat: Chat
+
+
+class ChatCaughtUpServerMessage(BaseServerMessage):
+    """
+    Response to opening a chat from a known seq, contains only the mutations the client has missed.
+    """
+
+    chat_id: str
+    lock_id: str | None = None
+    mutation_seq: int
+    mutations: list[SequencedChatMutation]
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from aiconsole.api.websockets import connection_manager
+from aiconsole.api.websockets.client_messages import OpenChatClientMessage
+from aiconsole.api.websockets.handle_incoming_message import (
+    _handle_open_chat_ws_message,
+)
+from aiconsole.core.chat import locking
+from aiconsole.core.chat.chat_mutations import CreateMessageGroupMutation
+from aiconsole.core.chat.types import Chat
+from aiconsole.core.project import project
+
+
+class _WebSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+
+@pytest.mark.asyncio
+async def test_should_acknowledge_mutations_and_catch_up_while_locked(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(project, "_project_initialized", True)
+    monkeypatch.setattr(connection_manager, "_active_connections", [])
+    monkeypatch.setattr(locking, "chats", {})
+
+    sender_websocket, reopening_websocket = _WebSocket(), _WebSocket()
+    sender = await connection_manager.connect(sender_websocket)  # type: ignore
+    reopening = await connection_manager.connect(reopening_websocket)  # type: ignore
+
+    locking.chats["chat"] = Chat(
+        id="chat", name="", last_modified=datetime.now(), message_groups=[], lock_id="request"
+    )
+    mutator = locking.DefaultChatMutator(chat_id="chat", request_id="request", connection=sender)
+    await mutator.mutate(
+        CreateMessageGroupMutation(
+            message_group_id="g",
+            agent_id="assistant",
+            username="",
+            email="",
+            role="assistant",
+            task="",
+            materials_ids=[],
+            analysis="",
+        )
+    )
+
+    # Still locked, as it would be while streaming
+    await _handle_open_chat_ws_message(reopening, OpenChatClientMessage(chat_id="chat", from_seq=0))
+    await asyncio.sleep(0.01)
+
+    assert sender_websocket.sent == [
+        {"type": "ChatMutationAcknowledgedServerMessage", "request_id": "request", "chat_id": "chat", "seq": 1}
+    ]
+    assert reopening_websocket.sent[0]["type"] == "ChatCaughtUpServerMessage"
+    assert reopening_websocket.sent[0]["lock_id"] == "request"
+    assert [mutation["seq"] for mutation in reopening_websocket.sent[0]["mutations"]] == [1]
+
+    locking.get_chat_journal("chat").delete()
+    locking.chat_mutation_buffer.clear("chat")
+    connection_manager.disconnect(sender)
+    connection_manager.disconnect(reopening)
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from aiconsole.api.websockets import connection_manager
+from aiconsole.api.websockets.server_messages import DebugJSONServerMessage
+
+
+class _SlowWebSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_slow_connection_should_not_stall_others(monkeypatch):
+    monkeypatch.setattr(connection_manager, "_active_connections", [])
+
+    slow_websocket = _SlowWebSocket(delay=10)
+    fast_websocket = _SlowWebSocket(delay=0)
+    slow = await connection_manager.connect(slow_websocket)  # type: ignore
+    fast = await connection_manager.connect(fast_websocket)  # type: ignore
+
+    for i in range(10):
+        message = DebugJSONServerMessage(message="", object={})
+        await asyncio.wait_for(connection_manager.send_message_to_all(message), 1)
+
+    await asyncio.sleep(0.01)
+
+    assert len(fast_websocket.sent) == 10
+    assert slow.queue_depth == 9
+    assert slow.open_chats_ids is not fast.open_chats_ids
+
+    connection_manager.disconnect(slow)
+    connection_manager.disconnect(fast)
+
+
+@pytest.mark.asyncio
+async def test_should_disconnect_connection_with_full_queue(monkeypatch):
+    monkeypatch.setattr(connection_manager, "_active_connections", [])
+
+    websocket = _SlowWebSocket(delay=10)
+    connection = await connection_manager.connect(websocket)  # type: ignore
+    connection._queue = asyncio.Queue(maxsize=2)
+
+    for i in range(4):
+        await connection.send(DebugJSONServerMessage(message="", object={}))
+
+    assert websocket.closed_with == 1013
+    assert connection_manager.stats()["overflows"] >= 1
+
+    connection_manager.disconnect(connection)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from aiconsole.api.websockets import connection_manager, server_messages
+from aiconsole.api.websockets.server_messages import (
+    DebugJSONServerMessage,
+    NotifyAboutChatMutationServerMessage,
+)
+from aiconsole.core.chat.chat_mutations import AppendToContentMessageMutation
+
+MESSAGES = 5
+
+
+class _FakeWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        pass
+
+
+def _message() -> NotifyAboutChatMutationServerMessage:
+    return NotifyAboutChatMutationServerMessage(
+        request_id="request",
+        chat_id="chat",
+        mutation=AppendToContentMessageMutation(message_id="message", content_delta="x" * 20_000),
+        seq=1,
+    )
+
+
+async def _connect(subscribers: int) -> list[connection_manager.AICConnection]:
+    connections = [await connection_manager.connect(_FakeWebSocket()) for _ in range(subscribers)]  # type: ignore
+
+    for connection in connections:
+        connection.open_chats_ids.add("chat")
+
+    return connections
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("subscribers", [1, 10, 100])
+async def test_should_encode_message_once_regardless_of_subscribers(monkeypatch, subscribers: int):
+    monkeypatch.setattr(connection_manager, "_active_connections", [])
+    connections = await _connect(subscribers)
+
+    dumps = server_messages._dumps
+    encoded = 0
+
+    def counting_dumps(data: dict) -> str:
+        nonlocal encoded
+        encoded += 1
+        return dumps(data)
+
+    monkeypatch.setattr(server_messages, "_dumps", counting_dumps)
+
+    for _ in range(MESSAGES):
+        message = _message()
+        for connection in connections:
+            await connection.send(message)
+
+    per_connection_encoded = encoded
+
+    for _ in range(MESSAGES):
+        await _message().send_to_chat("chat")
+
+    assert per_connection_encoded == MESSAGES * subscribers
+    assert encoded - per_connection_encoded == MESSAGES
+
+    for connection in connections:
+        connection_manager.disconnect(connection)
+
+
+def test_should_encode_integers_wider_than_64_bits():
+    message = DebugJSONServerMessage(message="", object={"value": 2**70})
+
+    assert json.loads(message.encode())["object"]["value"] == 2**70
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from aiconsole.api.websockets.incoming_message_dispatcher import (
+    IncomingMessageDispatcher,
+)
+
+
+@pytest.mark.asyncio
+async def test_should_handle_chats_concurrently_and_each_chat_in_order():
+    handled: list[str] = []
+    release_long = asyncio.Event()
+
+    async def handle(json: dict):
+        if json["type"] == "long":
+            await release_long.wait()
+        handled.append(f"{json['chat_id']}:{json['type']}")
+
+    dispatcher = IncomingMessageDispatcher(handle)
+
+    dispatcher.dispatch({"chat_id": "a", "type": "long"})
+    dispatcher.dispatch({"chat_id": "a", "type": "after_long"})
+    dispatcher.dispatch({"chat_id": "b", "type": "short"})
+
+    await asyncio.sleep(0.01)
+    assert handled == ["b:short"]
+
+    release_long.set()
+    await asyncio.sleep(0.01)
+
+    assert handled == ["b:short", "a:long", "a:after_long"]
+    assert dispatcher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_should_cancel_pending_messages():
+    cancelled = asyncio.Event()
+
+    async def handle(json: dict):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    dispatcher = IncomingMessageDispatcher(handle, max_concurrent=1)
+
+    dispatcher.dispatch({"chat_id": "a"})
+    dispatcher.dispatch({"chat_id": "b"})
+    await asyncio.sleep(0.01)
+
+    await dispatcher.cancel()
+
+    assert cancelled.is_set()
+    assert dispatcher.pending == 0
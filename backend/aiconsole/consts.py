@@ -13,7 +13,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
 from pathlib import Path
+from typing import Literal
 
 # this is a path to the root of the project - usually the installed one
 # this is pointing to the backend/aiconsole directory
@@ -35,7 +37,92 @@ DIR_WITH_AICONSOLE_PACKAGE = Path(__file__).parent.parent
 
 HISTORY_LIMIT: int = 1000
 COMMANDS_HISTORY_JSON: str = "command_history.json"
+CHAT_HEADLINES_INDEX_JSON: str = "chat_headlines.json"
+CHAT_JOURNAL_SUFFIX: str = ".journal.jsonl"
 
+# Snapshot a chat and compact its mutation journal once the journal grows beyond either of these
+CHAT_JOURNAL_COMPACTION_MUTATIONS: int = 500
+CHAT_JOURNAL_COMPACTION_BYTES: int = 1024 * 1024
+
+# Limits of the in memory cache of loaded chats, size is approximated by the length of the chat texts
+CHAT_CACHE_MAX_CHATS: int = 32
+CHAT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+# Streamed Append* mutations to the same target are merged for up to this long / this many characters
+# before being journaled and sent to the clients, a window of 0 disables merging
+CHAT_MUTATION_COALESCE_WINDOW_S: float = 0.03
+CHAT_MUTATION_COALESCE_MAX_CHARS: int = 4096
+
+# Recent sequenced mutations kept in memory per chat, so reopening clients can catch up without a full snapshot
+CHAT_MUTATION_BUFFER_SIZE: int = 1000
+CHAT_MUTATION_BUFFER_MAX_CHATS: int = 64
+
+# Outgoing messages waiting to be written to a websocket. When a slow client lets its queue fill up it is either
+# disconnected ("disconnect", it reconnects and catches up from the last mutation seq it has seen) or the sender
+# waits for it ("block")
+WEBSOCKET_SEND_QUEUE_SIZE: int = 1000
+WEBSOCKET_SEND_QUEUE_OVERFLOW_POLICY: Literal["disconnect", "block"] = "disconnect"
+
+# Incoming messages of a connection handled at the same time, messages of a single chat are always handled in order
+WEBSOCKET_MAX_CONCURRENT_MESSAGES: int = 8
+
+# Token counts of encoded message and tool texts, kept so that only new or changed ones are encoded again
+GPT_TOKEN_COUNT_CACHE_SIZE: int = 10000
+
+# History sent to the model is trimmed once it does not fit, optionally also to a smaller budget to save latency and
+# cost (context_max_tokens in the [settings] table of a project). The most recent messages are kept as long as
+# possible, long tool outputs are cut down to their head and tail
+GPT_CONTEXT_KEEP_RECENT_MESSAGES: int = 10
+GPT_CONTEXT_TOOL_OUTPUT_HEAD_CHARS: int = 2000
+GPT_CONTEXT_TOOL_OUTPUT_TAIL_CHARS: int = 2000
+
+# Opt-in (AICONSOLE_GPT_CACHE=1) disk cache of LLM responses in the .aic directory of the project, replayed for
+# identical requests. Only deterministic requests (temperature 0) are cached, unless a request forces it
+GPT_CACHE_ENABLED: bool = os.environ.get("AICONSOLE_GPT_CACHE", "") == "1"
+GPT_CACHE_DIRECTORY: str = "gpt_cache"
+GPT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+GPT_CACHE_MAX_AGE_S: float = 7 * 24 * 60 * 60
+
+# Provider LLM requests go to, "fake" streams scripted responses offline for tests and load tests. The script is a
+# JSON list of responses, or a directory of them such as the response cache, replayed in turn
+GPT_PROVIDER: Literal["litellm", "fake"] = "fake" if os.environ.get("AICONSOLE_GPT_PROVIDER") == "fake" else "litellm"
+GPT_FAKE_SCRIPT: str | None = os.environ.get("AICONSOLE_GPT_FAKE_SCRIPT")
+GPT_FAKE_TOKENS_PER_SECOND: float = float(os.environ.get("AICONSOLE_GPT_FAKE_TOKENS_PER_SECOND", "100"))
+GPT_FAKE_TIME_TO_FIRST_TOKEN_S: float = float(os.environ.get("AICONSOLE_GPT_FAKE_TIME_TO_FIRST_TOKEN_S", "0.2"))
+
+# Retries of failed LLM requests, with exponential backoff and jitter unless the provider says when to retry.
+# A stream producing no first token, or stalling between chunks, for longer than its timeout is retried too
+GPT_RETRY_MAX_ATTEMPTS: int = 3
+GPT_RETRY_BASE_DELAY_S: float = 1
+GPT_RETRY_MAX_DELAY_S: float = 30
+GPT_FIRST_TOKEN_TIMEOUT_S: float = 60
+GPT_STALL_TIMEOUT_S: float = 30
+# A second, identical director request is sent if the first one has not started streaming by then (None disables)
+GPT_DIRECTOR_HEDGE_AFTER_S: float | None = None
+
+# Requests and tokens per minute allowed for each model (None for no limit), shared by all chats of the process.
+# No model is limited by default, as the limits depend on the OpenAI tier of the account. Projects set them in the
+# [rate_limits] table of their settings, e.g. "gpt-4-0613" = { requests_per_minute = 500, tokens_per_minute = 10000 }
+GPT_RATE_LIMITS: dict[str, tuple[int | None, int | None]] = {}
+# Number of recent GPT requests whose latency records are kept for /api/metrics/gpt. With
+# AICONSOLE_GPT_METRICS_DEBUG=1 every record is also sent to the frontend as a debug message
+GPT_METRICS_MAX_RECORDS: int = 1000
+GPT_METRICS_DEBUG_MESSAGES: bool = os.environ.get("AICONSOLE_GPT_METRICS_DEBUG") == "1"
+# Code interpreter processes are kept per chat and closed after being idle for this long (None keeps them), or when
+# there are too many, the least recently used first
+CODE_INTERPRETER_MAX_SESSIONS: int = 8
+CODE_INTERPRETER_IDLE_TIMEOUT_S: float | None = 15 * 60
+# Python interpreters started (with the API materials imported) in the background once a project opens, handed to
+# chats running their first code, 0 disables
+CODE_INTERPRETER_POOL_SIZE: int = 2
+
+# Limits of a single code run (None for no limit). Code over its wall clock or CPU time is interrupted (SIGINT), and
+# its interpreter killed and restarted if it does not stop within the grace period. The memory limit caps the address
+# space of interpreter processes on Linux
+CODE_EXECUTION_TIMEOUT_S: float | None = 10 * 60
+CODE_EXECUTION_CPU_LIMIT_S: float | None = None
+CODE_EXECUTION_MEMORY_LIMIT_BYTES: int | None = None
+CODE_EXECUTION_INTERRUPT_GRACE_S: float = 5
 
 DIRECTOR_MIN_TOKENS: int = 250
 DIRECTOR_PREFERRED_TOKENS: int = 1000
@@ -20,6 +20,7 @@ from aiconsole.core.chat.chat_mutations import (
     SetAnalysisMessageGroupMutation,
     SetCodeToolCallMutation,
     SetContentMessageMutation,
+    SetExecutionStatusToolCallMutation,
     SetHeadlineToolCallMutation,
     SetIsAnalysisInProgressMutation,
     SetIsExecutingToolCallMutation,
@@ -79,6 +80,7 @@ def apply_mutation(chat: Chat, mutation: ChatMutation) -> None:
         AppendToOutputToolCallMutation.__name__: _handle_AppendToToolCallOutputMutation,
         SetIsStreamingToolCallMutation.__name__: _handle_SetToolCallIsStreamingMutation,
         SetIsExecutingToolCallMutation.__name__: _handle_SetIsExecutingToolCallMutation,
+        SetExecutionStatusToolCallMutation.__name__: _handle_SetExecutionStatusToolCallMutation,
     }[mutation.__class__.__name__](chat, mutation)
 
 
@@ -97,6 +99,7 @@ def _handle_CreateMessageGroupMutation(chat: Chat, mutation: CreateMessageGroupM
     )
 
     chat.message_groups.append(message_group)
+    chat.index_message_group(message_group)
 
     return message_group
 
@@ -104,6 +107,7 @@ def _handle_CreateMessageGroupMutation(chat: Chat, mutation: CreateMessageGroupM
 def _handle_DeleteMessageGroupMutation(chat, mutation: DeleteMessageGroupMutation) -> None:
     message_group = _get_message_group(chat, mutation.message_group_id)
     chat.message_groups = [group for group in chat.message_groups if group.id != message_group.id]
+    chat.unindex_message_group(message_group)
 
 
 def _handle_SetIsAnalysisInProgressMutation(chat, mutation: SetIsAnalysisInProgressMutation) -> None:
@@ -117,7 +121,7 @@ def _handle_SetMessageGroupTaskMutation(chat, mutation: SetTaskMessageGroupMutat
 
 def _handle_AppendToMessageGroupTaskMutation(chat, mutation: AppendToTaskMessageGroupMutation) -> None:
     message_group = _get_message_group(chat, mutation.message_group_id)
-    message_group.task += mutation.task_delta
+    message_group.append_text("task", mutation.task_delta)
 
 
 def _handle_SetMessageGroupRoleMutation(chat, mutation: SetRoleMessageGroupMutation) -> None:
@@ -152,7 +156,7 @@ def _handle_SetMessageGroupAnalysisMutation(chat, mutation: SetAnalysisMessageGr
 
 def _handle_AppendToMessageGroupAnalysisMutation(chat, mutation: AppendToAnalysisMessageGroupMutation) -> None:
     message_group = _get_message_group(chat, mutation.message_group_id)
-    message_group.analysis += mutation.analysis_delta
+    message_group.append_text("analysis", mutation.analysis_delta)
 
 
 def _handle_CreateMessageMutation(chat, mutation: CreateMessageMutation) -> AICMessage:
@@ -161,6 +165,7 @@ def _handle_CreateMessageMutation(chat, mutation: CreateMessageMutation) -> AICM
         id=mutation.message_id, content=mutation.content, timestamp=datetime.now().isoformat(), tool_calls=[]
     )
     message_group.messages.append(message)
+    chat.index_message(message_group, message)
     return message
 
 
@@ -169,10 +174,12 @@ def _handle_DeleteMessageMutation(chat, mutation: DeleteMessageMutation) -> None
     message_location.message_group.messages = [
         m for m in message_location.message_group.messages if m.id != mutation.message_id
     ]
+    chat.unindex_message(message_location.message)
 
     # Remove message group if it's empty
     if not message_location.message_group.messages:
         chat.message_groups = [group for group in chat.message_groups if group.id != message_location.message_group.id]
+        chat.unindex_message_group(message_location.message_group)
 
 
 def _handle_SetContentMessageMutation(chat, mutation: SetContentMessageMutation) -> None:
@@ -180,7 +187,7 @@ def _handle_SetContentMessageMutation(chat, mutation: SetContentMessageMutation)
 
 
 def _handle_AppendToContentMessageMutation(chat, mutation: AppendToContentMessageMutation) -> None:
-    _get_message_location(chat, mutation.message_id).message.content += mutation.content_delta
+    _get_message_location(chat, mutation.message_id).message.append_text("content", mutation.content_delta)
 
 
 def _handle_SetMessageIsStreamingMutation(chat, mutation: SetIsStreamingMessageMutation) -> None:
@@ -188,7 +195,8 @@ def _handle_SetMessageIsStreamingMutation(chat, mutation: SetIsStreamingMessageM
 
 
 def _handle_CreateToolCallMutation(chat, mutation: CreateToolCallMutation) -> AICToolCall:
-    message = _get_message_location(chat, mutation.message_id).message
+    message_location = _get_message_location(chat, mutation.message_id)
+    message = message_location.message
     tool_call = AICToolCall(
         id=mutation.tool_call_id,
         language=mutation.language,
@@ -197,22 +205,26 @@ def _handle_CreateToolCallMutation(chat, mutation: CreateToolCallMutation) -> AI
         output=mutation.output,
     )
     message.tool_calls.append(tool_call)
+    chat.index_tool_call(message_location.message_group, message, tool_call)
     return tool_call
 
 
 def _handle_DeleteToolCallMutation(chat, mutation: DeleteToolCallMutation) -> None:
     tool_call = _get_tool_call_location(chat, mutation.tool_call_id)
     tool_call.message.tool_calls = [tc for tc in tool_call.message.tool_calls if tc.id != mutation.tool_call_id]
+    chat.unindex_tool_call(tool_call.tool_call)
 
     # Remove message if it's empty
     if not tool_call.message.tool_calls and not tool_call.message.content:
         tool_call.message_group.messages = [
             m for m in tool_call.message_group.messages if m.id != tool_call.message.id
         ]
+        chat.unindex_message(tool_call.message)
 
     # Remove message group if it's empty
     if not tool_call.message_group.messages:
         chat.message_groups = [group for group in chat.message_groups if group.id != tool_call.message_group.id]
+        chat.unindex_message_group(tool_call.message_group)
 
 
 def _handle_SetToolCallHeadlineMutation(chat, mutation: SetHeadlineToolCallMutation) -> None:
@@ -228,7 +240,7 @@ def _handle_SetToolCallCodeMutation(chat, mutation: SetCodeToolCallMutation) ->
 
 
 def _handle_AppendToToolCallCodeMutation(chat, mutation: AppendToCodeToolCallMutation) -> None:
-    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.code += mutation.code_delta
+    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.append_text("code", mutation.code_delta)
 
 
 def _handle_SetToolCallLanguageMutation(chat, mutation: SetLanguageToolCallMutation) -> None:
@@ -240,10 +252,7 @@ def _handle_SetToolCallOutputMutation(chat, mutation: SetOutputToolCallMutation)
 
 
 def _handle_AppendToToolCallOutputMutation(chat, mutation: AppendToOutputToolCallMutation) -> None:
-    tool_call = _get_tool_call_location(chat, mutation.tool_call_id).tool_call
-    if tool_call.output is None:
-        tool_call.output = ""
-    tool_call.output += mutation.output_delta
+    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.append_text("output", mutation.output_delta)
 
 
 def _handle_SetToolCallIsStreamingMutation(chat, mutation: SetIsStreamingToolCallMutation) -> None:
@@ -254,6 +263,10 @@ def _handle_SetIsExecutingToolCallMutation(chat, mutation: SetIsExecutingToolCal
     _get_tool_call_location(chat, mutation.tool_call_id).tool_call.is_executing = mutation.is_executing
 
 
+def _handle_SetExecutionStatusToolCallMutation(chat, mutation: SetExecutionStatusToolCallMutation) -> None:
+    _get_tool_call_location(chat, mutation.tool_call_id).tool_call.execution_status = mutation.execution_status
+
+
 # Utils
 
 
@@ -0,0 +1,266 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Resident cache of loaded chats, so hot chats do not have to be read and migrated from disk on every request.
+
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import watchdog.events
+import watchdog.observers
+
+from aiconsole.consts import (
+    CHAT_CACHE_MAX_BYTES,
+    CHAT_CACHE_MAX_CHATS,
+    CHAT_JOURNAL_SUFFIX,
+)
+from aiconsole.core.chat.chat_mutations import ChatMutation
+from aiconsole.core.chat.types import Chat
+
+_log = logging.getLogger(__name__)
+
+_DiskSignature = tuple[tuple[int, int] | None, tuple[int, int] | None]
+
+# Text fields of a chat which make up most of its size, mutations set them or append to them (<field>_delta)
+_TEXT_FIELDS = {"name", "task", "analysis", "content", "headline", "code", "output"}
+
+
+@dataclass
+class _CacheEntry:
+    chat: Chat
+    size: int
+    # State of the chat files as last written by us, anything else means the chat was changed externally
+    disk_signature: _DiskSignature
+
+
+class ChatCache:
+    def __init__(self, max_chats: int = CHAT_CACHE_MAX_CHATS, max_bytes: int = CHAT_CACHE_MAX_BYTES):
+        self.max_chats = max_chats
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._history_directory: Path | None = None
+        self._observer = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, chat_id: str) -> Chat | None:
+        entry = self._entries.get(chat_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(chat_id)
+        return entry.chat
+
+    def put(self, chat: Chat):
+        """
+        Store a chat which is in sync with its files on disk, evicting the least recently used chats if needed.
+        """
+        entry = self._entries.get(chat.id)
+
+        # The size of a chat mutated while cached has been kept up to date by grow
+        size = entry.size if entry is not None and entry.chat is chat else _approximate_size(chat)
+
+        self._discard(chat.id)
+
+        entry = _CacheEntry(
+            chat=chat,
+            size=size,
+            disk_signature=self._disk_signature(chat.id),
+        )
+        self._entries[chat.id] = entry
+        self._bytes += entry.size
+
+        self._evict()
+
+    def grow(self, chat_id: str, mutation: ChatMutation):
+        """
+        A cached chat has been mutated. Text that is replaced is not subtracted, so the size is an upper bound until
+        the chat is loaded again.
+        """
+        entry = self._entries.get(chat_id)
+
+        if entry is not None:
+            size = _mutation_size(mutation)
+            entry.size += size
+            self._bytes += size
+
+    def mark_written(self, chat_id: str):
+        """
+        Files of a cached chat have been rewritten by us (e.g. a journal compaction), the cached chat is still valid.
+        """
+        entry = self._entries.get(chat_id)
+
+        if entry is not None:
+            entry.disk_signature = self._disk_signature(chat_id)
+
+    def invalidate(self, chat_id: str):
+        entry = self._entries.get(chat_id)
+
+        # A locked chat is the source of truth, its files are being written as it changes
+        if entry is not None and not entry.chat.lock_id:
+            self._discard(chat_id)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+
+        return {
+            "chats": len(self._entries),
+            "bytes": self._bytes,
+            "max_chats": self.max_chats,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def start(self, history_directory: Path):
+        """
+        Start watching the history directory, chats changed on disk by something else than us are invalidated.
+        """
+        self.stop()
+        self.clear()
+
+        self._history_directory = history_directory
+        self._history_directory.mkdir(parents=True, exist_ok=True)
+
+        self._observer = watchdog.observers.Observer()
+        self._observer.schedule(
+            _ChatFilesWatchDogHandler(self, asyncio.get_running_loop()), str(history_directory), recursive=False
+        )
+        self._observer.start()
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer = None
+
+        self._history_directory = None
+        self.clear()
+
+    def _on_chat_files_changed(self, chat_id: str):
+        entry = self._entries.get(chat_id)
+
+        if entry is not None and entry.disk_signature != self._disk_signature(chat_id):
+            _log.debug(f"Chat {chat_id} changed on disk, invalidating")
+            self.invalidate(chat_id)
+
+    def _evict(self):
+        for chat_id in list(self._entries):
+            if len(self._entries) <= self.max_chats and self._bytes <= self.max_bytes:
+                return
+
+            if self._entries[chat_id].chat.lock_id:
+                continue
+
+            self._discard(chat_id)
+            self.evictions += 1
+
+    def _discard(self, chat_id: str):
+        entry = self._entries.pop(chat_id, None)
+
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _disk_signature(self, chat_id: str) -> _DiskSignature:
+        # Not watching any project, there is nothing to compare against
+        if self._history_directory is None:
+            return None, None
+
+        return (
+            _file_signature(self._history_directory / f"{chat_id}.json"),
+            _file_signature(self._history_directory / f"{chat_id}{CHAT_JOURNAL_SUFFIX}"),
+        )
+
+
+class _ChatFilesWatchDogHandler(watchdog.events.FileSystemEventHandler):
+    def __init__(self, cache: ChatCache, loop: asyncio.AbstractEventLoop):
+        self.cache = cache
+        self.loop = loop
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            name = os.path.basename(path)
+
+            if name.endswith(CHAT_JOURNAL_SUFFIX):
+                chat_id = name[: -len(CHAT_JOURNAL_SUFFIX)]
+            elif name.endswith(".json"):
+                chat_id = name[: -len(".json")]
+            else:
+                continue
+
+            # Events come from the observer thread, the cache is only ever touched on the event loop
+            self.loop.call_soon_threadsafe(self.cache._on_chat_files_changed, chat_id)
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _approximate_size(chat: Chat) -> int:
+    size = len(chat.name)
+
+    for group in chat.message_groups:
+        size += len(group.task) + len(group.analysis)
+
+        for message in group.messages:
+            size += len(message.content)
+
+            for tool_call in message.tool_calls:
+                size += len(tool_call.code) + len(tool_call.headline) + len(tool_call.output or "")
+
+    return size
+
+
+def _mutation_size(mutation: ChatMutation) -> int:
+    return sum(
+        len(value)
+        for field, value in vars(mutation).items()
+        if isinstance(value, str) and field.removesuffix("_delta") in _TEXT_FIELDS
+    )
+
+
+chat_cache = ChatCache()
@@ -0,0 +1,219 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Project level index of chat headlines, persisted in .aic so listing chats does not need to parse every chat file.
+
+"""
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+from aiconsole.consts import CHAT_HEADLINES_INDEX_JSON, CHAT_JOURNAL_SUFFIX
+from aiconsole.core.chat.get_chat_name import get_chat_name
+from aiconsole.core.chat.types import Chat, ChatHeadline
+from aiconsole.core.project.paths import (
+    get_aic_directory,
+    get_history_directory,
+    get_project_directory,
+)
+
+_log = logging.getLogger(__name__)
+
+_INDEX_VERSION = 1
+
+
+@dataclass
+class _IndexEntry:
+    name: str
+    mtime: float
+    size: int
+    # Chats are modified by appending to their mutation journal, so it also counts as a modification
+    journal_mtime: float = 0
+
+    @property
+    def last_modified(self) -> float:
+        return max(self.mtime, self.journal_mtime)
+
+
+class ChatHeadlinesIndex:
+    def __init__(self, project_path: Path | None = None):
+        self._history_directory = get_history_directory(project_path)
+        self._index_file_path = get_aic_directory(project_path) / CHAT_HEADLINES_INDEX_JSON
+        self._entries: dict[str, _IndexEntry] = {}
+        self._sorted_ids: list[str] | None = None
+        self._dirty = False
+
+        self._load()
+
+    def headlines(self, offset: int = 0, limit: int | None = None) -> list[ChatHeadline]:
+        """
+        Return headlines sorted by modification time (most recent first), refreshing the index from the files first.
+        """
+        self.refresh()
+
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(
+                self._entries, key=lambda chat_id: self._entries[chat_id].last_modified, reverse=True
+            )
+
+        ids = self._sorted_ids[offset : offset + limit if limit is not None else None]
+
+        return [
+            ChatHeadline(
+                id=chat_id,
+                name=self._entries[chat_id].name,
+                last_modified=datetime.fromtimestamp(self._entries[chat_id].last_modified),
+            )
+            for chat_id in ids
+        ]
+
+    def refresh(self):
+        """
+        Incrementally bring the index in sync with the history directory, only chat files with a changed
+        mtime or size are parsed.
+        """
+        seen_ids = set()
+        journal_mtimes: dict[str, float] = {}
+
+        if self._history_directory.is_dir():
+            with os.scandir(self._history_directory) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+
+                    if entry.name.endswith(CHAT_JOURNAL_SUFFIX):
+                        journal_mtimes[entry.name[: -len(CHAT_JOURNAL_SUFFIX)]] = entry.stat().st_mtime
+                        continue
+
+                    if not entry.name.endswith(".json"):
+                        continue
+
+                    chat_id = entry.name.split(".")[0]
+                    seen_ids.add(chat_id)
+
+                    stat = entry.stat()
+                    index_entry = self._entries.get(chat_id)
+
+                    if index_entry and index_entry.mtime == stat.st_mtime and index_entry.size == stat.st_size:
+                        continue
+
+                    try:
+                        with open(entry.path, "r") as f:
+                            name = get_chat_name(json.load(f))
+                    except Exception as e:
+                        _log.exception(e)
+                        _log.error(f"Failed to index chat: {e} {chat_id}")
+                        continue
+
+                    self._set(chat_id, _IndexEntry(name=name, mtime=stat.st_mtime, size=stat.st_size))
+
+        for chat_id in set(self._entries) - seen_ids:
+            self.remove(chat_id)
+
+        for chat_id, index_entry in self._entries.items():
+            journal_mtime = journal_mtimes.get(chat_id, 0)
+
+            if index_entry.journal_mtime != journal_mtime:
+                index_entry.journal_mtime = journal_mtime
+                self._sorted_ids = None
+                self._dirty = True
+
+        self._save()
+
+    def update(self, chat: Chat):
+        """
+        Update the entry of a chat that has just been written to disk.
+        """
+        file_path = self._history_directory / f"{chat.id}.json"
+
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            self.remove(chat.id)
+            return
+
+        journal_path = self._history_directory / f"{chat.id}{CHAT_JOURNAL_SUFFIX}"
+        journal_mtime = journal_path.stat().st_mtime if journal_path.exists() else 0
+
+        self._set(
+            chat.id,
+            _IndexEntry(name=chat.name, mtime=stat.st_mtime, size=stat.st_size, journal_mtime=journal_mtime),
+        )
+
+    def remove(self, chat_id: str):
+        if self._entries.pop(chat_id, None) is not None:
+            self._sorted_ids = None
+            self._dirty = True
+
+    def _set(self, chat_id: str, index_entry: _IndexEntry):
+        self._entries[chat_id] = index_entry
+        self._sorted_ids = None
+        self._dirty = True
+
+    def _load(self):
+        if not self._index_file_path.exists():
+            return
+
+        try:
+            with open(self._index_file_path, "r") as f:
+                data = json.load(f)
+
+            if data.get("version") != _INDEX_VERSION:
+                return
+
+            self._entries = {chat_id: _IndexEntry(**entry) for chat_id, entry in data["chats"].items()}
+        except Exception as e:
+            # The index is only a cache, it will be rebuilt from the chat files
+            _log.warning(f"Could not read chat headlines index {self._index_file_path}: {e}")
+            self._entries = {}
+
+    def _save(self):
+        # Nothing to persist for a project without chats (or a project that no longer exists)
+        if not self._dirty or not self._history_directory.is_dir():
+            return
+
+        self._index_file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_file_path.with_suffix(".tmp")
+
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": _INDEX_VERSION,
+                    "chats": {chat_id: asdict(entry) for chat_id, entry in self._entries.items()},
+                },
+                f,
+            )
+
+        os.replace(tmp_path, self._index_file_path)
+        self._dirty = False
+
+
+_indexes: dict[Path, ChatHeadlinesIndex] = {}
+
+
+def get_chat_headlines_index(project_path: Path | None = None) -> ChatHeadlinesIndex:
+    project_directory = get_project_directory(project_path).absolute()
+
+    if project_directory not in _indexes:
+        _indexes[project_directory] = ChatHeadlinesIndex(project_directory)
+
+    return _indexes[project_directory]
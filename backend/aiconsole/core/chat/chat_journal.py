@@ -0,0 +1,248 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Append-only journal of chat mutations.
+
+A chat on disk is a snapshot (<chat_id>.json, containing the mutation_seq it is up to date with) plus a journal
+(<chat_id>.journal.jsonl) with one {"seq": ..., "mutation": ...} record per line. Mutations are appended as they
+are applied, so the cost of persisting a change is proportional to the change and not to the size of the chat.
+Once the journal grows large the snapshot is rewritten in the background and the journal is compacted.
+
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import IO, Iterator
+
+from pydantic import TypeAdapter
+
+from aiconsole.consts import (
+    CHAT_JOURNAL_COMPACTION_BYTES,
+    CHAT_JOURNAL_COMPACTION_MUTATIONS,
+    CHAT_JOURNAL_SUFFIX,
+)
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_headlines_index import get_chat_headlines_index
+from aiconsole.core.chat.chat_mutations import ChatMutation
+from aiconsole.core.chat.types import Chat
+from aiconsole.core.project.paths import get_history_directory, get_project_directory
+
+_log = logging.getLogger(__name__)
+
+_mutation_adapter: TypeAdapter[ChatMutation] = TypeAdapter(ChatMutation)
+
+
+class ChatJournal:
+    def __init__(self, chat_id: str, project_path: Path):
+        self.chat_id = chat_id
+        self._project_path = project_path
+        self._history_directory = get_history_directory(project_path)
+        self.path = self._history_directory / f"{chat_id}{CHAT_JOURNAL_SUFFIX}"
+        self.snapshot_path = self._history_directory / f"{chat_id}.json"
+
+        self._file: IO[str] | None = None
+        self._size: int | None = None
+        # mutation_seq of the snapshot on disk, None if not known yet
+        self._snapshot_seq: int | None = None
+        self._compaction: asyncio.Task | None = None
+
+    def replay(self, chat: Chat) -> Chat:
+        """
+        Apply all the journaled mutations which are newer than the chat snapshot.
+        """
+        self._snapshot_seq = chat.mutation_seq if self.snapshot_path.exists() else None
+
+        for seq, mutation in self._read_records(after_seq=chat.mutation_seq):
+            apply_mutation(chat, mutation)
+            chat.mutation_seq = seq
+
+        return chat
+
+    def append(self, chat: Chat, mutation: ChatMutation):
+        """
+        Journal a mutation which has just been applied to the chat.
+        """
+        chat.mutation_seq += 1
+
+        if self._file is None:
+            self._open()
+
+        # json.dumps escapes non ascii characters, so the length of a line is also its size in bytes
+        line = json.dumps({"seq": chat.mutation_seq, "mutation": mutation.model_dump()}) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        self._size = (self._size or 0) + len(line)
+
+    def release(self, chat: Chat):
+        """
+        Called when the chat lock is released, closes the journal and compacts it in the background if needed.
+        """
+        self._close()
+
+        if not chat.message_groups:
+            # Empty chats are not kept on disk
+            self._cancel_compaction()
+            self._delete_files()
+            get_chat_headlines_index(self._project_path).update(chat)
+            return
+
+        if self._needs_compaction(chat):
+            # Everything journaled so far is contained in the snapshot, anything appended later is kept
+            offset = self.path.stat().st_size if self.path.exists() else 0
+            snapshot = chat.model_dump(exclude={"id", "last_modified"})
+            self._compaction = asyncio.create_task(self._compact(chat, snapshot, offset))
+        else:
+            get_chat_headlines_index(self._project_path).update(chat)
+
+    def delete(self):
+        self._cancel_compaction()
+        self._close()
+
+        if self.path.exists():
+            os.remove(self.path)
+
+        _journals.pop(self.path, None)
+
+    def _needs_compaction(self, chat: Chat) -> bool:
+        if self._compaction:
+            return False
+
+        if self._snapshot_seq is None or not self.snapshot_path.exists():
+            return True
+
+        size = self._size if self._size is not None else (self.path.stat().st_size if self.path.exists() else 0)
+
+        return (
+            chat.mutation_seq - self._snapshot_seq >= CHAT_JOURNAL_COMPACTION_MUTATIONS
+            or size >= CHAT_JOURNAL_COMPACTION_BYTES
+        )
+
+    async def _compact(self, chat: Chat, snapshot: dict, offset: int):
+        try:
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+
+            await asyncio.to_thread(_write_snapshot, tmp_path, snapshot)
+
+            # From here on there are no awaits, so no mutation can be appended in the middle of the swap
+            os.replace(tmp_path, self.snapshot_path)
+            self._snapshot_seq = snapshot["mutation_seq"]
+            self._truncate_head(offset)
+            chat_cache.mark_written(self.chat_id)
+
+            get_chat_headlines_index(self._project_path).update(chat)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _log.exception(e)
+            _log.error(f"Failed to compact chat journal {self.chat_id}: {e}")
+        finally:
+            self._compaction = None
+
+    def _truncate_head(self, offset: int):
+        if not self.path.exists():
+            return
+
+        reopen = self._file is not None
+        self._close()
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+
+        if tail:
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(tail)
+            os.replace(tmp_path, self.path)
+        else:
+            os.remove(self.path)
+
+        if reopen:
+            self._open()
+
+    def _read_records(self, after_seq: int) -> Iterator[tuple[int, ChatMutation]]:
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    seq = record["seq"]
+                    mutation = _mutation_adapter.validate_python(record["mutation"])
+                except Exception as e:
+                    # Most likely a line cut short by a crash
+                    _log.warning(f"Skipping malformed record in chat journal {self.chat_id}: {e}")
+                    continue
+
+                if seq > after_seq:
+                    yield seq, mutation
+
+    def _cancel_compaction(self):
+        if self._compaction:
+            self._compaction.cancel()
+            self._compaction = None
+
+    def _open(self):
+        self._history_directory.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+        if self._size:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                cut_short = f.read(1) != b"\n"
+
+            if cut_short:
+                # Terminate a record cut short by a crash so it does not swallow the next one
+                self._file.write("\n")
+                self._size += 1
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._size = None
+
+    def _delete_files(self):
+        for path in (self.path, self.snapshot_path):
+            if path.exists():
+                os.remove(path)
+
+
+def _write_snapshot(path: Path, snapshot: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(snapshot, f, indent=4)
+
+
+_journals: dict[Path, ChatJournal] = {}
+
+
+def get_chat_journal(chat_id: str, project_path: Path | None = None) -> ChatJournal:
+    project_directory = get_project_directory(project_path).absolute()
+    path = get_history_directory(project_directory) / f"{chat_id}{CHAT_JOURNAL_SUFFIX}"
+
+    if path not in _journals:
+        _journals[path] = ChatJournal(chat_id, project_directory)
+
+    return _journals[path]
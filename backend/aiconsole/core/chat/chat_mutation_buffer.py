@@ -0,0 +1,82 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Ring buffers of the most recent sequenced mutations of each chat, so a client that reopens a chat it has already
+seen up to some seq can be sent only the mutations it missed instead of the whole chat.
+
+"""
+
+from collections import OrderedDict, deque
+
+from pydantic import BaseModel
+
+from aiconsole.consts import (
+    CHAT_MUTATION_BUFFER_MAX_CHATS,
+    CHAT_MUTATION_BUFFER_SIZE,
+)
+from aiconsole.core.chat.chat_mutations import ChatMutation
+
+
+class SequencedChatMutation(BaseModel):
+    seq: int
+    request_id: str
+    mutation: ChatMutation
+
+
+class ChatMutationBuffer:
+    def __init__(self, size: int = CHAT_MUTATION_BUFFER_SIZE, max_chats: int = CHAT_MUTATION_BUFFER_MAX_CHATS):
+        self.size = size
+        self.max_chats = max_chats
+        self._buffers: OrderedDict[str, deque[SequencedChatMutation]] = OrderedDict()
+
+    def append(self, chat_id: str, seq: int, request_id: str, mutation: ChatMutation):
+        buffer = self._buffers.get(chat_id)
+
+        if buffer is None:
+            buffer = self._buffers[chat_id] = deque(maxlen=self.size)
+
+            if len(self._buffers) > self.max_chats:
+                self._buffers.popitem(last=False)
+        else:
+            self._buffers.move_to_end(chat_id)
+
+        buffer.append(SequencedChatMutation(seq=seq, request_id=request_id, mutation=mutation))
+
+    def since(self, chat_id: str, from_seq: int, current_seq: int) -> list[SequencedChatMutation] | None:
+        """
+        Mutations with seq greater than from_seq, or None if some of them are no longer buffered.
+        """
+        if from_seq == current_seq:
+            return []
+
+        # A client ahead of us has seen mutations that were never persisted (e.g. before a restart)
+        if from_seq > current_seq:
+            return None
+
+        buffer = self._buffers.get(chat_id)
+
+        if not buffer or buffer[0].seq > from_seq + 1:
+            return None
+
+        return [mutation for mutation in buffer if mutation.seq > from_seq]
+
+    def clear(self, chat_id: str):
+        self._buffers.pop(chat_id, None)
+
+
+chat_mutation_buffer = ChatMutationBuffer()
@@ -0,0 +1,160 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Merges consecutive streamed Append* mutations to the same target, so a burst of LLM chunks or output lines is
+journaled and sent to the clients as a single mutation instead of one per chunk.
+
+"""
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from aiconsole.consts import (
+    CHAT_MUTATION_COALESCE_MAX_CHARS,
+    CHAT_MUTATION_COALESCE_WINDOW_S,
+)
+from aiconsole.core.chat.chat_mutations import (
+    AppendToAnalysisMessageGroupMutation,
+    AppendToCodeToolCallMutation,
+    AppendToContentMessageMutation,
+    AppendToHeadlineToolCallMutation,
+    AppendToOutputToolCallMutation,
+    AppendToTaskMessageGroupMutation,
+    ChatMutation,
+)
+
+# Mutation type -> (field identifying the target, field with the appended text)
+_COALESCABLE_MUTATIONS: dict[type, tuple[str, str]] = {
+    AppendToTaskMessageGroupMutation: ("message_group_id", "task_delta"),
+    AppendToAnalysisMessageGroupMutation: ("message_group_id", "analysis_delta"),
+    AppendToContentMessageMutation: ("message_id", "content_delta"),
+    AppendToHeadlineToolCallMutation: ("tool_call_id", "headline_delta"),
+    AppendToCodeToolCallMutation: ("tool_call_id", "code_delta"),
+    AppendToOutputToolCallMutation: ("tool_call_id", "output_delta"),
+}
+
+# Publishes a mutation (already applied to the chat) for a given chat, request and source connection
+PublishMutation = Callable[[str, str, Any, ChatMutation], Awaitable[None]]
+
+
+@dataclass
+class _PendingAppend:
+    request_id: str
+    source_connection: Any
+    mutation: ChatMutation
+    target: str
+    delta_field: str
+    chunks: list[str] = field(default_factory=list)
+    length: int = 0
+
+    def matches(self, request_id: str, source_connection: Any, mutation: ChatMutation) -> bool:
+        return (
+            self.request_id == request_id
+            and self.source_connection is source_connection
+            and type(self.mutation) is type(mutation)
+            and getattr(mutation, _COALESCABLE_MUTATIONS[type(mutation)][0]) == self.target
+        )
+
+    def add(self, mutation: ChatMutation):
+        delta = getattr(mutation, self.delta_field)
+        self.chunks.append(delta)
+        self.length += len(delta)
+
+    def merged(self) -> ChatMutation:
+        if len(self.chunks) == 1:
+            return self.mutation
+
+        return self.mutation.model_copy(update={self.delta_field: "".join(self.chunks)})
+
+
+class ChatMutationCoalescer:
+    def __init__(
+        self,
+        publish: PublishMutation,
+        window: float = CHAT_MUTATION_COALESCE_WINDOW_S,
+        max_chars: int = CHAT_MUTATION_COALESCE_MAX_CHARS,
+    ):
+        self._publish = publish
+        self._window = window
+        self._max_chars = max_chars
+        self._pending: dict[str, _PendingAppend] = {}
+        # Publishing of a chat is serialised so merged mutations never overtake each other
+        self._publish_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._flush_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, chat_id: str, request_id: str, source_connection: Any, mutation: ChatMutation):
+        """
+        Publish a mutation which has already been applied to the chat, appends may be held back for a short window.
+        """
+        pending = self._pending.get(chat_id)
+
+        if pending is not None and pending.matches(request_id, source_connection, mutation):
+            pending.add(mutation)
+
+            if pending.length >= self._max_chars:
+                await self.flush(chat_id)
+            return
+
+        await self.flush(chat_id)
+
+        if self._window <= 0 or type(mutation) not in _COALESCABLE_MUTATIONS:
+            await self._publish_in_order(chat_id, request_id, source_connection, mutation)
+            return
+
+        target_field, delta_field = _COALESCABLE_MUTATIONS[type(mutation)]
+        pending = _PendingAppend(
+            request_id=request_id,
+            source_connection=source_connection,
+            mutation=mutation,
+            target=getattr(mutation, target_field),
+            delta_field=delta_field,
+        )
+        pending.add(mutation)
+        self._pending[chat_id] = pending
+
+        asyncio.get_running_loop().call_later(self._window, self._flush_if_pending, chat_id, pending)
+
+    async def flush(self, chat_id: str):
+        """
+        Publish the held back appends of a chat. Returns once everything submitted so far has been published, also
+        by flushes already in progress.
+        """
+        async with self._publish_locks[chat_id]:
+            pending = self._pending.pop(chat_id, None)
+
+            if pending is not None:
+                await self._publish(chat_id, pending.request_id, pending.source_connection, pending.merged())
+
+    def forget(self, chat_id: str):
+        """
+        Called once a chat is flushed and no longer mutated, drops what is kept for it.
+        """
+        self._pending.pop(chat_id, None)
+        self._publish_locks.pop(chat_id, None)
+
+    def _flush_if_pending(self, chat_id: str, pending: _PendingAppend):
+        if self._pending.get(chat_id) is pending:
+            task = asyncio.create_task(self.flush(chat_id))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _publish_in_order(self, chat_id: str, request_id: str, source_connection: Any, mutation: ChatMutation):
+        async with self._publish_locks[chat_id]:
+            await self._publish(chat_id, request_id, source_connection, mutation)
@@ -2,6 +2,9 @@ from typing import Literal
 
 from pydantic import BaseModel
 
+from aiconsole.core.code_running.code_interpreters.execution_limits import (
+    ExecutionStatus,
+)
 from aiconsole.core.code_running.code_interpreters.language import LanguageStr
 from aiconsole.core.gpt.types import GPTRole
 
@@ -189,6 +192,12 @@ class SetIsExecutingToolCallMutation(BaseModel):
     is_executing: bool
 
 
+class SetExecutionStatusToolCallMutation(BaseModel):
+    type: Literal["SetExecutionStatusToolCallMutation"] = "SetExecutionStatusToolCallMutation"
+    tool_call_id: str
+    execution_status: ExecutionStatus | None
+
+
 ChatMutation = (
     LockAcquiredMutation
     | LockReleasedMutation
@@ -219,4 +228,5 @@ ChatMutation = (
     | AppendToOutputToolCallMutation
     | SetIsStreamingToolCallMutation
     | SetIsExecutingToolCallMutation
+    | SetExecutionStatusToolCallMutation
 )
@@ -20,11 +20,17 @@ from dataclasses import dataclass
 from typing import cast
 from uuid import uuid4
 
-from aiconsole.consts import DIRECTOR_MIN_TOKENS, DIRECTOR_PREFERRED_TOKENS
+from aiconsole.consts import (
+    DIRECTOR_MIN_TOKENS,
+    DIRECTOR_PREFERRED_TOKENS,
+    GPT_DIRECTOR_HEDGE_AFTER_S,
+)
 from aiconsole.core.assets.agents.agent import Agent
 from aiconsole.core.assets.asset import AssetLocation, AssetStatus
 from aiconsole.core.assets.materials.material import Material
 from aiconsole.core.chat.chat_mutations import (
+    AppendToAnalysisMessageGroupMutation,
+    AppendToTaskMessageGroupMutation,
     CreateMessageGroupMutation,
     SetAgentIdMessageGroupMutation,
     SetAnalysisMessageGroupMutation,
@@ -41,14 +47,16 @@ from aiconsole.core.chat.execution_modes.analysis.create_plan_class import (
     create_plan_class,
 )
 from aiconsole.core.chat.types import Chat
-from aiconsole.core.gpt.consts import GPTMode
+from aiconsole.core.gpt.consts import GPTMode, GPTPriority
 from aiconsole.core.gpt.gpt_executor import GPTExecutor
 from aiconsole.core.gpt.request import (
     GPTRequest,
     ToolDefinition,
     ToolFunctionDefinition,
 )
+from aiconsole.core.gpt.retry_policy import RetryPolicy
 from aiconsole.core.gpt.types import (
+    CLEAR_STR,
     EnforcedFunctionCall,
     EnforcedFunctionCallFuncSpec,
     GPTRequestTextMessage,
@@ -173,6 +181,9 @@ async def gpt_analysis_function_step(
         presence_penalty=2,
         min_tokens=DIRECTOR_MIN_TOKENS,
         preferred_tokens=DIRECTOR_PREFERRED_TOKENS,
+        retry_policy=RetryPolicy(hedge_after_s=GPT_DIRECTOR_HEDGE_AFTER_S),
+        priority=GPTPriority.ANALYSIS,
+        caller="director",
     )
 
     if force_call:
@@ -193,46 +204,61 @@ async def gpt_analysis_function_step(
         )
     )
 
+    materials_ids: list[str] = []
+
     try:
         async for chunk in gpt_executor.execute(request):
+            if chunk == CLEAR_STR:
+                # The request is retried, texts streamed so far are streamed again
+                await chat_mutator.mutate(SetTaskMessageGroupMutation(message_group_id=message_group_id, task=""))
+                await chat_mutator.mutate(
+                    SetAnalysisMessageGroupMutation(message_group_id=message_group_id, analysis="")
+                )
+                continue
+
             if len(gpt_executor.partial_response.choices) > 0:
                 tool_calls = gpt_executor.partial_response.choices[0].message.tool_calls
                 for tool_call in tool_calls:
                     function_call = tool_call.function
-                    arguments_dict = function_call.arguments_dict
-
-                    if arguments_dict:
-                        if "agent_id" in arguments_dict:
-                            await chat_mutator.mutate(
-                                SetAgentIdMessageGroupMutation(
-                                    message_group_id=message_group_id,
-                                    agent_id=arguments_dict["agent_id"],
-                                )
+                    _, string_deltas = function_call.pop_arguments_deltas()
+
+                    # Read argument by argument, the whole arguments would join the long texts for every chunk
+                    if "agent_id" in string_deltas:
+                        await chat_mutator.mutate(
+                            SetAgentIdMessageGroupMutation(
+                                message_group_id=message_group_id,
+                                agent_id=function_call.get_argument("agent_id"),
                             )
+                        )
+
+                    relevant_material_ids = function_call.get_argument("relevant_material_ids")
+
+                    if isinstance(relevant_material_ids, list) and relevant_material_ids != materials_ids:
+                        materials_ids = list(relevant_material_ids)
 
-                        if "relevant_material_ids" in arguments_dict:
-                            await chat_mutator.mutate(
-                                SetMaterialsIdsMessageGroupMutation(
-                                    message_group_id=message_group_id,
-                                    materials_ids=arguments_dict["relevant_material_ids"],
-                                )
+                        await chat_mutator.mutate(
+                            SetMaterialsIdsMessageGroupMutation(
+                                message_group_id=message_group_id,
+                                materials_ids=materials_ids,
                             )
+                        )
 
-                        if "next_step" in arguments_dict:
-                            await chat_mutator.mutate(
-                                SetTaskMessageGroupMutation(
-                                    message_group_id=message_group_id,
-                                    task=arguments_dict["next_step"],
-                                )
+                    # Long texts are streamed as deltas, the final plan sets them once more as a whole
+                    if string_deltas.get("next_step"):
+                        await chat_mutator.mutate(
+                            AppendToTaskMessageGroupMutation(
+                                message_group_id=message_group_id,
+                                task_delta=string_deltas["next_step"],
                             )
+                        )
 
-                        if "thinking_process" in arguments_dict:
-                            await chat_mutator.mutate(
-                                SetAnalysisMessageGroupMutation(
-                                    message_group_id=message_group_id,
-                                    analysis=arguments_dict["thinking_process"],
-                                )
+                    if string_deltas.get("thinking_process"):
+                        await chat_mutator.mutate(
+                            AppendToAnalysisMessageGroupMutation(
+                                message_group_id=message_group_id,
+                                analysis_delta=string_deltas["thinking_process"],
                             )
+                        )
                 if not tool_calls:
                     analysis = gpt_executor.partial_response.choices[0].message.content
 
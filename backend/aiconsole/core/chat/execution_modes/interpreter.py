@@ -14,7 +14,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
 import logging
 import traceback
 from datetime import datetime
@@ -33,6 +32,7 @@ from aiconsole.core.chat.chat_mutations import (
     CreateMessageMutation,
     CreateToolCallMutation,
     SetContentMessageMutation,
+    SetExecutionStatusToolCallMutation,
     SetIsExecutingToolCallMutation,
     SetLanguageToolCallMutation,
     SetOutputToolCallMutation,
@@ -150,16 +150,43 @@ async def _run_code(context: ProcessChatContext, tool_call_id):
             )
         )
 
+        await context.chat_mutator.mutate(
+            SetExecutionStatusToolCallMutation(
+                tool_call_id=tool_call_id,
+                execution_status=None,
+            )
+        )
+
         try:
             context.rendered_materials
 
-            async for token in get_code_interpreter(tool_call.language).run(tool_call.code, context.materials):
+            code_interpreter = get_code_interpreter(tool_call.language, context.chat_mutator.chat.id)
+
+            async for token in code_interpreter.run(tool_call.code, context.materials):
                 await context.chat_mutator.mutate(
                     AppendToOutputToolCallMutation(
                         tool_call_id=tool_call_id,
                         output_delta=token,
                     )
                 )
+
+            status = code_interpreter.last_status
+
+            if status and status.message:
+                # In the output, so the agent knows why the code has not finished and can carry on
+                await context.chat_mutator.mutate(
+                    AppendToOutputToolCallMutation(
+                        tool_call_id=tool_call_id,
+                        output_delta=f"\n{status.message}\n",
+                    )
+                )
+
+            await context.chat_mutator.mutate(
+                SetExecutionStatusToolCallMutation(
+                    tool_call_id=tool_call_id,
+                    execution_status=status,
+                )
+            )
         except Exception:
             await ErrorServerMessage(error=traceback.format_exc().strip()).send_to_chat(context.chat_mutator.chat.id)
             await context.chat_mutator.mutate(
@@ -205,6 +232,7 @@ async def _generate_response(
                 ],
                 min_tokens=250,
                 preferred_tokens=2000,
+                caller=f"interpreter/{context.agent.id}",
             )
         ):
             if chunk == CLEAR_STR:
@@ -292,57 +320,39 @@ async def _generate_response(
                                 )
                             )
 
-                    if function_call.arguments:
-                        if function_call.name not in [python.__name__, applescript.__name__]:
+                    # Only what came in since the previous chunk, arguments are never re-parsed as a whole
+                    arguments_delta, string_deltas = function_call.pop_arguments_deltas()
+
+                    if function_call.name not in [python.__name__, applescript.__name__]:
+                        if arguments_delta:
                             if tool_call_data.language is None:
                                 await send_language_if_needed("python")
 
                                 _log.info(f"function_call: {function_call}")
-                                _log.info(f"function_call.arguments: {function_call.arguments}")
-
-                                code_delta = f"{function_call.name}(**"
-                                await send_code_delta(code_delta)
-                                tool_call_data.end_with_code = ")"
-                            else:
-                                code_delta = function_call.arguments[len(tool_call_data.code) :]
-                                tool_call_data.code = function_call.arguments
-                                await send_code_delta(code_delta)
-                        else:
-                            arguments = function_call.arguments
-                            languages = language_map.keys()
-
-                            if tool_call_data.language is None and function_call.name in languages:
-                                # Languge is in the name of the function call
-                                await send_language_if_needed(cast(LanguageStr, function_call.name))
-
-                            # This can now be both a string and a json object
-                            try:
-                                arguments = json.loads(arguments)
-
-                                code_delta = ""
-                                headline_delta = ""
-
-                                if arguments and "code" in arguments:
-                                    await send_language_if_needed("python")
-
-                                    code_delta = arguments["code"][len(tool_call_data.code) :]
-                                    tool_call_data.code = arguments["code"]
-
-                                if arguments and "headline" in arguments:
-                                    headline_delta = arguments["headline"][len(tool_call_data.headline) :]
-                                    tool_call_data.headline = arguments["headline"]
-
-                                if code_delta or headline_delta:
-                                    await send_code_delta(code_delta, headline_delta)
-                            except json.JSONDecodeError:
-                                # We need to handle incorrect OpenAI responses, sometmes arguments is a string containing the code
-                                if arguments and not arguments.startswith("{"):
-                                    await send_language_if_needed("python")
-
-                                    code_delta = arguments[len(tool_call_data.code) :]
-                                    tool_call_data.code = arguments
-
-                                    await send_code_delta(code_delta)
+
+                                await send_code_delta(f"{function_call.name}(**")
+                                tools_requiring_closing_parenthesis.append(tool_call.id)
+
+                            await send_code_delta(arguments_delta)
+                    else:
+                        languages = language_map.keys()
+
+                        if tool_call_data.language is None and function_call.name in languages:
+                            # Languge is in the name of the function call
+                            await send_language_if_needed(cast(LanguageStr, function_call.name))
+
+                        if function_call.arguments_are_json:
+                            code_delta = string_deltas.get("code", "")
+                            headline_delta = string_deltas.get("headline", "")
+
+                            if code_delta:
+                                await send_language_if_needed("python")
+
+                            await send_code_delta(code_delta, headline_delta)
+                        elif arguments_delta and function_call.arguments_are_json is False:
+                            # Sometimes OpenAI sends the code itself instead of a JSON object
+                            await send_language_if_needed("python")
+                            await send_code_delta(arguments_delta)
 
     finally:
         for tool_id in tools_requiring_closing_parenthesis:
@@ -111,6 +111,7 @@ async def execution_mode_process(
             ),
             min_tokens=250,
             preferred_tokens=2000,
+            caller=f"normal/{context.agent.id}",
         )
     ):
         if chunk == CLEAR_STR:
@@ -0,0 +1,40 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+def get_chat_name(data: dict) -> str:
+    """
+    Name of a chat from its raw (possibly old format) json data.
+    """
+
+    if "name" in data and data["name"]:
+        return data["name"]
+
+    if "headline" in data and data["headline"]:
+        return data["headline"]
+
+    if "title" in data and data["title"]:
+        return data["title"]
+
+    for group in data.get("message_groups") or []:
+        if "messages" in group and group["messages"]:
+            for msg in group["messages"]:
+                return msg.get("content") or "New Chat"
+
+    for msg in data.get("messages") or []:
+        return msg.get("content") or "New Chat"
+
+    return "New Chat"
@@ -20,6 +20,8 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 
+from aiconsole.core.chat.chat_journal import get_chat_journal
+from aiconsole.core.chat.get_chat_name import get_chat_name
 from aiconsole.core.chat.types import Chat
 from aiconsole.core.project.paths import get_history_directory
 
@@ -88,20 +90,7 @@ async def load_chat_history(id: str, project_path: Path | None = None) -> Chat:
                 if "analysis" not in group:
                     group["analysis"] = ""
 
-            if "name" not in data or not data["name"]:
-                if "headline" in data and data["headline"]:
-                    data["name"] = data["headline"]
-                elif "title" in data and data["title"]:
-                    data["name"] = data["title"]
-                else:
-
-                    def extract_default_headline():
-                        for group in data["message_groups"]:
-                            if "messages" in group and group["messages"]:
-                                for msg in group["messages"]:
-                                    return msg.get("content")
-
-                    data["name"] = extract_default_headline() or "New Chat"
+            data["name"] = get_chat_name(data)
 
             if "id" in data:
                 del data["id"]
@@ -109,6 +98,15 @@ async def load_chat_history(id: str, project_path: Path | None = None) -> Chat:
             if "last_modified" in data:
                 del data["last_modified"]
 
-            return Chat(id=id, last_modified=datetime.fromtimestamp(os.path.getmtime(file_path)), **data)
+            chat = Chat(id=id, last_modified=datetime.fromtimestamp(os.path.getmtime(file_path)), **data)
     else:
-        return Chat(id=id, name="New Chat", title_edited=False, last_modified=datetime.now(), message_groups=[])
+        chat = Chat(id=id, name="New Chat", title_edited=False, last_modified=datetime.now(), message_groups=[])
+
+    # The snapshot might be behind, bring it up to date with the mutations journaled since it was written
+    journal = get_chat_journal(id, project_path)
+    chat = journal.replay(chat)
+
+    if journal.path.exists():
+        chat.last_modified = max(chat.last_modified, datetime.fromtimestamp(os.path.getmtime(journal.path)))
+
+    return chat
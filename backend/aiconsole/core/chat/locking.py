@@ -6,9 +6,14 @@ from fastapi import HTTPException
 
 from aiconsole.api.websockets.connection_manager import AICConnection
 from aiconsole.api.websockets.server_messages import (
+    ChatMutationAcknowledgedServerMessage,
     NotifyAboutChatMutationServerMessage,
 )
 from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_cache import chat_cache
+from aiconsole.core.chat.chat_journal import get_chat_journal
+from aiconsole.core.chat.chat_mutation_buffer import chat_mutation_buffer
+from aiconsole.core.chat.chat_mutation_coalescer import ChatMutationCoalescer
 from aiconsole.core.chat.chat_mutations import (
     ChatMutation,
     LockAcquiredMutation,
@@ -16,7 +21,6 @@ from aiconsole.core.chat.chat_mutations import (
 )
 from aiconsole.core.chat.chat_mutator import ChatMutator
 from aiconsole.core.chat.load_chat_history import load_chat_history
-from aiconsole.core.chat.save_chat_history import save_chat_history
 from aiconsole.core.chat.types import Chat
 
 chats: Dict[str, Chat] = {}
@@ -29,6 +33,53 @@ import logging
 _log = logging.getLogger(__name__)
 
 
+async def _publish_mutation(
+    chat_id: str, request_id: str, source_connection: AICConnection | None, mutation: ChatMutation
+) -> None:
+    seq = None
+
+    if chat_id in chats:
+        get_chat_journal(chat_id).append(chats[chat_id], mutation)
+        seq = chats[chat_id].mutation_seq
+        chat_mutation_buffer.append(chat_id, seq, request_id, mutation)
+
+    # when a server receives a mutation it should send it out to every connection except the one it came from
+    await NotifyAboutChatMutationServerMessage(
+        request_id=request_id,
+        chat_id=chat_id,
+        mutation=mutation,
+        seq=seq,
+    ).send_to_chat(chat_id, source_connection)
+
+    # The one it came from has applied it already, but needs its seq not to get it again when catching up
+    if source_connection is not None and seq is not None:
+        await ChatMutationAcknowledgedServerMessage(
+            request_id=request_id,
+            chat_id=chat_id,
+            seq=seq,
+        ).send_to_connection(source_connection)
+
+
+_coalescer = ChatMutationCoalescer(_publish_mutation)
+
+
+async def flush_chat_mutations(chat_id: str) -> None:
+    """
+    Send out the streamed mutations of a chat which are still held back for merging.
+    """
+    await _coalescer.flush(chat_id)
+
+
+def get_loaded_chat(chat_id: str) -> Chat | None:
+    """
+    The chat as it is in memory, possibly locked and being mutated. None if it has to be loaded from disk.
+    """
+    if chat_id in chats:
+        return chats[chat_id]
+
+    return chat_cache.get(chat_id)
+
+
 async def wait_for_lock(chat_id: str) -> None:
     try:
         _log.debug(f"Waiting for lock {chat_id}")
@@ -40,7 +91,9 @@ async def wait_for_lock(chat_id: str) -> None:
 async def acquire_lock(chat_id: str, request_id: str, skip_mutating_clients: bool = False):
     _log.debug(f"Acquiring lock {chat_id} {request_id}")
     if chat_id not in chats:
-        chat_history = await load_chat_history(chat_id)
+        chat_history = chat_cache.get(chat_id)
+        if chat_history is None:
+            chat_history = await load_chat_history(chat_id)
         chat_history.lock_id = None
         chats[chat_id] = chat_history
 
@@ -53,7 +106,10 @@ async def acquire_lock(chat_id: str, request_id: str, skip_mutating_clients: boo
 
     if not skip_mutating_clients:
         await NotifyAboutChatMutationServerMessage(
-            request_id=request_id, chat_id=chat_id, mutation=LockAcquiredMutation(lock_id=request_id)
+            request_id=request_id,
+            chat_id=chat_id,
+            mutation=LockAcquiredMutation(lock_id=request_id),
+            seq=chats[chat_id].mutation_seq,
         ).send_to_chat(chat_id)
 
     return chats[chat_id]
@@ -61,13 +117,20 @@ async def acquire_lock(chat_id: str, request_id: str, skip_mutating_clients: boo
 
 async def release_lock(chat_id: str, request_id: str) -> None:
     if chat_id in chats and chats[chat_id].lock_id == request_id:
-        chats[chat_id].lock_id = None
-        save_chat_history(chats[chat_id])
-        del chats[chat_id]
+        await flush_chat_mutations(chat_id)
+
+        chat = chats.pop(chat_id)
+        _coalescer.forget(chat_id)
+        chat.lock_id = None
+        get_chat_journal(chat_id).release(chat)
+        chat_cache.put(chat)
         lock_events[chat_id].set()
 
         await NotifyAboutChatMutationServerMessage(
-            request_id=request_id, chat_id=chat_id, mutation=LockReleasedMutation(lock_id=request_id)
+            request_id=request_id,
+            chat_id=chat_id,
+            mutation=LockReleasedMutation(lock_id=request_id),
+            seq=chat.mutation_seq,
         ).send_to_chat(chat_id)
 
 
@@ -88,10 +151,7 @@ class DefaultChatMutator(ChatMutator):
             )
 
         apply_mutation(self.chat, mutation)
+        chat_cache.grow(self.chat_id, mutation)
 
-        # when a server receives a mutation it should send it out to every connection except the one it came from
-        await NotifyAboutChatMutationServerMessage(
-            request_id=self.request_id,
-            chat_id=self.chat_id,
-            mutation=mutation,
-        ).send_to_chat(self.chat_id, self.connection)
+        # Streamed appends are merged before being journaled and broadcast, everything else goes out right away
+        await _coalescer.submit(self.chat_id, self.request_id, self.connection, mutation)
@@ -17,6 +17,7 @@
 import json
 import os
 
+from aiconsole.core.chat.chat_headlines_index import get_chat_headlines_index
 from aiconsole.core.chat.types import Chat
 from aiconsole.core.project.paths import get_history_directory
 
@@ -33,3 +34,5 @@ def save_chat_history(chat: Chat):
         os.makedirs(history_directory, exist_ok=True)
         with open(file_path, "w") as f:
             json.dump(chat.model_dump(exclude={"id", "last_modified"}), f, indent=4)
+
+    get_chat_headlines_index().update(chat)
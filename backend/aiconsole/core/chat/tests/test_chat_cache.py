@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from aiconsole.core.chat.chat_cache import ChatCache
+from aiconsole.core.chat.chat_mutations import AppendToContentMessageMutation
+from aiconsole.core.chat.types import Chat
+
+
+def _chat(chat_id: str, lock_id: str | None = None) -> Chat:
+    return Chat(id=chat_id, name=chat_id * 10, last_modified=datetime.now(), message_groups=[], lock_id=lock_id)
+
+
+def test_should_evict_least_recently_used_chat():
+    cache = ChatCache(max_chats=2)
+
+    cache.put(_chat("a"))
+    cache.put(_chat("b"))
+    cache.get("a")
+    cache.put(_chat("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_should_evict_by_size_but_keep_locked_chats():
+    cache = ChatCache(max_bytes=25)
+
+    cache.put(_chat("a", lock_id="request"))
+    cache.put(_chat("b"))
+    cache.put(_chat("c"))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_should_track_size_of_mutated_chat():
+    cache = ChatCache()
+    chat = _chat("a", lock_id="request")
+
+    cache.put(chat)
+    size = cache.stats()["bytes"]
+
+    cache.grow("a", AppendToContentMessageMutation(message_id="m", content_delta="x" * 100))
+    chat.lock_id = None
+    cache.put(chat)
+
+    # Not measured again, as the mutation was not actually applied to the chat
+    assert cache.stats()["bytes"] == size + 100
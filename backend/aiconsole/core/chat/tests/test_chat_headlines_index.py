@@ -0,0 +1,40 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.chat_headlines_index import ChatHeadlinesIndex
+
+
+def _write_chat(project_path: Path, chat_id: str, name: str, mtime: float):
+    file_path = project_path / "chats" / f"{chat_id}.json"
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(json.dumps({"name": name, "message_groups": []}))
+    os.utime(file_path, (mtime, mtime))
+
+
+@pytest.fixture
+def project_path(tmp_path: Path) -> Path:
+    _write_chat(tmp_path, "a", "First", 1000)
+    _write_chat(tmp_path, "b", "Second", 2000)
+    _write_chat(tmp_path, "c", "Third", 3000)
+    return tmp_path
+
+
+def test_should_list_headlines_sorted_and_paginated(project_path: Path):
+    index = ChatHeadlinesIndex(project_path)
+
+    assert [headline.id for headline in index.headlines()] == ["c", "b", "a"]
+    assert [headline.name for headline in index.headlines(offset=1, limit=1)] == ["Second"]
+
+
+def test_should_pick_up_chat_files_changed_on_disk(project_path: Path):
+    ChatHeadlinesIndex(project_path).headlines()
+
+    _write_chat(project_path, "a", "Renamed", 4000)
+    (project_path / "chats" / "b.json").unlink()
+
+    index = ChatHeadlinesIndex(project_path)
+
+    assert [(headline.id, headline.name) for headline in index.headlines()] == [("a", "Renamed"), ("c", "Third")]
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_mutations import (
+    AppendToCodeToolCallMutation,
+    AppendToContentMessageMutation,
+    CreateMessageGroupMutation,
+    CreateMessageMutation,
+    CreateToolCallMutation,
+    DeleteMessageGroupMutation,
+)
+from aiconsole.core.chat.types import Chat
+
+MUTATIONS = 1000
+
+
+def _chat_with_messages(length: int) -> Chat:
+    chat = Chat(id="chat", name="", last_modified=datetime.now(), message_groups=[])
+
+    for i in range(length):
+        apply_mutation(
+            chat,
+            CreateMessageGroupMutation(
+                message_group_id=f"group_{i}",
+                agent_id="assistant",
+                username="",
+                email="",
+                role="assistant",
+                task="",
+                materials_ids=[],
+                analysis="",
+            ),
+        )
+        apply_mutation(
+            chat,
+            CreateMessageMutation(message_group_id=f"group_{i}", message_id=f"message_{i}", timestamp="", content=""),
+        )
+        apply_mutation(
+            chat,
+            CreateToolCallMutation(
+                message_id=f"message_{i}",
+                tool_call_id=f"tool_call_{i}",
+                code="",
+                language="python",
+                headline="",
+                output=None,
+            ),
+        )
+
+    return chat
+
+
+def test_should_stream_mutations_without_reindexing(monkeypatch):
+    chat = _chat_with_messages(500)
+    reindex = Chat.reindex
+    reindexes = 0
+
+    def counting_reindex(self):
+        nonlocal reindexes
+        reindexes += 1
+        reindex(self)
+
+    monkeypatch.setattr(Chat, "reindex", counting_reindex)
+
+    for _ in range(MUTATIONS):
+        apply_mutation(chat, AppendToContentMessageMutation(message_id="message_499", content_delta="x"))
+        apply_mutation(chat, AppendToCodeToolCallMutation(tool_call_id="tool_call_499", code_delta="x"))
+
+    # Every lookup is an index hit, a miss would go over the whole chat
+    assert reindexes == 0
+    assert chat.message_groups[-1].messages[0].content == "x" * MUTATIONS
+    assert chat.message_groups[-1].messages[0].tool_calls[0].code == "x" * MUTATIONS
+
+
+def test_should_reindex_chat_built_without_apply_mutation():
+    chat = _chat_with_messages(3)
+    copy = Chat.model_validate(chat.model_dump())
+
+    assert copy.get_tool_call_location("tool_call_2").message.id == "message_2"
+
+
+def test_should_keep_indexes_consistent_through_deletes():
+    chat = _chat_with_messages(3)
+
+    apply_mutation(chat, DeleteMessageGroupMutation(message_group_id="group_1"))
+
+    assert chat.get_message_group("group_1") is None
+    assert chat.get_message_location("message_1") is None
+    assert chat.get_tool_call_location("tool_call_1") is None
+    assert chat.get_tool_call_location("tool_call_2").message_group.id == "group_2"
@@ -0,0 +1,65 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.chat.apply_mutation import apply_mutation
+from aiconsole.core.chat.chat_journal import get_chat_journal
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    CreateMessageGroupMutation,
+    CreateMessageMutation,
+)
+from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.types import Chat
+
+
+def _mutate(chat: Chat, project_path: Path):
+    journal = get_chat_journal(chat.id, project_path)
+
+    for mutation in [
+        CreateMessageGroupMutation(
+            message_group_id="g",
+            agent_id="assistant",
+            username="",
+            email="",
+            role="assistant",
+            task="",
+            materials_ids=[],
+            analysis="",
+        ),
+        CreateMessageMutation(message_group_id="g", message_id="m", timestamp="", content="Hello"),
+        AppendToContentMessageMutation(message_id="m", content_delta=" world"),
+    ]:
+        apply_mutation(chat, mutation)
+        journal.append(chat, mutation)
+
+    return journal
+
+
+@pytest.mark.asyncio
+async def test_should_replay_journal_without_snapshot(tmp_path: Path):
+    chat = Chat(id="c", name="New Chat", last_modified=datetime.now(), message_groups=[])
+    _mutate(chat, tmp_path)
+
+    loaded = await load_chat_history("c", tmp_path)
+
+    assert loaded.mutation_seq == 3
+    assert loaded.message_groups[0].messages[0].content == "Hello world"
+
+
+@pytest.mark.asyncio
+async def test_should_compact_journal_into_snapshot_on_release(tmp_path: Path):
+    chat = Chat(id="c", name="New Chat", last_modified=datetime.now(), message_groups=[])
+    journal = _mutate(chat, tmp_path)
+
+    journal.release(chat)
+    await journal._compaction
+
+    assert journal.snapshot_path.exists()
+    assert not journal.path.exists()
+
+    loaded = await load_chat_history("c", tmp_path)
+
+    assert loaded.mutation_seq == 3
+    assert loaded.message_groups[0].messages[0].content == "Hello world"
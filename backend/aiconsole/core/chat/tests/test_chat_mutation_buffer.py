@@ -0,0 +1,27 @@
+from aiconsole.core.chat.chat_mutation_buffer import ChatMutationBuffer
+from aiconsole.core.chat.chat_mutations import SetIsAnalysisInProgressMutation
+
+
+def _buffer_with(seqs: range, size: int) -> ChatMutationBuffer:
+    buffer = ChatMutationBuffer(size=size)
+
+    for seq in seqs:
+        buffer.append("chat", seq, "request", SetIsAnalysisInProgressMutation(is_analysis_in_progress=seq % 2 == 0))
+
+    return buffer
+
+
+def test_should_return_only_missed_mutations():
+    buffer = _buffer_with(range(1, 11), size=5)
+
+    assert [mutation.seq for mutation in buffer.since("chat", 7, 10)] == [8, 9, 10]
+    assert [mutation.seq for mutation in buffer.since("chat", 5, 10)] == [6, 7, 8, 9, 10]
+    assert buffer.since("chat", 10, 10) == []
+
+
+def test_should_fall_back_to_snapshot_when_overrun():
+    buffer = _buffer_with(range(1, 11), size=5)
+
+    assert buffer.since("chat", 4, 10) is None
+    assert buffer.since("chat", 11, 10) is None
+    assert buffer.since("other_chat", 4, 10) is None
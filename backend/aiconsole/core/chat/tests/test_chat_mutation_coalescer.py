@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from aiconsole.core.chat.chat_mutation_coalescer import ChatMutationCoalescer
+from aiconsole.core.chat.chat_mutations import (
+    AppendToContentMessageMutation,
+    AppendToOutputToolCallMutation,
+    SetIsStreamingMessageMutation,
+)
+
+
+@pytest.fixture
+def published() -> list:
+    return []
+
+
+@pytest.fixture
+def coalescer(published: list) -> ChatMutationCoalescer:
+    async def publish(chat_id, request_id, source_connection, mutation):
+        published.append(mutation)
+
+    return ChatMutationCoalescer(publish, window=0.01, max_chars=10)
+
+
+@pytest.mark.asyncio
+async def test_should_merge_appends_until_a_non_append_mutation(coalescer: ChatMutationCoalescer, published: list):
+    for delta in ["a", "b", "c"]:
+        await coalescer.submit(
+            "chat", "request", None, AppendToContentMessageMutation(message_id="m", content_delta=delta)
+        )
+    await coalescer.submit("chat", "request", None, SetIsStreamingMessageMutation(message_id="m", is_streaming=False))
+
+    assert published == [
+        AppendToContentMessageMutation(message_id="m", content_delta="abc"),
+        SetIsStreamingMessageMutation(message_id="m", is_streaming=False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_should_flush_on_target_change_size_and_time(coalescer: ChatMutationCoalescer, published: list):
+    await coalescer.submit("chat", "request", None, AppendToOutputToolCallMutation(tool_call_id="a", output_delta="1"))
+    await coalescer.submit("chat", "request", None, AppendToOutputToolCallMutation(tool_call_id="b", output_delta="2"))
+    await coalescer.submit(
+        "chat", "request", None, AppendToOutputToolCallMutation(tool_call_id="b", output_delta="3" * 10)
+    )
+
+    assert published == [
+        AppendToOutputToolCallMutation(tool_call_id="a", output_delta="1"),
+        AppendToOutputToolCallMutation(tool_call_id="b", output_delta="2" + "3" * 10),
+    ]
+
+    await coalescer.submit("chat", "request", None, AppendToOutputToolCallMutation(tool_call_id="b", output_delta="4"))
+    await asyncio.sleep(0.05)
+
+    assert published[-1] == AppendToOutputToolCallMutation(tool_call_id="b", output_delta="4")
+
+
+@pytest.mark.asyncio
+async def test_should_flush_after_flushes_in_progress():
+    published = []
+    publishing = asyncio.Event()
+
+    async def slow_publish(chat_id, request_id, source_connection, mutation):
+        publishing.set()
+        await asyncio.sleep(0.05)
+        published.append(mutation)
+
+    coalescer = ChatMutationCoalescer(slow_publish, window=0.01, max_chars=10)
+    await coalescer.submit("chat", "request", None, AppendToContentMessageMutation(message_id="m", content_delta="a"))
+
+    # The window has passed and its flush is publishing
+    await publishing.wait()
+    await coalescer.flush("chat")
+
+    assert published == [AppendToContentMessageMutation(message_id="m", content_delta="a")]
+
+    coalescer.forget("chat")
+    assert not coalescer._publish_locks
@@ -0,0 +1,58 @@
+from aiconsole.core.chat.types import AICMessage, AICToolCall
+from aiconsole.utils.text_builder import TextBuilder
+
+
+def test_should_join_appended_chunks_lazily():
+    builder = TextBuilder()
+
+    assert builder.value is None
+
+    for delta in ["a", "b", "c"]:
+        builder.append(delta)
+
+    assert len(builder) == 3
+    assert builder.value == "abc"
+    assert builder == TextBuilder("abc")
+
+
+def test_should_keep_text_fields_behaving_like_str_fields():
+    message = AICMessage(
+        id="m", timestamp="", content="Hello", tool_calls=[AICToolCall(id="t", code="print(1)", headline="")]
+    )
+
+    message.append_text("content", " world")
+    message.tool_calls[0].append_text("output", "1\n")
+    message.tool_calls[0].code = "print(2)"
+
+    assert message.content == "Hello world"
+    assert message.model_dump()["tool_calls"][0] == {
+        "id": "t",
+        "language": None,
+        "code": "print(2)",
+        "headline": "",
+        "output": "1\n",
+        "is_streaming": False,
+        "is_executing": False,
+        "execution_status": None,
+    }
+    assert AICMessage.model_validate(message.model_dump()) == message
+
+
+def test_should_copy_text_fields():
+    tool_call = AICToolCall(id="t", code="a", headline="")
+
+    copy = tool_call.model_copy()
+    copy.append_text("code", "b")
+    updated = tool_call.model_copy(update={"code": "c", "headline": "h"}, deep=True)
+
+    assert tool_call.code == "a"
+    assert copy.code == "ab"
+    assert (updated.code, updated.headline) == ("c", "h")
+
+
+def test_should_describe_text_fields_as_required_str_fields():
+    schema = AICToolCall.model_json_schema()
+
+    assert schema["properties"]["code"] == {"title": "Code", "type": "string"}
+    assert "code" in schema["required"]
+    assert "output" not in schema["required"]
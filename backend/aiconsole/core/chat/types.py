@@ -17,46 +17,67 @@
 from dataclasses import dataclass
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, PrivateAttr, computed_field, model_validator
 
 from aiconsole.core.assets.asset import EditableObject
+from aiconsole.core.code_running.code_interpreters.execution_limits import (
+    ExecutionStatus,
+)
 from aiconsole.core.code_running.code_interpreters.language import LanguageStr
 from aiconsole.core.gpt.types import GPTRole
+from aiconsole.utils.text_builder import (
+    TextBuilder,
+    TextBuildersModel,
+    text_property,
+)
 
 
-class AICToolCall(BaseModel):
+class AICToolCall(TextBuildersModel):
     id: str
     language: LanguageStr | None = None
-    code: str
     headline: str
-    output: str | None = None
 
     is_streaming: bool = False
     is_executing: bool = False
+    # How the last execution ended, None if it has not been executed yet
+    execution_status: ExecutionStatus | None = None
 
+    text_fields = {"code": False, "output": True}
+    _code: TextBuilder = PrivateAttr(default_factory=lambda: TextBuilder(""))
+    _output: TextBuilder = PrivateAttr(default_factory=TextBuilder)
+    code = computed_field(text_property("code"), return_type=str)
+    output = computed_field(text_property("output"), return_type=str | None)
 
-class AICMessage(BaseModel):
+
+class AICMessage(TextBuildersModel):
     id: str
     timestamp: str
-    content: str
     tool_calls: list[AICToolCall]
 
     is_streaming: bool = False
 
+    text_fields = {"content": False}
+    _content: TextBuilder = PrivateAttr(default_factory=lambda: TextBuilder(""))
+    content = computed_field(text_property("content"), return_type=str)
+
 
-class AICMessageGroup(BaseModel):
+class AICMessageGroup(TextBuildersModel):
     id: str
     agent_id: str
     username: str | None = None
     email: str | None = None
     role: GPTRole
-    analysis: str
-    task: str
     agent_id: str
     materials_ids: list[str]
     role: GPTRole
     messages: list[AICMessage]
 
+    text_fields = {"analysis": False, "task": False}
+    _analysis: TextBuilder = PrivateAttr(default_factory=lambda: TextBuilder(""))
+    _task: TextBuilder = PrivateAttr(default_factory=lambda: TextBuilder(""))
+    analysis = computed_field(text_property("analysis"), return_type=str)
+    task = computed_field(text_property("task"), return_type=str)
+
     @model_validator(mode="after")
     def set_default_username(self):
         from aiconsole.core.settings.project_settings import get_aiconsole_settings
@@ -101,29 +122,71 @@ class Chat(ChatHeadline):
     title_edited: bool = False
     message_groups: list[AICMessageGroup]
     is_analysis_in_progress: bool = False
+    # Sequence number of the last mutation applied to this chat, mutations journaled after it are replayed on load
+    mutation_seq: int = 0
 
     model_config = ConfigDict(json_encoders={datetime: lambda v: v.isoformat()})
 
+    # id -> object indexes, so lookups done for every streamed mutation do not have to scan the whole chat.
+    # Kept up to date by apply_mutation through the index_* / unindex_* methods and rebuilt on a miss.
+    _message_groups_by_id: dict[str, AICMessageGroup] = PrivateAttr(default_factory=dict)
+    _message_locations_by_id: dict[str, AICMessageLocation] = PrivateAttr(default_factory=dict)
+    _tool_call_locations_by_id: dict[str, AICToolCallLocation] = PrivateAttr(default_factory=dict)
+
     def get_message_group(self, message_group_id: str) -> AICMessageGroup | None:
-        for message_group in self.message_groups:
-            if message_group.id == message_group_id:
-                return message_group
-        return None
+        if message_group_id not in self._message_groups_by_id:
+            self.reindex()
+        return self._message_groups_by_id.get(message_group_id)
 
     def get_message_location(self, message_id: str) -> AICMessageLocation | None:
-        for message_group in self.message_groups:
-            for message in message_group.messages:
-                if message.id == message_id:
-                    return AICMessageLocation(message_group=message_group, message=message)
-        return None
+        if message_id not in self._message_locations_by_id:
+            self.reindex()
+        return self._message_locations_by_id.get(message_id)
 
     def get_tool_call_location(self, tool_call_id: str) -> AICToolCallLocation | None:
+        if tool_call_id not in self._tool_call_locations_by_id:
+            self.reindex()
+        return self._tool_call_locations_by_id.get(tool_call_id)
+
+    def reindex(self):
+        self._message_groups_by_id = {}
+        self._message_locations_by_id = {}
+        self._tool_call_locations_by_id = {}
+
         for message_group in self.message_groups:
-            for message in message_group.messages:
-                for tool_call in message.tool_calls:
-                    if tool_call.id == tool_call_id:
-                        return AICToolCallLocation(message_group=message_group, message=message, tool_call=tool_call)
-        return None
+            self.index_message_group(message_group)
+
+    def index_message_group(self, message_group: AICMessageGroup):
+        self._message_groups_by_id[message_group.id] = message_group
+
+        for message in message_group.messages:
+            self.index_message(message_group, message)
+
+    def index_message(self, message_group: AICMessageGroup, message: AICMessage):
+        self._message_locations_by_id[message.id] = AICMessageLocation(message_group=message_group, message=message)
+
+        for tool_call in message.tool_calls:
+            self.index_tool_call(message_group, message, tool_call)
+
+    def index_tool_call(self, message_group: AICMessageGroup, message: AICMessage, tool_call: AICToolCall):
+        self._tool_call_locations_by_id[tool_call.id] = AICToolCallLocation(
+            message_group=message_group, message=message, tool_call=tool_call
+        )
+
+    def unindex_message_group(self, message_group: AICMessageGroup):
+        self._message_groups_by_id.pop(message_group.id, None)
+
+        for message in message_group.messages:
+            self.unindex_message(message)
+
+    def unindex_message(self, message: AICMessage):
+        self._message_locations_by_id.pop(message.id, None)
+
+        for tool_call in message.tool_calls:
+            self.unindex_tool_call(tool_call)
+
+    def unindex_tool_call(self, tool_call: AICToolCall):
+        self._tool_call_locations_by_id.pop(tool_call.id, None)
 
 
 class Command(BaseModel):
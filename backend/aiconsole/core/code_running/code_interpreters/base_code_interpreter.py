@@ -37,14 +37,25 @@ from typing import AsyncGenerator
 
 from aiconsole.core.assets.materials.material import Material
 
+from .execution_limits import ExecutionStatus
+
 
 class BaseCodeInterpreter:
     """
     .run is a generator that yields a dict with attributes: active_line, output
     """
 
+    # Whether code is being run, and when it last was (time.monotonic)
+    running = False
+    last_active = 0.0
+    # How the last run ended, e.g. whether it was stopped by a limit
+    last_status: ExecutionStatus | None = None
+
     async def run(self, code: str, materials: list[Material]) -> AsyncGenerator[str, None]:
         yield "Not implemented"
 
+    def interrupt(self):
+        pass
+
     def terminate(self):
         pass
@@ -0,0 +1,61 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dataclasses import dataclass
+from typing import Literal
+
+from pydantic import BaseModel
+
+from aiconsole.consts import (
+    CODE_EXECUTION_CPU_LIMIT_S,
+    CODE_EXECUTION_INTERRUPT_GRACE_S,
+    CODE_EXECUTION_MEMORY_LIMIT_BYTES,
+    CODE_EXECUTION_TIMEOUT_S,
+)
+
+ExecutionState = Literal["completed", "timed_out", "cpu_limit_exceeded", "interrupted"]
+
+
+@dataclass
+class ExecutionLimits:
+    wall_s: float | None = CODE_EXECUTION_TIMEOUT_S
+    cpu_s: float | None = CODE_EXECUTION_CPU_LIMIT_S
+    # Address space of the interpreter process, applied when it starts (Linux only)
+    memory_bytes: int | None = CODE_EXECUTION_MEMORY_LIMIT_BYTES
+    # How long stopped code gets to handle the interrupt before its process is killed
+    interrupt_grace_s: float = CODE_EXECUTION_INTERRUPT_GRACE_S
+
+
+class ExecutionStatus(BaseModel):
+    state: ExecutionState
+    duration_s: float
+    cpu_s: float | None = None
+    # The process had to be killed, so the state of the interpreter (variables, imports) is lost
+    killed: bool = False
+
+    @property
+    def message(self) -> str | None:
+        reason = {
+            "completed": None,
+            "timed_out": f"Execution timed out after {self.duration_s:.0f}s and was stopped.",
+            "cpu_limit_exceeded": "Execution used more than its CPU time limit and was stopped.",
+            "interrupted": "Execution was interrupted.",
+        }[self.state]
+
+        if reason and self.killed:
+            reason += " The interpreter was restarted, so its previous state (variables, imports) is lost."
+
+        return reason
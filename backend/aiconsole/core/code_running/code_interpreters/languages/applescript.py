@@ -64,7 +64,7 @@ class AppleScript(SubprocessCodeInterpreter):
         code = "osascript -e " + code
 
         # Append end of execution indicator
-        code += '; echo "## end_of_execution ##"'
+        code += '; echo "## end_of_execution ##"; echo "## end_of_execution ##" >&2'
 
         return code
 
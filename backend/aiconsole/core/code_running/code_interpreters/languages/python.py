@@ -33,39 +33,67 @@
 #
 
 import ast
+import hashlib
 import logging
 import re
 
 from aiconsole.core.assets.materials.material import Material
 
+from ..execution_limits import ExecutionLimits
 from ..subprocess_code_interpreter import SubprocessCodeInterpreter
 
 _log = logging.getLogger(__name__)
 
+_PROMPTS = re.compile(r"^(\s*(>>>|\.\.\.) ?)+")
+
+# To both streams, so the interpreter knows when it has read all of the output
+_PRINT_END_OF_EXECUTION = (
+    'import sys; print("## end_of_execution ##"); print("## end_of_execution ##", file=sys.stderr)'
+)
+
+# Followed by the id of an API material which failed to load, so it is loaded again by the next run
+_MATERIAL_NOT_LOADED = "## material_not_loaded ##"
+
 
 class Python(SubprocessCodeInterpreter):
     file_extension = "py"
     proper_name = "Python"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, limits: ExecutionLimits | None = None):
+        super().__init__(limits)
         self.start_cmd = "python -i -q -u"
+        # API materials loaded into the process, by id, with hashes of their content. Recorded when the code loading
+        # them is made, and removed again when the process reports that loading one failed
+        self.loaded_materials: dict[str, str] = {}
+
+    async def start_process(self):
+        await super().start_process()
+        self.loaded_materials = {}
 
     def preprocess_code(self, code: str, materials: list[Material]):
-        return preprocess_python(code, materials)
+        return preprocess_python(code, materials, self.loaded_materials)
 
     def line_postprocessor(self, line):
-        if re.match(r"^(\s*>>>\s*|\s*\.\.\.\s*)", line):
+        # Prompts of the interactive interpreter go to stderr without a newline, in front of the next line there
+        line = _PROMPTS.sub("", line)
+
+        if not line.strip():
+            return None
+
+        if line.startswith(_MATERIAL_NOT_LOADED):
+            self.loaded_materials.pop(line[len(_MATERIAL_NOT_LOADED) :].strip(), None)
             return None
+
         return line
 
     def detect_end_of_execution(self, line):
         return "## end_of_execution ##" in line
 
 
-def preprocess_python(code: str, materials: list[Material]):
+def preprocess_python(code: str, materials: list[Material], loaded_materials: dict[str, str]):
     """
     Add active line markers
+    Load the API materials not loaded yet, loaded_materials maps ids of those which are to their content hashes
     Wrap in a try except
     Add end of execution marker
     """
@@ -91,21 +119,28 @@ def preprocess_python(code: str, materials: list[Material]):
             f"SyntaxError: {e.msg}\n"
         )
 
-        return f"print(f'''{msg_for_user}''')\nprint('## end_of_execution ##')"
+        return f"print(f'''{msg_for_user}''')\n{_PRINT_END_OF_EXECUTION}"
+
+    api_lines = []
+    # Loaded in a stable order, as a material may use the names of those loaded before it
+    for material in sorted(materials, key=lambda material: material.id):
+        if material.content_type != "api":
+            continue
 
-    api_materials = [material for material in materials if material.content_type == "api"]
-    apis = [material.inlined_content for material in api_materials]
+        content = material.inlined_content
+        digest = hashlib.sha256(content.encode()).hexdigest()
 
-    parsed_code = ast.parse("\n\n\n".join(apis))
-    parsed_code.body = [b for b in parsed_code.body if not isinstance(b, ast.Expr) or not isinstance(b.value, ast.Str)]
-    apis = ast.unparse(parsed_code)
+        if loaded_materials.get(material.id) != digest:
+            api_lines.extend(_load_material(material.id, content))
+            loaded_materials[material.id] = digest
 
     newline = "\n"
-    api_lines = [line for line in apis.split(newline) if line.strip()]
     code_lines = [line for line in code.split(newline) if line.strip()]
 
     code = f"""
+import sys
 import traceback
+import types
 from aiconsole_toolkit.credentials import MissingCredentialException
 try:
 {newline.join(("    " + line) for line in [*api_lines, *code_lines])}
@@ -115,8 +150,64 @@ except Exception:
     traceback.print_exc()
 
 
-print("## end_of_execution ##")
+{_PRINT_END_OF_EXECUTION}
 
 """.strip()
 
     return code
+
+
+def _load_material(material_id: str, content: str) -> list[str]:
+    """
+    Lines loading an API material into the namespace of the code run, shared by all materials, as if it was written
+    in front of the code, so materials can use each other's names. The names it defines are also made available as the
+    aiconsole_materials.<id> module. A material failing to load is reported, and does not keep the others or the code
+    from running. Values are assigned, as the interactive interpreter would print them otherwise.
+    """
+    name = f"aiconsole_materials.{material_id}"
+
+    return [
+        f"_aic_package = sys.modules.setdefault('aiconsole_materials', types.ModuleType('aiconsole_materials')); "
+        f"_aic_module = sys.modules[{name!r}] = types.ModuleType({name!r})",
+        "try:",
+        f"    exec(compile({content!r}, {f'<material {material_id}>'!r}, 'exec'), globals())",
+        f"    vars(_aic_module).update((k, globals()[k]) for k in {_defined_names(content)!r} if k in globals())",
+        f"    setattr(_aic_package, {material_id!r}, _aic_module)",
+        "except Exception:",
+        f"    del sys.modules[{name!r}]",
+        "    traceback.print_exc()",
+        f"    print({f'{_MATERIAL_NOT_LOADED} {material_id}'!r})",
+        "del _aic_package, _aic_module",
+    ]
+
+
+def _defined_names(content: str) -> list[str]:
+    """
+    Names bound at the top level of the code, outside of functions and classes.
+    """
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return []  # Reported when the material is loaded
+
+    names: list[str] = []
+
+    def visit(node: ast.AST):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.append(node.name)
+            return
+
+        if isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            return
+
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.extend((alias.asname or alias.name).split(".")[0] for alias in node.names if alias.name != "*")
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.append(node.id)
+
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    visit(tree)
+
+    return [name for name in dict.fromkeys(names) if not name.startswith("__")]
@@ -31,32 +31,73 @@
 # This file has been taken and slighly modified from the wonderful project
 # "open-interpreter" by Killian Lucas https://github.com/KillianLucas/open-interpreter
 #
+import asyncio
 import logging
 import os
-import queue
-import subprocess
-import threading
+import signal
+import sys
 import time
 import traceback
 from typing import AsyncGenerator
 
 from aiconsole.core.assets.materials.material import Material
+from aiconsole.core.code_running.process_usage import process_usage
 from aiconsole_toolkit.env import (
     get_current_project_venv_bin_path,
     get_current_project_venv_path,
 )
 
 from .base_code_interpreter import BaseCodeInterpreter
+from .execution_limits import ExecutionLimits, ExecutionState, ExecutionStatus
 
 _log = logging.getLogger(__name__)
 
+# Lines of output can be long (e.g. a printed dataframe), the default limit of asyncio streams is 64 KiB
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+_STREAMS = ("stdout", "stderr")
+
+# How often CPU time of a code run is checked against its limit
+_CPU_CHECK_INTERVAL_S = 0.5
+
+_POSIX = sys.platform != "win32"
+
+# Terminated processes waited for in the background, kept so their tasks are not collected before they are done
+_reaping: set[asyncio.Task] = set()
+
+
+class _EndOfExecution:
+    pass
+
+
+_END_OF_EXECUTION = _EndOfExecution()
+
 
 class SubprocessCodeInterpreter(BaseCodeInterpreter):
-    def __init__(self):
+    """
+    Runs code in a long lived process, streaming its output as it comes.
+
+    preprocess_code appends an end of execution marker written to both stdout and stderr, so once it has been seen on
+    both streams all of the output of the code has been read. The process exiting ends the execution too.
+
+    Code running over its limits is interrupted (SIGINT, so it can clean up), and its process killed if it does not
+    stop within the grace period. The next run then starts a fresh process.
+    """
+
+    def __init__(self, limits: ExecutionLimits | None = None):
         self.start_cmd = ""
-        self.process = None
-        self.output_queue: "queue.Queue[str]" = queue.Queue()
-        self.done = threading.Event()
+        self.limits = limits or ExecutionLimits()
+        self.process: asyncio.subprocess.Process | None = None
+        self.output_queue: asyncio.Queue[str | _EndOfExecution] = asyncio.Queue()
+        self._ended_streams: set[str] = set()
+        self._readers: list[asyncio.Task] = []
+        self._execution_ended = asyncio.Event()
+        self._execution_ended.set()
+        self._killed = False
+        self._stop_reason: ExecutionState | None = None
+        self._stopping: asyncio.Task | None = None
+        # Process id and its CPU time when the current code run started
+        self._cpu_baseline: tuple[int, float] | None = None
 
     def detect_end_of_execution(self, line):
         return None
@@ -66,62 +107,147 @@ class SubprocessCodeInterpreter(BaseCodeInterpreter):
 
     def preprocess_code(self, code, materials: list[Material]):
         """
-        This needs to insert an end_of_execution marker of some kind,
+        This needs to insert an end_of_execution marker of some kind, printed to both stdout and stderr,
         which can be detected by detect_end_of_execution.
 
         Optionally, add active line markers for detect_active_line.
         """
         return code
 
+    @property
+    def has_exited(self) -> bool:
+        # Readers end with the streams of the process, which can be before its exit code is collected
+        return self._killed or any(reader.done() for reader in self._readers)
+
     def terminate(self):
         if self.process:
-            self.process.terminate()
+            self._signal(signal.SIGTERM)
+
+            for reader in self._readers:
+                reader.cancel()
+
+            if self.process.stdin:
+                self.process.stdin.close()
+
+            _reap(self.process)
+
+            self.process = None
+            self._readers = []
         else:
             raise Exception("Process not started")
 
-    def start_process(self):
+    async def start_process(self):
         if self.process:
             self.terminate()
 
-        self.process = subprocess.Popen(
-            self.start_cmd.split(),
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        self.process = await asyncio.create_subprocess_exec(
+            *self.start_cmd.split(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
             env=self._patched_env(),
-            text=True,
-            bufsize=0,
-            universal_newlines=True,
+            limit=_STREAM_LIMIT,
+            # Its own process group, so signals also reach processes started by the code (e.g. shell commands)
+            start_new_session=_POSIX,
         )
-        threading.Thread(target=self.handle_stream_output, args=(self.process.stdout, False), daemon=True).start()
-        threading.Thread(target=self.handle_stream_output, args=(self.process.stderr, True), daemon=True).start()
+        self._killed = False
+        self._execution_ended.set()
+
+        if self.limits.memory_bytes is not None:
+            _limit_memory(self.process.pid, self.limits.memory_bytes)
+
+        # A fresh queue, so readers of a terminated process can not end executions in the new one
+        self.output_queue = asyncio.Queue()
+        self._readers = [
+            asyncio.create_task(self.handle_stream_output(self.process.stdout, "stdout", self.output_queue)),
+            asyncio.create_task(self.handle_stream_output(self.process.stderr, "stderr", self.output_queue)),
+        ]
+
+    def interrupt(self):
+        if sys.platform == "win32":
+            # There is no SIGINT to send to a process without a console
+            self.kill()
+        else:
+            self._signal(signal.SIGINT)
+
+    def kill(self):
+        """
+        Kills the process, ending the current execution. The next run starts a new process.
+        """
+        if not self.process:
+            return
+
+        self._signal(signal.SIGKILL if _POSIX else signal.SIGTERM)
+        self._killed = True
+
+        # Do not wait for the streams to close, processes the code started could still hold them open
+        self.output_queue.put_nowait(_END_OF_EXECUTION)
+        self._execution_ended.set()
 
     async def run(self, code: str, materials: list[Material]) -> AsyncGenerator[str, None]:
+        started_at = time.monotonic()
+        self.running = True
+        self.last_active = started_at
+        self._stop_reason = None
+
+        watchdog = asyncio.create_task(self._watchdog(started_at))
+
+        try:
+            async for output in self._run(code, materials):
+                yield output
+        finally:
+            watchdog.cancel()
+
+            if not self._execution_ended.is_set():
+                # Abandoned while the code is still running, e.g. the chat was stopped
+                self._stop_reason = self._stop_reason or "interrupted"
+                self._stopping = asyncio.create_task(self._stop())
+
+            self.last_status = ExecutionStatus(
+                state=self._stop_reason or "completed",
+                duration_s=time.monotonic() - started_at,
+                cpu_s=self._run_cpu_s(),
+                killed=self._killed,
+            )
+            self.running = False
+            self.last_active = time.monotonic()
+
+    async def _run(self, code: str, materials: list[Material]) -> AsyncGenerator[str, None]:
         retry_count = 0
         max_retries = 3
 
-        # Setup
+        if self._stopping:
+            # An abandoned run is still being stopped
+            await self._stopping
+            self._stopping = None
+
+        # Setup, preprocessing can depend on the state of the process (e.g. what it has loaded already)
         try:
-            code = self.preprocess_code(code, materials)
-            if not self.process:
-                self.start_process()
-        except:  # noqa E722
+            if not self.process or self.has_exited:
+                await self.start_process()
+            preprocessed_code = self.preprocess_code(code, materials)
+        except Exception:  # Not a cancellation, which has to reach the caller
             yield traceback.format_exc()
             return
 
         while retry_count <= max_retries:
-            _log.info(f"Running code:\n{code}\n---")
+            _log.info(f"Running code:\n{preprocessed_code}\n---")
 
-            self.done.clear()
+            # Leftovers of earlier executions, e.g. output of threads they started
+            while not self.output_queue.empty():
+                self.output_queue.get_nowait()
+            self._ended_streams = set()
 
             try:
                 if not self.process or not self.process.stdin:
                     raise Exception("Process not started")
 
-                self.process.stdin.write(code + "\n")
-                self.process.stdin.flush()
+                self._cpu_baseline = self._process_cpu_s()
+                self._execution_ended.clear()
+                self.process.stdin.write((preprocessed_code + "\n").encode())
+                await self.process.stdin.drain()
                 break
-            except:  # noqa E722
+            except Exception:
                 if retry_count != 0:
                     # For UX, I like to hide this if it happens once. Obviously feels better to not see errors
                     # Most of the time it doesn't matter, but we should figure out why it happens frequently with:
@@ -130,7 +256,8 @@ class SubprocessCodeInterpreter(BaseCodeInterpreter):
                     yield f"Retrying... ({retry_count}/{max_retries})"
                     yield "Restarting process."
 
-                self.start_process()
+                await self.start_process()
+                preprocessed_code = self.preprocess_code(code, materials)
 
                 retry_count += 1
                 if retry_count > max_retries:
@@ -138,27 +265,90 @@ class SubprocessCodeInterpreter(BaseCodeInterpreter):
                     return
 
         while True:
-            if not self.output_queue.empty():
-                yield self.output_queue.get()
+            output = await self.output_queue.get()
+
+            if isinstance(output, _EndOfExecution):
+                break
+
+            yield output
+
+    async def _watchdog(self, started_at: float):
+        """
+        Stops the code run once it is over its wall clock or CPU time limit.
+        """
+        wall_s, cpu_s = self.limits.wall_s, self.limits.cpu_s
+
+        while True:
+            now = time.monotonic()
+
+            if wall_s is not None and now - started_at >= wall_s:
+                self._stop_reason = "timed_out"
+                break
+
+            if cpu_s is not None and (self._run_cpu_s() or 0) >= cpu_s:
+                self._stop_reason = "cpu_limit_exceeded"
+                break
+
+            delays = [_CPU_CHECK_INTERVAL_S] if cpu_s is not None else []
+            if wall_s is not None:
+                delays.append(started_at + wall_s - now)
+
+            if not delays:
+                return
+
+            await asyncio.sleep(min(delays))
+
+        _log.info(f"Stopping code run: {self._stop_reason}")
+        await self._stop()
+
+    async def _stop(self):
+        """
+        Interrupts the code run, killing the process if it does not stop within the grace period.
+        """
+        self.interrupt()
+
+        try:
+            await asyncio.wait_for(self._execution_ended.wait(), self.limits.interrupt_grace_s)
+        except asyncio.TimeoutError:
+            _log.info("Code run did not stop when interrupted, killing its process")
+            self.kill()
+
+    def _signal(self, sig: int):
+        if not self.process:
+            return
+
+        try:
+            if _POSIX:
+                os.killpg(self.process.pid, sig)
             else:
-                time.sleep(0.1)
-            try:
-                output = self.output_queue.get(timeout=0.3)  # Waits for 0.3 seconds
-                yield output
-            except queue.Empty:
-                # AIConsole Fix: Added proces.pool check to fix hanging
-                if self.done.is_set() or (self.process and self.process.poll() is not None):
-                    # Try to yank 3 more times from it... maybe there's something in there...
-                    # (I don't know if this actually helps. Maybe we just need to yank 1 more time)
-
-                    for _ in range(3):
-                        if not self.output_queue.empty():
-                            yield self.output_queue.get()
-                        time.sleep(0.2)
-                    break
-
-    def handle_stream_output(self, stream, is_error_stream):
-        for line in iter(stream.readline, ""):
+                self.process.send_signal(sig)
+        except (ProcessLookupError, PermissionError):
+            pass  # Already exited
+
+    def _process_cpu_s(self) -> tuple[int, float] | None:
+        if not self.process:
+            return None
+
+        usage = process_usage(self.process.pid)
+        return (self.process.pid, usage["cpu_s"]) if usage else None
+
+    def _run_cpu_s(self) -> float | None:
+        """
+        CPU time the process has used since the code run started, None where it can not be read. Processes started by
+        the code are not included.
+        """
+        current = self._process_cpu_s()
+
+        if not current or not self._cpu_baseline or current[0] != self._cpu_baseline[0]:
+            return None
+
+        return current[1] - self._cpu_baseline[1]
+
+    async def handle_stream_output(
+        self, stream: asyncio.StreamReader, stream_name: str, output_queue: "asyncio.Queue[str | _EndOfExecution]"
+    ):
+        while line_bytes := await stream.readline():
+            line = line_bytes.decode(errors="replace")
             _log.debug(f"Received output line:\n{line}\n---")
 
             line = self.line_postprocessor(line)
@@ -167,13 +357,22 @@ class SubprocessCodeInterpreter(BaseCodeInterpreter):
                 continue  # `line = None` is the postprocessor's signal to discard completely
 
             if self.detect_end_of_execution(line):
-                self.done.set()
-            elif is_error_stream and "KeyboardInterrupt" in line:
-                self.output_queue.put("KeyboardInterrupt")
-                time.sleep(0.1)
-                self.done.set()
+                self._end_stream(stream_name, output_queue)
             else:
-                self.output_queue.put(line)
+                output_queue.put_nowait(line)
+
+        # The process has exited, nothing more is coming from this stream
+        self._end_stream(stream_name, output_queue)
+
+    def _end_stream(self, stream_name: str, output_queue: "asyncio.Queue[str | _EndOfExecution]"):
+        if stream_name in self._ended_streams:
+            return
+
+        self._ended_streams.add(stream_name)
+
+        if self._ended_streams.issuperset(_STREAMS):
+            output_queue.put_nowait(_END_OF_EXECUTION)
+            self._execution_ended.set()
 
     def _patched_env(self):
         path = os.environ.get("PATH") or ""
@@ -188,3 +387,32 @@ class SubprocessCodeInterpreter(BaseCodeInterpreter):
             # just in case for correct questions about the venv locations and similar
             "VIRTUAL_ENV": str(get_current_project_venv_path()),
         }
+
+
+def _reap(process: asyncio.subprocess.Process):
+    """
+    Collects the exit status of a terminated process, so it does not linger as a zombie.
+    """
+    try:
+        task = asyncio.get_running_loop().create_task(process.wait())
+    except RuntimeError:
+        return  # Its loop is closed, and the process gone along with it
+
+    _reaping.add(task)
+    task.add_done_callback(_reaping.discard)
+
+
+def _limit_memory(pid: int, limit_bytes: int):
+    """
+    Caps the address space of a process, allocations over it fail (MemoryError in Python). Only supported on Linux.
+    """
+    if not sys.platform.startswith("linux"):
+        _log.warning("Memory limits of code runs are only supported on Linux")
+        return
+
+    import resource
+
+    try:
+        resource.prlimit(pid, resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+    except (OSError, ValueError):
+        _log.exception("Could not limit memory of the code interpreter")
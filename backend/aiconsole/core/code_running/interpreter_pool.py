@@ -0,0 +1,160 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Interpreter processes started ahead of time, so the first code run of a chat does not wait for the interpreter to
+start and for the API materials to be imported.
+
+"""
+
+import asyncio
+import logging
+import time
+
+from aiconsole.consts import CODE_INTERPRETER_POOL_SIZE
+from aiconsole.core.assets.materials.material import Material
+from aiconsole.core.code_running.code_interpreters.base_code_interpreter import (
+    BaseCodeInterpreter,
+)
+from aiconsole.core.code_running.code_interpreters.language_map import language_map
+
+_log = logging.getLogger(__name__)
+
+
+class InterpreterPool:
+    """
+    Keeps size interpreters of the language ready, each having run the API materials once, which imports their
+    modules. Interpreters taken from the pool are replaced in the background.
+    """
+
+    def __init__(self, size: int = CODE_INTERPRETER_POOL_SIZE, language: str = "python"):
+        self.size = size
+        self.language = language
+        self.hits = 0
+        self.misses = 0
+        self.spawns = 0
+        self.spawn_s_total = 0.0
+        self.spawn_s_max = 0.0
+        self._materials: list[Material] = []
+        self._ready: list[BaseCodeInterpreter] = []
+        self._spawning: set[asyncio.Task] = set()
+        # Spawns cancelled by close, until wait_closed
+        self._closing: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._started = False
+
+    def start(self, materials: list[Material]):
+        """
+        (Re)fills the pool for the current project, whose API materials are given.
+        """
+        self.close()
+        self._materials = materials
+        self._started = True
+        self._replenish()
+
+    def take(self, language: str) -> BaseCodeInterpreter | None:
+        if language != self.language or self.size == 0:
+            return None
+
+        interpreter = self._ready.pop(0) if self._ready else None
+
+        if interpreter is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        self._replenish()
+
+        return interpreter
+
+    def close(self):
+        # Along with a closed loop its tasks and processes are gone already
+        if self._loop is not None and not self._loop.is_closed():
+            for task in self._spawning:
+                task.cancel()
+
+            for interpreter in self._ready:
+                interpreter.terminate()
+
+            self._closing += self._spawning
+
+        self._loop = None
+        self._started = False
+        self._spawning = set()
+        self._ready = []
+
+    async def wait_closed(self):
+        """
+        Waits for the interpreters which were starting when the pool was closed to be stopped.
+        """
+        closing, self._closing = self._closing, []
+        await asyncio.gather(*closing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        taken = self.hits + self.misses
+
+        return {
+            "size": self.size,
+            "ready": len(self._ready),
+            "spawning": len(self._spawning),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / taken if taken else 0,
+            "spawns": self.spawns,
+            "spawn_s_average": self.spawn_s_total / self.spawns if self.spawns else 0,
+            "spawn_s_max": self.spawn_s_max,
+        }
+
+    def _replenish(self):
+        if not self._started:
+            return  # Taken from before the pool is started for a project, or after it is closed
+
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Filled once there is a loop to start interpreters on
+
+        while len(self._ready) + len(self._spawning) < self.size:
+            task = asyncio.create_task(self._spawn())
+            self._spawning.add(task)
+            task.add_done_callback(self._spawning.discard)
+
+    async def _spawn(self):
+        start = time.perf_counter()
+        interpreter = language_map[self.language]()
+
+        try:
+            async for output in interpreter.run("pass", self._materials):
+                _log.debug(f"Warming up {self.language} interpreter: {output}")
+        except asyncio.CancelledError:
+            # Cancelled before its process was started
+            if getattr(interpreter, "process", None):
+                interpreter.terminate()
+            raise
+        except Exception:
+            _log.exception(f"Could not start a {self.language} interpreter for the pool")
+            return
+
+        spawn_s = time.perf_counter() - start
+        self.spawns += 1
+        self.spawn_s_total += spawn_s
+        self.spawn_s_max = max(self.spawn_s_max, spawn_s)
+
+        self._ready.append(interpreter)
+
+
+interpreter_pool = InterpreterPool()
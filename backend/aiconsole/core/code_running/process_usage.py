@@ -0,0 +1,52 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+
+try:
+    import psutil
+except ImportError:  # Optional, /proc is read instead where there is one
+    psutil = None
+
+
+def process_usage(pid: int) -> dict | None:
+    """
+    Resident memory and CPU time of a process, None where they can not be read.
+    """
+    try:
+        if psutil is not None:
+            process = psutil.Process(pid)
+
+            with process.oneshot():
+                cpu_times = process.cpu_times()
+                return {"rss_bytes": process.memory_info().rss, "cpu_s": cpu_times.user + cpu_times.system}
+
+        if sys.platform.startswith("linux"):
+            with open(f"/proc/{pid}/stat") as file:
+                # The command name in parentheses may contain spaces
+                fields = file.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/statm") as file:
+                resident_pages = int(file.read().split()[1])
+
+            return {
+                "rss_bytes": resident_pages * os.sysconf("SC_PAGE_SIZE"),
+                "cpu_s": (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"),
+            }
+    except Exception:
+        pass
+
+    return None
@@ -14,32 +14,174 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import logging
+import time
+from collections import OrderedDict
 
+from aiconsole.consts import (
+    CODE_INTERPRETER_IDLE_TIMEOUT_S,
+    CODE_INTERPRETER_MAX_SESSIONS,
+)
 from aiconsole.core.code_running.code_interpreters.base_code_interpreter import (
     BaseCodeInterpreter,
 )
 from aiconsole.core.code_running.code_interpreters.language_map import language_map
+from aiconsole.core.code_running.interpreter_pool import (
+    InterpreterPool,
+    interpreter_pool,
+)
+from aiconsole.core.code_running.process_usage import process_usage
+
+_log = logging.getLogger(__name__)
+
+
+class _Session:
+    def __init__(self, chat_id: str, language: str, interpreter: BaseCodeInterpreter):
+        self.chat_id = chat_id
+        self.language = language
+        self.interpreter = interpreter
+        self.last_used = time.monotonic()
+
+    @property
+    def idle_s(self) -> float:
+        if self.interpreter.running:
+            return 0
+
+        return time.monotonic() - max(self.last_used, self.interpreter.last_active)
+
+    @property
+    def pid(self) -> int | None:
+        process = getattr(self.interpreter, "process", None)
+        return process.pid if process else None
 
-code_interpreters = {}
 
+class CodeInterpreterSessions:
+    """
+    Code interpreters of each chat, so chats keep their own state and can run code at the same time.
 
-def get_code_interpreter(language) -> BaseCodeInterpreter:
-    if language not in code_interpreters:
+    Sessions idle for longer than idle_timeout_s are closed, and so are the least recently used ones when there are
+    more than max_sessions, unless they are running code.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = CODE_INTERPRETER_MAX_SESSIONS,
+        idle_timeout_s: float | None = CODE_INTERPRETER_IDLE_TIMEOUT_S,
+        pool: InterpreterPool | None = interpreter_pool,
+    ):
+        self.pool = pool
+        self.max_sessions = max_sessions
+        self.idle_timeout_s = idle_timeout_s
+        self.evictions = 0
+        self._sessions: OrderedDict[tuple[str, str], _Session] = OrderedDict()
+        self._sweep: asyncio.TimerHandle | None = None
+
+    def get(self, language: str, chat_id: str) -> BaseCodeInterpreter:
         # Case in-sensitive
         language = language.lower()
+        key = (chat_id, language)
+
+        if key not in self._sessions:
+            interpreter = self.pool.take(language) if self.pool else None
+
+            if interpreter is None:
+                try:
+                    interpreter = language_map[language]()
+                except KeyError:
+                    raise ValueError(f"Unknown or unsupported language: {language}")
+
+            self._sessions[key] = _Session(chat_id, language, interpreter)
+            self._evict_least_recently_used(keep=key)
+
+        session = self._sessions[key]
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(key)
+        self._schedule_sweep()
+
+        return session.interpreter
+
+    def close(self, chat_id: str):
+        for key in [key for key in self._sessions if key[0] == chat_id]:
+            self._close(key)
+
+    def reset(self):
+        for key in list(self._sessions):
+            self._close(key)
+
+    def evict_idle(self):
+        if self.idle_timeout_s is None:
+            return
+
+        for key, session in list(self._sessions.items()):
+            if session.idle_s > self.idle_timeout_s:
+                _log.info(
+                    f"Closing {session.language} interpreter of chat {session.chat_id},"
+                    f" idle for {session.idle_s:.0f}s"
+                )
+                self._close(key)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "count": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+            "sessions": [
+                {
+                    "chat_id": session.chat_id,
+                    "language": session.language,
+                    "running": session.interpreter.running,
+                    "idle_s": session.idle_s,
+                    "pid": session.pid,
+                    "usage": process_usage(session.pid) if session.pid else None,
+                }
+                for session in self._sessions.values()
+            ],
+        }
+
+    def _evict_least_recently_used(self, keep: tuple[str, str]):
+        # The session being added is kept even if the others are all running, there are more sessions until they stop
+        for key, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions:
+                return
+
+            if key != keep and not session.interpreter.running:
+                _log.info(f"Closing {session.language} interpreter of chat {session.chat_id}, too many sessions")
+                self._close(key)
+                self.evictions += 1
+
+    def _close(self, key: tuple[str, str]):
+        session = self._sessions.pop(key)
 
         try:
-            code_interpreters[language] = language_map[language]()
-        except KeyError:
-            raise ValueError(f"Unknown or unsupported language: {language}")
+            session.interpreter.terminate()
+        except Exception:
+            pass  # Never started
 
-    return code_interpreters[language]
+    def _schedule_sweep(self):
+        if self.idle_timeout_s is None or self._sweep is not None:
+            return
 
+        def sweep():
+            self._sweep = None
+            self.evict_idle()
 
-def reset_code_interpreters():
-    global code_interpreters
+            if self._sessions:
+                self._schedule_sweep()
+
+        try:
+            self._sweep = asyncio.get_running_loop().call_later(self.idle_timeout_s / 2, sweep)
+        except RuntimeError:
+            pass  # No event loop, sessions are checked on the next sweep scheduled from one
+
+
+code_interpreter_sessions = CodeInterpreterSessions()
 
-    for code_interpreter in code_interpreters.values():
-        code_interpreter.terminate()
 
-    code_interpreters = {}
+def get_code_interpreter(language: str, chat_id: str) -> BaseCodeInterpreter:
+    return code_interpreter_sessions.get(language, chat_id)
+
+
+def reset_code_interpreters():
+    code_interpreter_sessions.reset()
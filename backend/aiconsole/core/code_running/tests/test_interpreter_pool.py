@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from aiconsole.core.assets.asset import AssetLocation
+from aiconsole.core.assets.materials.material import Material, MaterialContentType
+from aiconsole.core.code_running.interpreter_pool import InterpreterPool
+from aiconsole.core.code_running.run_code import CodeInterpreterSessions
+
+API = Material(
+    id="api",
+    name="API",
+    usage="",
+    usage_examples=[],
+    defined_in=AssetLocation.PROJECT_DIR,
+    override=False,
+    content_type=MaterialContentType.API,
+    content="import json\n\n\ndef dump(value):\n    return json.dumps(value)\n",
+)
+
+
+async def _wait_until_ready(pool: InterpreterPool):
+    while pool.stats()["ready"] < pool.size:
+        await asyncio.sleep(0.01)
+
+
+async def _run(sessions: CodeInterpreterSessions, chat_id: str, code: str) -> str:
+    return "".join([output async for output in sessions.get("python", chat_id).run(code, [API])])
+
+
+@pytest.mark.asyncio
+async def test_should_hand_out_warm_interpreters_and_replenish():
+    pool = InterpreterPool(size=1)
+    sessions = CodeInterpreterSessions(idle_timeout_s=None, pool=pool)
+    pool.start([API])
+
+    try:
+        await asyncio.wait_for(_wait_until_ready(pool), 30)
+        assert pool.stats()["spawns"] == 1
+
+        start = time.perf_counter()
+        assert await _run(sessions, "a", "print(dump([1]))") == "[1]\n"
+        warm_s = time.perf_counter() - start
+
+        # Taken before the replacement is ready
+        await _run(sessions, "b", "pass")
+
+        await asyncio.wait_for(_wait_until_ready(pool), 30)
+
+        stats = pool.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["spawns"] == 2
+        assert warm_s < stats["spawn_s_average"]
+        assert pool.take("applescript") is None
+    finally:
+        processes = [sessions.get("python", chat_id).process for chat_id in ("a", "b")]
+        processes += [interpreter.process for interpreter in pool._ready]
+        sessions.reset()
+        pool.close()
+
+        for process in processes:
+            await process.wait()
+
+
+@pytest.mark.asyncio
+async def test_should_stop_interpreters_being_started_when_closed():
+    pool = InterpreterPool(size=2)
+    pool.start([API])
+    spawning = set(pool._spawning)
+
+    # Starting their processes
+    await asyncio.sleep(0)
+    pool.close()
+    await pool.wait_closed()
+
+    assert all(task.cancelled() for task in spawning)
+    assert pool.stats()["ready"] == 0
+
+
+@pytest.mark.asyncio
+async def test_should_not_start_interpreters_before_being_started():
+    pool = InterpreterPool(size=1)
+
+    # E.g. a chat running code while the venv of the project is being created
+    assert pool.take("python") is None
+    assert pool.stats()["spawning"] == 0
+
+    pool.start([API])
+    pool.close()
+    await pool.wait_closed()
+
+    assert pool.take("python") is None
+    assert pool.stats()["spawning"] == 0
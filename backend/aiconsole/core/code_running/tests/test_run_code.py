@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from aiconsole.core.code_running.process_usage import process_usage
+from aiconsole.core.code_running.run_code import CodeInterpreterSessions
+
+
+async def _run(sessions: CodeInterpreterSessions, chat_id: str, code: str) -> str:
+    return "".join([output async for output in sessions.get("python", chat_id).run(code, [])])
+
+
+@pytest.mark.asyncio
+async def test_should_keep_state_per_chat():
+    sessions = CodeInterpreterSessions(max_sessions=2, idle_timeout_s=None, pool=None)
+
+    await _run(sessions, "a", "x = 'a'")
+    await _run(sessions, "b", "x = 'b'")
+
+    assert await _run(sessions, "a", "print(x)") == "a\n"
+    assert await _run(sessions, "b", "print(x)") == "b\n"
+    assert sessions.get("Python", "a") is sessions.get("python", "a")
+
+    processes = [sessions.get("python", chat_id).process for chat_id in ("a", "b")]
+    sessions.reset()
+
+    for process in processes:
+        await process.wait()
+
+
+@pytest.mark.asyncio
+async def test_should_evict_least_recently_used_sessions_which_are_not_running():
+    sessions = CodeInterpreterSessions(max_sessions=2, idle_timeout_s=None, pool=None)
+
+    a = sessions.get("python", "a")
+    sessions.get("python", "b")
+    a.running = True
+    sessions.get("python", "c")
+
+    assert [session["chat_id"] for session in sessions.stats()["sessions"]] == ["a", "c"]
+    assert sessions.evictions == 1
+
+    sessions.close("a")
+    assert sessions.stats()["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_should_keep_new_session_when_the_others_are_running():
+    sessions = CodeInterpreterSessions(max_sessions=1, idle_timeout_s=None, pool=None)
+
+    sessions.get("python", "c1").running = True
+    c2 = sessions.get("python", "c2")
+
+    assert sessions.get("python", "c2") is c2
+    assert sessions.stats()["count"] == 2
+
+    sessions.get("python", "c1").running = False
+    sessions.get("python", "c3")
+
+    assert [session["chat_id"] for session in sessions.stats()["sessions"]] == ["c3"]
+
+
+@pytest.mark.asyncio
+async def test_should_evict_idle_sessions():
+    sessions = CodeInterpreterSessions(idle_timeout_s=0, pool=None)
+
+    sessions.get("python", "a")
+    sessions.evict_idle()
+
+    assert sessions.stats()["count"] == 0
+    assert sessions.evictions == 1
+
+
+def test_should_measure_processes():
+    usage = process_usage(os.getpid())
+
+    if usage is not None:  # Neither psutil nor /proc on this platform
+        assert usage["rss_bytes"] > 0
+        assert usage["cpu_s"] > 0
@@ -0,0 +1,232 @@
+import asyncio
+import sys
+import time
+
+import pytest
+import pytest_asyncio
+
+from aiconsole.core.assets.asset import AssetLocation
+from aiconsole.core.assets.materials.material import Material, MaterialContentType
+from aiconsole.core.code_running.code_interpreters.execution_limits import (
+    ExecutionLimits,
+)
+from aiconsole.core.code_running.code_interpreters.languages.python import Python
+
+
+async def _run_with(interpreter: Python, code: str, materials: list[Material]) -> str:
+    return "".join([output async for output in interpreter.run(code, materials)])
+
+
+async def _run(interpreter: Python, code: str) -> str:
+    return await _run_with(interpreter, code, [])
+
+
+@pytest_asyncio.fixture
+async def python():
+    interpreter = Python()
+    # Process start up is not what these tests are about
+    await _run(interpreter, "pass")
+
+    yield interpreter
+
+    process = interpreter.process
+    interpreter.terminate()
+    await process.wait()
+
+
+@pytest.mark.asyncio
+async def test_should_stream_output_and_errors(python: Python):
+    assert await _run(python, "x = 41\nprint(x + 1)") == "42\n"
+
+    output = await _run(python, 'print("before")\nraise ValueError("boom")')
+
+    # stdout and stderr are read independently, so only the order within each of them is known
+    assert "before\n" in output
+    assert "Traceback (most recent call last):" in output
+    assert output.index("Traceback") < output.index("ValueError: boom\n")
+
+
+@pytest.mark.asyncio
+async def test_should_end_as_soon_as_code_ends(python: Python):
+    start = time.perf_counter()
+    await _run(python, "print(1)")
+
+    # Polling used to add ~0.6s to every execution
+    assert time.perf_counter() - start < 0.2
+
+
+@pytest.mark.asyncio
+async def test_should_not_block_event_loop(python: Python):
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    await _run(python, "import time\ntime.sleep(0.5)")
+    ticker.cancel()
+
+    assert ticks > 20
+
+
+@pytest.mark.asyncio
+async def test_should_reap_terminated_process():
+    interpreter = Python()
+    await _run(interpreter, "pass")
+    process = interpreter.process
+    assert process is not None and process.stdin is not None
+
+    interpreter.terminate()
+
+    assert process.stdin.is_closing()
+    # Waited for by terminate, only has to be given the time to exit
+    while process.returncode is None:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_should_restart_after_process_exits(python: Python):
+    assert await _run(python, 'print("bye")\nimport os\nos._exit(0)') == "bye\n"
+    assert await _run(python, "print(2)") == "2\n"
+
+
+def _api_material(content: str, id: str = "api") -> Material:
+    return Material(
+        id=id,
+        name="API",
+        usage="",
+        usage_examples=[],
+        defined_in=AssetLocation.PROJECT_DIR,
+        override=False,
+        content_type=MaterialContentType.API,
+        content=content,
+    )
+
+
+@pytest.mark.asyncio
+async def test_should_load_api_materials_once(python: Python):
+    material = _api_material('"""Docs"""\nimport json\n\n\ndef dump(value):\n    return json.dumps(value)\n')
+
+    assert "def dump" in python.preprocess_code("print(dump([1]))", [material])
+    assert "def dump" not in python.preprocess_code("print(dump([1]))", [material])
+
+    python.loaded_materials = {}
+    assert await _run_with(python, "print(dump([1]))", [material]) == "[1]\n"
+    # Also importable as a module
+    code = "import aiconsole_materials\nprint(aiconsole_materials.api.dump(2))"
+    assert await _run_with(python, code, [material]) == "2\n"
+
+    changed = _api_material("def dump(value):\n    return 'changed'\n")
+    assert await _run_with(python, "print(dump(1))", [changed]) == "changed\n"
+
+
+@pytest.mark.asyncio
+async def test_should_let_api_materials_use_each_other(python: Python):
+    helpers = _api_material("import json\n\n\ndef dump(value):\n    return json.dumps(value)\n", id="helpers")
+    api = _api_material("SEPARATOR = ', '\n\n\ndef dump_all(*values):\n    return SEPARATOR.join(map(dump, values))\n")
+
+    code = "import aiconsole_materials\nprint(dump_all(1, 'a'))\nprint(sorted(vars(aiconsole_materials.api)))"
+    assert await _run_with(python, code, [api, helpers]) == (
+        '1, "a"\n' "['SEPARATOR', '__doc__', '__loader__', '__name__', '__package__', '__spec__', 'dump_all']\n"
+    )
+    assert await _run(python, "print(aiconsole_materials.helpers.json.dumps(None))") == "null\n"
+
+
+@pytest.mark.asyncio
+async def test_should_load_api_materials_again_after_failing_to(python: Python):
+    broken = _api_material("def double(value):\n    return value * 2\n\nraise RuntimeError('not yet')\n")
+
+    output = await _run_with(python, "print('code runs')", [broken])
+
+    assert "RuntimeError: not yet" in output
+    assert "code runs\n" in output
+    assert "material_not_loaded" not in output
+    assert "api" not in python.loaded_materials
+    assert await _run(python, "print('_aic_module' in globals(), 'aiconsole_materials.api' in sys.modules)") == (
+        "False False\n"
+    )
+
+    fixed = _api_material("def double(value):\n    return value * 2\n")
+    assert await _run_with(python, "print(double(2))", [fixed]) == "4\n"
+    assert "api" in python.loaded_materials
+
+
+@pytest.mark.asyncio
+async def test_should_load_api_materials_again_after_restart(python: Python):
+    material = _api_material("def double(value):\n    return value * 2\n")
+
+    await _run_with(python, "pass", [material])
+    await _run_with(python, "import os\nos._exit(0)", [material])
+
+    assert await _run_with(python, "print(double(2))", [material]) == "4\n"
+
+
+@pytest.mark.asyncio
+async def test_should_interrupt_code_over_time_limit(python: Python):
+    python.limits = ExecutionLimits(wall_s=0.5, cpu_s=None, interrupt_grace_s=5)
+    await _run(python, "x = 42")
+
+    output = await _run(python, "import time\ntime.sleep(30)")
+
+    assert "KeyboardInterrupt" in output
+    assert python.last_status and python.last_status.state == "timed_out"
+    assert not python.last_status.killed
+    # Interrupted, not restarted, so the state is kept
+    assert await _run(python, "print(x)") == "42\n"
+    assert python.last_status.state == "completed"
+
+
+@pytest.mark.asyncio
+async def test_should_kill_code_ignoring_interrupt(python: Python):
+    python.limits = ExecutionLimits(wall_s=0.5, cpu_s=None, interrupt_grace_s=0.5)
+
+    start = time.perf_counter()
+    await _run(python, "import signal, time\nsignal.signal(signal.SIGINT, signal.SIG_IGN)\ntime.sleep(30)")
+
+    assert time.perf_counter() - start < 5
+    assert python.last_status and python.last_status.state == "timed_out"
+    assert python.last_status.killed
+
+    # Starting a new process takes longer than the limit
+    python.limits = ExecutionLimits()
+    assert await _run(python, "print(1)") == "1\n"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="CPU time is read from /proc without psutil")
+@pytest.mark.asyncio
+async def test_should_interrupt_code_over_cpu_limit(python: Python):
+    python.limits = ExecutionLimits(wall_s=30, cpu_s=0.5, interrupt_grace_s=5)
+
+    await _run(python, "while True:\n    pass")
+
+    assert python.last_status and python.last_status.state == "cpu_limit_exceeded"
+    assert (python.last_status.cpu_s or 0) >= 0.5
+
+
+@pytest.mark.asyncio
+async def test_should_interrupt_abandoned_code(python: Python):
+    run = python.run("print('started')\nimport time\ntime.sleep(30)", [])
+    assert await run.__anext__() == "started\n"
+    await run.aclose()
+
+    assert python.last_status and python.last_status.state == "interrupted"
+    # Nothing of the interrupted code leaks into the next run
+    assert await asyncio.wait_for(_run(python, "print(1)"), 10) == "1\n"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Memory limits are only supported on Linux")
+@pytest.mark.asyncio
+async def test_should_limit_memory():
+    interpreter = Python(ExecutionLimits(memory_bytes=1024**3))
+
+    output = await _run(interpreter, "data = bytearray(4 * 1024**3)")
+
+    assert "MemoryError" in output
+    assert await _run(interpreter, "print(1)") == "1\n"
+
+    process = interpreter.process
+    interpreter.terminate()
+    await process.wait()
@@ -33,6 +33,12 @@ class GPTMode(str, Enum):
     QUALITY = "quality"
 
 
+class GPTPriority(int, Enum):
+    # Lower goes first
+    INTERACTIVE = 0
+    ANALYSIS = 1
+
+
 class GPTEncoding(str, Enum):
     GPT_4 = "gpt-4"
     GPT_35 = "gpt-3.5-turbo"
@@ -64,3 +70,17 @@ MODEL_DATA: dict[str, GPTModelData] = {
         encoding=GPTEncoding.GPT_4,
     ),
 }
+
+
+# Models to pick from for each mode, in order of preference, the first one whose context fits the request wins.
+# SPEED starts with the large context GPT-3.5, as fast as the small one and not retried for a longer history, COST
+# with the small one, half its price
+DEFAULT_MODEL_ROUTES: dict[GPTMode, list[str]] = {
+    GPTMode.QUALITY: [GPTModel.GPT_4_11106_PREVIEW.value],
+    GPTMode.SPEED: [GPTModel.GPT_35_TURBO_16k_0613.value, GPTModel.GPT_4_11106_PREVIEW.value],
+    GPTMode.COST: [
+        GPTModel.GPT_35_TURBO_0613.value,
+        GPTModel.GPT_35_TURBO_16k_0613.value,
+        GPTModel.GPT_4_11106_PREVIEW.value,
+    ],
+}
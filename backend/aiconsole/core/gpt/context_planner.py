@@ -0,0 +1,182 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Fitting the history of a chat into the token budget of a request.
+
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Protocol
+
+from aiconsole.consts import (
+    GPT_CONTEXT_KEEP_RECENT_MESSAGES,
+    GPT_CONTEXT_TOOL_OUTPUT_HEAD_CHARS,
+    GPT_CONTEXT_TOOL_OUTPUT_TAIL_CHARS,
+)
+from aiconsole.core.gpt.types import (
+    GPTRequestMessage,
+    GPTRequestTextMessage,
+    GPTRequestToolMessage,
+)
+
+CountMessageTokens = Callable[[GPTRequestMessage], int]
+
+
+@dataclass
+class ContextPlan:
+    messages: list[GPTRequestMessage]
+    tokens: int  # including the notice
+    truncated_tool_outputs: list[str] = field(default_factory=list)  # tool_call_ids
+    dropped_messages: int = 0
+
+    @property
+    def elided(self) -> bool:
+        return bool(self.truncated_tool_outputs) or self.dropped_messages > 0
+
+    @property
+    def notice(self) -> str | None:
+        """
+        To be added to the system message of the request, there is no message left to tell the model about it.
+        """
+        return _dropped_messages_notice(self.dropped_messages) if self.dropped_messages else None
+
+
+class ContextPlanner(Protocol):
+    # Limit of the context below the one of the model, to save latency and cost
+    max_context_tokens: int | None
+
+    def plan(
+        self, messages: list[GPTRequestMessage], count_message_tokens: CountMessageTokens, budget: int
+    ) -> ContextPlan:
+        ...
+
+
+class TrimmingContextPlanner:
+    """
+    Elides in order, until the messages fit the budget:
+    1. long tool outputs of older messages are cut down to their head and tail,
+    2. older messages are dropped, oldest first, and the plan gets a notice saying so,
+    3. the same for the recent messages, except for the last one.
+
+    Messages are dropped together with the tool outputs that follow them, a tool output without its tool call is
+    rejected by the API.
+    """
+
+    def __init__(
+        self,
+        keep_recent_messages: int = GPT_CONTEXT_KEEP_RECENT_MESSAGES,
+        tool_output_head_chars: int = GPT_CONTEXT_TOOL_OUTPUT_HEAD_CHARS,
+        tool_output_tail_chars: int = GPT_CONTEXT_TOOL_OUTPUT_TAIL_CHARS,
+        max_context_tokens: int | None = None,
+    ):
+        self.max_context_tokens = max_context_tokens
+        self.keep_recent_messages = keep_recent_messages
+        self.tool_output_head_chars = tool_output_head_chars
+        self.tool_output_tail_chars = tool_output_tail_chars
+
+    def plan(
+        self, messages: list[GPTRequestMessage], count_message_tokens: CountMessageTokens, budget: int
+    ) -> ContextPlan:
+        units = _split_into_units(messages)
+        unit_tokens = [sum(count_message_tokens(message) for message in unit) for unit in units]
+        plan = ContextPlan(messages=messages, tokens=sum(unit_tokens))
+
+        if plan.tokens <= budget:
+            return plan
+
+        # Units covering at least the last keep_recent_messages messages
+        recent = 1
+        while recent < len(units) and sum(len(unit) for unit in units[-recent:]) < self.keep_recent_messages:
+            recent += 1
+
+        dropped = 0
+        notice_tokens = 0
+        # Tokens of the units kept so far
+        kept_tokens = plan.tokens
+
+        def fits() -> bool:
+            return kept_tokens + notice_tokens <= budget
+
+        for start, end in [(0, len(units) - recent), (len(units) - recent, len(units))]:
+            for i in range(max(start, dropped), end):
+                if fits():
+                    break
+
+                units[i] = [self._truncate_tool_output(message, plan) for message in units[i]]
+                truncated_tokens = sum(count_message_tokens(message) for message in units[i])
+                kept_tokens += truncated_tokens - unit_tokens[i]
+                unit_tokens[i] = truncated_tokens
+
+            # The last unit is what the request is about, it is never dropped
+            while dropped < min(end, len(units) - 1) and not fits():
+                plan.dropped_messages += len(units[dropped])
+                kept_tokens -= unit_tokens[dropped]
+                dropped += 1
+                # Counted as a message of its own, a little more than it adds to the system message
+                notice_tokens = count_message_tokens(
+                    GPTRequestTextMessage(role="system", content=_dropped_messages_notice(plan.dropped_messages))
+                )
+
+        plan.messages = [message for unit in units[dropped:] for message in unit]
+        plan.tokens = kept_tokens + notice_tokens
+        plan.truncated_tool_outputs = [
+            message.tool_call_id
+            for unit in units[dropped:]
+            for message in unit
+            if isinstance(message, GPTRequestToolMessage) and message.tool_call_id in plan.truncated_tool_outputs
+        ]
+
+        return plan
+
+    def _truncate_tool_output(self, message: GPTRequestMessage, plan: ContextPlan) -> GPTRequestMessage:
+        if not isinstance(message, GPTRequestToolMessage) or message.content is None:
+            return message
+
+        elided = len(message.content) - self.tool_output_head_chars - self.tool_output_tail_chars
+
+        if elided <= 0:
+            return message
+
+        plan.truncated_tool_outputs.append(message.tool_call_id)
+
+        return message.model_copy(
+            update={
+                "content": message.content[: self.tool_output_head_chars]
+                + f"\n\n[... {elided} characters of the output left out ...]\n\n"
+                + message.content[-self.tool_output_tail_chars :]
+            }
+        )
+
+
+def _split_into_units(messages: list[GPTRequestMessage]) -> list[list[GPTRequestMessage]]:
+    units: list[list[GPTRequestMessage]] = []
+
+    for message in messages:
+        if isinstance(message, GPTRequestToolMessage) and units:
+            units[-1].append(message)
+        else:
+            units.append([message])
+
+    return units
+
+
+def _dropped_messages_notice(count: int) -> str:
+    return f"{count} earlier messages of this conversation were left out to fit the context window."
+
+
+default_context_planner = TrimmingContextPlanner()
@@ -0,0 +1,112 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Offline stand-in for the LLM provider, streaming scripted or recorded responses at a configurable pace, so whole
+sessions can be tested and load-tested without network access or an API key.
+
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import AsyncIterator
+
+from litellm import ModelResponse
+
+from aiconsole.consts import (
+    GPT_FAKE_SCRIPT,
+    GPT_FAKE_TIME_TO_FIRST_TOKEN_S,
+    GPT_FAKE_TOKENS_PER_SECOND,
+)
+from aiconsole.core.gpt.response_cache import response_to_chunks
+from aiconsole.core.gpt.types import GPTChoice, GPTResponse, GPTResponseMessage
+
+# Approximate size of a token, responses are streamed a token per chunk
+_CHARS_PER_TOKEN = 4
+
+
+class FakeGPTProvider:
+    """
+    Responds with the scripted responses in turn, starting over after the last one. Without a script every request
+    is answered with a short text quoting the last message.
+    """
+
+    def __init__(
+        self,
+        script: list[GPTResponse] | None = None,
+        tokens_per_second: float = GPT_FAKE_TOKENS_PER_SECOND,
+        time_to_first_token_s: float = GPT_FAKE_TIME_TO_FIRST_TOKEN_S,
+    ):
+        self.script = script or []
+        self.tokens_per_second = tokens_per_second
+        self.time_to_first_token_s = time_to_first_token_s
+
+        self.requests: list[dict] = []
+
+    async def acompletion(self, **request) -> AsyncIterator[ModelResponse]:
+        self.requests.append(request)
+
+        if self.script:
+            response = self.script[(len(self.requests) - 1) % len(self.script)]
+        else:
+            response = _echo_response(request)
+
+        return self._stream(response)
+
+    async def _stream(self, response: GPTResponse) -> AsyncIterator[ModelResponse]:
+        await asyncio.sleep(self.time_to_first_token_s)
+
+        start = time.perf_counter()
+
+        for i, chunk in enumerate(response_to_chunks(response, chunk_chars=_CHARS_PER_TOKEN)):
+            if self.tokens_per_second > 0:
+                # Paced against the start, so time spent by the consumer is not added on top
+                await asyncio.sleep(max(0, start + i / self.tokens_per_second - time.perf_counter()))
+
+            yield chunk
+
+
+def load_script(path: Path) -> list[GPTResponse]:
+    """
+    Responses from a JSON list, or from a directory of JSON files (e.g. the response cache) in name order.
+    """
+    if path.is_dir():
+        return [GPTResponse.model_validate_json(file.read_text("utf8")) for file in sorted(path.glob("*.json"))]
+
+    return [GPTResponse.model_validate(response) for response in json.loads(path.read_text("utf8"))]
+
+
+def _echo_response(request: dict) -> GPTResponse:
+    messages = request.get("messages") or [{}]
+    last_content = messages[-1].get("content") or ""
+
+    return GPTResponse(
+        id="fake",
+        model=request.get("model", ""),
+        choices=[
+            GPTChoice(
+                index=0,
+                message=GPTResponseMessage(role="assistant", content=f"This is a fake response to: {last_content}"),
+                finnish_reason="stop",
+            )
+        ],
+    )
+
+
+fake_gpt_provider = FakeGPTProvider(load_script(Path(GPT_FAKE_SCRIPT)) if GPT_FAKE_SCRIPT else None)
@@ -16,15 +16,29 @@
 
 import asyncio
 import logging
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable
 
 import litellm
-from litellm.caching import Cache
 from openai import AuthenticationError
 
 from aiconsole.api.websockets.server_messages import DebugJSONServerMessage
+from aiconsole.consts import GPT_METRICS_DEBUG_MESSAGES, GPT_PROVIDER
 from aiconsole.core.gpt.partial import GPTPartialResponse
 from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.request_metrics import GPTRequestRecord, gpt_request_metrics
+from aiconsole.core.gpt.request_scheduler import (
+    GPTRequestScheduler,
+    GPTRequestTicket,
+    gpt_request_scheduler,
+)
+from aiconsole.core.gpt.response_cache import gpt_response_cache, response_to_chunks
+from aiconsole.core.gpt.retry_policy import (
+    GPTStreamTimeoutError,
+    RetryPolicy,
+    close_stream,
+    wait_for_chunk,
+)
 
 from .exceptions import NoOpenAPIKeyException
 from .types import CLEAR_STR, CLEAR_STR_TYPE, GPTChoice, GPTResponse, GPTResponseMessage
@@ -32,13 +46,35 @@ from .types import CLEAR_STR, CLEAR_STR_TYPE, GPTChoice, GPTResponse, GPTRespons
 _log = logging.getLogger(__name__)
 
 
-litellm.cache = Cache()
-litellm.cache.cache
 litellm.set_verbose = False
 
+# Takes a request dict, returns the stream of its response chunks (same as litellm.acompletion)
+GPTProvider = Callable[..., Awaitable[AsyncIterator[litellm.ModelResponse]]]
+
+
+def get_gpt_provider() -> GPTProvider:
+    if GPT_PROVIDER == "fake":
+        from aiconsole.core.gpt.fake_provider import fake_gpt_provider
+
+        return fake_gpt_provider.acompletion
+
+    return litellm.acompletion
+
+
+def _is_context_window_exceeded(error: Exception) -> bool:
+    return isinstance(error, litellm.ContextWindowExceededError) or getattr(error, "code", None) == (
+        "context_length_exceeded"
+    )
+
 
 class GPTExecutor:
-    def __init__(self):
+    def __init__(self, provider: GPTProvider | None = None, scheduler: GPTRequestScheduler | None = None):
+        self.provider = provider or get_gpt_provider()
+        self.scheduler = scheduler or gpt_request_scheduler
+        # Place of the request in the scheduler's queue, while it waits for the rate limits
+        self.ticket: GPTRequestTicket | None = None
+        self.record: GPTRequestRecord | None = None
+        self._streaming_s = 0.0
         self.request = {}
         self.response = GPTResponse(
             choices=[
@@ -52,7 +88,43 @@ class GPTExecutor:
         self.partial_response = GPTPartialResponse()
 
     async def execute(self, request: GPTRequest) -> AsyncGenerator[litellm.ModelResponse | CLEAR_STR_TYPE, None]:
+        self.record = GPTRequestRecord(model=request.model, caller=request.caller)
+        start = time.perf_counter()
+
+        try:
+            async for chunk in self._execute(request):
+                yield chunk
+        except BaseException as error:
+            # Including cancellation and consumers closing the stream early
+            self.record.error = type(error).__name__
+            raise
+        finally:
+            await self._finish_record(request, time.perf_counter() - start)
+
+    async def _finish_record(self, request: GPTRequest, duration_s: float):
+        record = self.record
+        record.duration_s = duration_s
+
+        if record.error is None:
+            message = self.response.choices[0].message
+            tool_calls = {"tool_calls": [tool_call.model_dump() for tool_call in message.tool_calls]}
+            record.completion_tokens = request.count_tokens_output(
+                message.content or "", tool_calls if message.tool_calls else None
+            )
+
+            if self._streaming_s:
+                record.tokens_per_second = record.completion_tokens / self._streaming_s
+
+        gpt_request_metrics.add(record)
+
+        if GPT_METRICS_DEBUG_MESSAGES:
+            await DebugJSONServerMessage(message="GPT metrics", object=record.to_dict()).send_to_all()
+
+    async def _execute(self, request: GPTRequest) -> AsyncGenerator[litellm.ModelResponse | CLEAR_STR_TYPE, None]:
         request.validate_request()
+        self._streaming_s = 0.0
+        # Counted once here and when escalating, left out of the record of a request which is not valid
+        self.record.prompt_tokens = request.count_tokens()
 
         request_dict = {
             "max_tokens": request.max_tokens,
@@ -68,25 +140,64 @@ class GPTExecutor:
         if request.tools:
             request_dict["tools"] = [tool.model_dump() for tool in request.tools]
 
-        for attempt in range(3):
+        cache_key = None
+        if gpt_response_cache.should_cache(request_dict, force=request.cache):
+            cache_key = gpt_response_cache.key(request_dict)
+            cached_response = await gpt_response_cache.get(cache_key)
+
+            if cached_response is not None:
+                _log.info("Replaying cached GPT response")
+                self.record.cached = True
+                self.request = request_dict
+                self.partial_response = GPTPartialResponse()
+
+                for chunk in response_to_chunks(cached_response):
+                    self.partial_response.apply_chunk(chunk)
+                    yield chunk
+
+                self.response = self.partial_response.to_final_response()
+                return
+
+        retry_policy = request.retry_policy or RetryPolicy()
+        attempt = 0
+        # Providers count the completion tokens asked for against the limits, not only the ones used
+        scheduled_tokens = self.record.prompt_tokens + request.max_tokens
+
+        while True:
+            streamed = False
+            iterator = None
+            self.record.attempts = attempt + 1
+
             try:
                 _log.info("Executing GPT request:", request_dict)
                 self.request = request_dict
-                response = await litellm.acompletion(
-                    **request_dict,
-                    stream=True,
-                    # caching=True,
-                )
 
+                queued_at = time.perf_counter()
+                self.ticket = self.scheduler.enqueue(request.model, scheduled_tokens, request.priority)
+                await self.scheduler.wait(self.ticket)
+                sent_at = time.perf_counter()
+                self.record.queue_wait_s += sent_at - queued_at
+
+                iterator, chunk = await self._open_stream(request, request_dict, retry_policy, scheduled_tokens)
+
+                first_chunk_at = time.perf_counter()
+                self.record.time_to_first_token_s = first_chunk_at - sent_at
                 self.partial_response = GPTPartialResponse()
 
-                async for chunk in response:
+                while chunk is not None:
                     self.partial_response.apply_chunk(chunk)
+                    streamed = True
                     yield chunk
                     await asyncio.sleep(0)
 
+                    chunk = await wait_for_chunk(iterator, retry_policy.stall_timeout_s, "chunk")
+
+                self._streaming_s = time.perf_counter() - first_chunk_at
                 self.response = self.partial_response.to_final_response()
 
+                if cache_key is not None:
+                    await gpt_response_cache.put(cache_key, self.response)
+
                 if _log.isEnabledFor(logging.DEBUG):
                     await DebugJSONServerMessage(
                         message="GPT", object={"request": self.request, "response": self.response.model_dump()}
@@ -96,10 +207,90 @@ class GPTExecutor:
             except AuthenticationError:
                 raise NoOpenAPIKeyException()
             except Exception as error:
-                _log.exception(f"Error on attempt {attempt}: {error}", exc_info=error)
-                if attempt == 2:
-                    raise error
-            _log.info("Retrying GPT request")
-            yield CLEAR_STR
+                if _is_context_window_exceeded(error) and request.escalate():
+                    # Our count of the prompt tokens was off, not a failure of the provider
+                    request_dict["model"] = request.model
+                    request_dict["max_tokens"] = request.max_tokens
+                    self.record.prompt_tokens = request.count_tokens()
+                    scheduled_tokens = self.record.prompt_tokens + request.max_tokens
+                    self.record.model = request.model
+                    delay = 0
+                else:
+                    attempt += 1
+
+                    if attempt >= retry_policy.max_attempts or not retry_policy.is_retryable(error):
+                        raise
+
+                    delay = retry_policy.delay(attempt - 1, error)
+                    _log.exception(f"Error on attempt {attempt}, retrying in {delay:.1f}s: {error}", exc_info=error)
+            finally:
+                # E.g. a stalled stream, or one the consumer stopped reading
+                if iterator is not None:
+                    await close_stream(iterator)
+
+            # Consumers only need to start over if they have seen a part of the failed response
+            if streamed:
+                yield CLEAR_STR
+
+            await asyncio.sleep(delay)
+
+    async def _open_stream(
+        self, request: GPTRequest, request_dict: dict, retry_policy: RetryPolicy, scheduled_tokens: int
+    ):
+        """
+        Starts the request and waits for its first chunk, hedging it with a second request if it takes too long.
+        """
+
+        async def open_stream(hedge: bool = False):
+            if hedge:
+                await self.scheduler.acquire(request.model, scheduled_tokens, request.priority)
+
+            response = await self.provider(**request_dict, stream=True)
+            iterator = response.__aiter__()
+            return iterator, await wait_for_chunk(iterator, None, "first token")
+
+        loop = asyncio.get_running_loop()
+        deadline = None
+        if retry_policy.first_token_timeout_s is not None:
+            deadline = loop.time() + retry_policy.first_token_timeout_s
+
+        tasks = [asyncio.create_task(open_stream())]
+        winner: asyncio.Task | None = None
+
+        try:
+            if retry_policy.hedge_after_s is not None:
+                done, _ = await asyncio.wait(tasks, timeout=retry_policy.hedge_after_s)
+
+                if not done:
+                    _log.info(f"No first token in {retry_policy.hedge_after_s}s, hedging the GPT request")
+                    tasks.append(asyncio.create_task(open_stream(hedge=True)))
+
+            pending = set(tasks)
+            error: BaseException | None = None
+
+            while pending:
+                timeout = None if deadline is None else max(0, deadline - loop.time())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    raise GPTStreamTimeoutError(f"No first token in {retry_policy.first_token_timeout_s}s")
+
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+
+                    error = error or task.exception()
+
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
 
-        raise Exception("Unable to complete GPT request.")
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # A hedged request which got its first token as well, but lost
+                    await close_stream(task.result()[0])
@@ -0,0 +1,118 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Picks the model for a request from the routing table of its GPTMode.
+
+"""
+
+import logging
+from typing import Callable
+
+from aiconsole.core.gpt.consts import (
+    DEFAULT_MODEL_ROUTES,
+    MODEL_DATA,
+    GPTMode,
+    GPTModel,
+)
+
+_log = logging.getLogger(__name__)
+
+
+class ModelRouter:
+    """
+    Routes a request to the first model of its mode whose context fits the request and its preferred completion,
+    escalating to models which fit at least the minimal completion, and then to the largest model, whose history
+    the context planner trims.
+
+    Projects override the routes of modes in the [model_routes] table of their settings, e.g.
+    speed = ["gpt-3.5-turbo-0613", "gpt-4-1106-preview"].
+    """
+
+    def __init__(self, routes: dict[GPTMode, list[str]] = DEFAULT_MODEL_ROUTES):
+        # Model names are kept as plain strings, GPTModel members would reach the provider, metrics and logs as enums
+        self.default_routes = {mode: [GPTModel(model).value for model in models] for mode, models in routes.items()}
+        self.routes = dict(self.default_routes)
+
+    def configure(self, routes: dict[str, list[str]]):
+        self.routes = dict(self.default_routes)
+
+        for mode_name, models in routes.items():
+            try:
+                mode = GPTMode(mode_name)
+            except ValueError:
+                _log.warning(f"Ignoring the model route of unknown mode {mode_name}")
+                continue
+
+            known_models = [model for model in models if model in MODEL_DATA]
+
+            if len(known_models) != len(models):
+                _log.warning(f"Ignoring unknown models in the {mode_name} route: {set(models) - set(known_models)}")
+
+            if known_models:
+                self.routes[mode] = [GPTModel(model).value for model in known_models]
+
+    def candidates(self, mode: GPTMode) -> list[str]:
+        return self.routes.get(mode) or self.default_routes[GPTMode.QUALITY]
+
+    def route(self, mode: GPTMode, count_tokens: Callable[[str], int], min_tokens: int, preferred_tokens: int) -> str:
+        """
+        count_tokens gives the prompt tokens of the request for the given model, it is called once per encoding.
+        """
+        candidates = self.candidates(mode)
+        tokens_by_encoding: dict[str, int] = {}
+
+        for model in candidates:
+            encoding = MODEL_DATA[model].encoding
+
+            if encoding not in tokens_by_encoding:
+                tokens_by_encoding[encoding] = count_tokens(model)
+
+        used_tokens = {model: tokens_by_encoding[MODEL_DATA[model].encoding] for model in candidates}
+
+        for model in candidates:
+            if used_tokens[model] + preferred_tokens <= MODEL_DATA[model].max_tokens:
+                _log.info(f"Routed {mode.value} request of {used_tokens[model]} tokens to {model}")
+                return model
+
+        for model in candidates:
+            if used_tokens[model] + min_tokens <= MODEL_DATA[model].max_tokens:
+                _log.info(
+                    f"Routed {mode.value} request of {used_tokens[model]} tokens to {model},"
+                    f" which fits less than the preferred {preferred_tokens} completion tokens"
+                )
+                return model
+
+        model = max(candidates, key=lambda model: MODEL_DATA[model].max_tokens)
+        _log.info(f"Routed {mode.value} request of {used_tokens[model]} tokens to {model}, its history gets trimmed")
+        return model
+
+    def escalate(self, mode: GPTMode, model: str) -> str | None:
+        """
+        Model of the route with a larger context than the given one, for requests the provider found too long.
+        """
+        max_tokens = MODEL_DATA[model].max_tokens
+
+        for candidate in self.candidates(mode):
+            if MODEL_DATA[candidate].max_tokens > max_tokens:
+                _log.info(f"Escalated {mode.value} request from {model} to {candidate}")
+                return candidate
+
+        return None
+
+
+model_router = ModelRouter()
@@ -1,41 +1,309 @@
 import json
+import re
+from typing import Any
 
+_WHITESPACE = " \t\n\r"
+_LITERAL_START = "-0123456789tfn"
+_LITERAL_CHARS = set("-+.0123456789eEtrufalsn")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
 
-def parse_partial_json(s: str) -> dict | None:
-    try:
-        return json.loads(s)
-    except json.JSONDecodeError:
-        pass
+# What the parser expects next
+_VALUE = 0
+_KEY = 1
+_COLON = 2
+_AFTER_VALUE = 3
+_STRING = 4
+_LITERAL = 5
+
+
+class IncrementalJSONParser:
+    """
+    Parses JSON as it is streamed in, consuming every delta only once.
+
+    value is the object parsed so far, with the string being streamed included as far as it came in, and values
+    which are not complete yet (numbers, true/false/null) left out. Getting it joins the string being streamed, get
+    reads a single key of the top level object without joining a long string of another one. feed returns how string
+    values of the top level object grew, e.g. {"code": "print("}, so consumers can forward deltas instead of diffing
+    whole values.
+
+    Raw control characters in strings are accepted, as models do not always escape newlines.
+    """
+
+    def __init__(self):
+        self.failed = False
+
+        self._root: Any = None
+        self._state = _VALUE
+        # Containers being parsed, each with the key its next value is stored under (None for lists)
+        self._stack: list[tuple[dict | list, list[str | None]]] = []
+
+        self._string: list[str] = []
+        self._string_is_key = False
+        self._string_target: tuple[dict | list, str | int] | None = None
+        self._string_top_level_key: str | None = None
+        self._escape: str | None = None
+        self._high_surrogate: int | None = None
+
+        self._literal: list[str] = []
+
+        self._deltas: dict[str, str] = {}
+
+    @property
+    def value(self) -> Any:
+        if self._state == _STRING and not self._string_is_key:
+            self._store_string()
+
+        return self._root
+
+    def get(self, key: str) -> Any:
+        if not isinstance(self._root, dict):
+            return None
+
+        if self._state == _STRING and not self._string_is_key and self._string_top_level_key in (None, key):
+            self._store_string()
+
+        return self._root.get(key)
+
+    def end_literal(self):
+        """
+        Takes a number, true, false or null cut off at the end of the text as complete, fails if it is not valid.
+        """
+        if self._state == _LITERAL and not self.failed:
+            self._end_literal()
+
+    def feed(self, delta: str) -> dict[str, str]:
+        self._deltas = {}
+
+        i = 0
+        n = len(delta)
+
+        while i < n and not self.failed:
+            state = self._state
+
+            if state == _STRING:
+                if self._escape is not None:
+                    self._feed_escape(delta[i])
+                    i += 1
+                    continue
+
+                match = _STRING_SPECIAL.search(delta, i)
+                end = match.start() if match else n
+
+                if end > i:
+                    self._append_string(delta[i:end])
+
+                if match:
+                    if delta[end] == '"':
+                        self._end_string()
+                    else:
+                        self._escape = ""
+
+                i = end + 1
+                continue
+
+            char = delta[i]
+
+            if state == _LITERAL:
+                if char in _LITERAL_CHARS:
+                    self._literal.append(char)
+                    i += 1
+                else:
+                    # The char ending the literal is handled in the _AFTER_VALUE state
+                    self._end_literal()
+                continue
+
+            i += 1
+
+            if char in _WHITESPACE:
+                continue
+
+            if state == _VALUE:
+                self._feed_value(char)
+            elif state == _KEY:
+                if char == '"':
+                    self._start_string(is_key=True)
+                elif char == "}":
+                    self._close("}")
+                else:
+                    self.failed = True
+            elif state == _COLON:
+                if char == ":":
+                    self._state = _VALUE
+                else:
+                    self.failed = True
+            elif state == _AFTER_VALUE:
+                if not self._stack:
+                    self.failed = True  # Anything after the root value
+                elif char == ",":
+                    self._state = _KEY if isinstance(self._stack[-1][0], dict) else _VALUE
+                elif char in "}]":
+                    self._close(char)
+                else:
+                    self.failed = True
+
+        return self._deltas
+
+    def _feed_value(self, char: str):
+        if char == "{":
+            self._add_value({})
+            self._state = _KEY
+        elif char == "[":
+            self._add_value([])
+            self._state = _VALUE
+        elif char == '"':
+            self._start_string(is_key=False)
+        elif char in _LITERAL_START:
+            self._literal = [char]
+            self._state = _LITERAL
+        elif char == "]" and self._stack and isinstance(self._stack[-1][0], list):
+            # Empty list, or a trailing comma
+            self._close("]")
+        else:
+            self.failed = True
+
+    def _add_value(self, value: Any):
+        if not self._stack:
+            self._root = value
+        else:
+            container, key = self._stack[-1]
 
-    closing_chars_stack = []
-    escaped = False
-    completed_string = []
-
-    for char in s:
-        if closing_chars_stack and closing_chars_stack[-1] == '"':
-            if char == '"' and not escaped:
-                closing_chars_stack.pop()
-            elif char == "\\":
-                escaped = not escaped
-            elif char == "\n" and not escaped:
-                char = "\\n"
+            if isinstance(container, dict):
+                container[key[0]] = value
             else:
-                escaped = False
+                container.append(value)
+
+        if isinstance(value, (dict, list)):
+            self._stack.append((value, [None]))
         else:
-            if char == '"':
-                closing_chars_stack.append('"')
-            elif char == "{":
-                closing_chars_stack.append("}")
-            elif char == "[":
-                closing_chars_stack.append("]")
-            elif char in ["}", "]"] and closing_chars_stack:
-                closing_chars_stack.pop()
+            self._state = _AFTER_VALUE
+
+    def _close(self, char: str):
+        container, _ = self._stack[-1]
+
+        if (char == "}") != isinstance(container, dict):
+            self.failed = True
+            return
+
+        self._stack.pop()
+        self._state = _AFTER_VALUE
+
+    def _start_string(self, is_key: bool):
+        self._state = _STRING
+        self._string = []
+        self._string_is_key = is_key
+        self._string_top_level_key = None
+
+        if is_key:
+            return
+
+        # Stored right away, so the key shows up in value while its string is still streaming
+        self._add_value("")
+        self._state = _STRING
+
+        if not self._stack:
+            self._string_target = None
+            return
+
+        container, key = self._stack[-1]
+
+        if isinstance(container, dict):
+            self._string_target = (container, key[0])
+
+            if len(self._stack) == 1:
+                self._string_top_level_key = key[0]
+        else:
+            self._string_target = (container, len(container) - 1)
+
+    def _append_string(self, text: str):
+        if self._high_surrogate is not None:
+            text = "\ufffd" + text
+            self._high_surrogate = None
+
+        self._string.append(text)
+
+        if self._string_top_level_key is not None:
+            key = self._string_top_level_key
+            self._deltas[key] = self._deltas.get(key, "") + text
+
+    def _feed_escape(self, char: str):
+        if self._escape == "":
+            if char == "u":
+                self._escape = "u"
+            else:
+                self._escape = None
+                self._append_string(_ESCAPES.get(char, char))
+            return
+
+        self._escape += char
 
-        completed_string.append(char)
+        if len(self._escape) < 5:
+            return
 
-    completed_string.extend(reversed(closing_chars_stack))
+        try:
+            code = int(self._escape[1:], 16)
+        except ValueError:
+            self.failed = True
+            return
+        finally:
+            self._escape = None
 
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+        elif 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            high = self._high_surrogate
+            self._high_surrogate = None
+            self._append_string(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            self._append_string(chr(code))
+
+    def _store_string(self):
+        if len(self._string) != 1:
+            self._string = ["".join(self._string)]
+
+        text = self._string[0] if self._string else ""
+
+        if self._string_target is None:
+            self._root = text
+        else:
+            container, key = self._string_target
+            container[key] = text
+
+    def _end_string(self):
+        if self._string_is_key:
+            self._stack[-1][1][0] = "".join(self._string)
+            self._state = _COLON
+        else:
+            self._store_string()
+            self._state = _AFTER_VALUE
+
+        self._string = []
+        self._string_target = None
+        self._string_top_level_key = None
+
+    def _end_literal(self):
+        try:
+            value = json.loads("".join(self._literal))
+        except json.JSONDecodeError:
+            self.failed = True
+            return
+
+        self._literal = []
+        self._add_value(value)
+
+
+def parse_partial_json(s: str) -> dict | None:
     try:
-        return json.loads("".join(completed_string))
+        return json.loads(s)
     except json.JSONDecodeError:
+        pass
+
+    parser = IncrementalJSONParser()
+    parser.feed(s)
+    # As if the text was closed right after it, e.g. {"a": 12 is {"a": 12}, but {"a": tr is not JSON
+    parser.end_literal()
+
+    if parser.failed:
         return None
+
+    return parser.value
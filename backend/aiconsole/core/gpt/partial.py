@@ -14,12 +14,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import Any
+
 from litellm import ModelResponse
 from litellm.utils import Delta, StreamingChoices
 from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall
-from pydantic import BaseModel
 
-from aiconsole.core.gpt.parse_partial_json import parse_partial_json
+from aiconsole.core.gpt.parse_partial_json import IncrementalJSONParser
 from aiconsole.core.gpt.types import (
     GPTChoice,
     GPTFunctionCall,
@@ -28,57 +29,131 @@ from aiconsole.core.gpt.types import (
     GPTRole,
     GPTToolCall,
 )
+from aiconsole.utils.text_builder import TextBuilder
+
+# Plain slotted classes instead of pydantic models, they are updated for every streamed chunk and only converted
+# to a validated GPTResponse once the response is complete.
+
 
+class GPTPartialFunctionCall:
+    __slots__ = (
+        "name",
+        "_arguments",
+        "_arguments_parser",
+        "_arguments_start",
+        "_new_arguments",
+        "_new_string_arguments",
+    )
 
-class GPTPartialFunctionCall(BaseModel):
-    name: str = ""
-    arguments_builder: list[str] = []
+    def __init__(self):
+        self.name = ""
+        self._arguments = TextBuilder("")
+
+        # Arguments are parsed as they come in, a chunk at a time
+        self._arguments_parser = IncrementalJSONParser()
+        self._arguments_start: str | None = None
+        self._new_arguments: list[str] = []
+        self._new_string_arguments: dict[str, list[str]] = {}
 
     @property
     def arguments(self) -> str:
-        self.arguments_builder = ["".join(self.arguments_builder)]
-        return self.arguments_builder[0]
+        return self._arguments.value or ""
 
     @property
     def arguments_dict(self) -> dict | None:
-        return parse_partial_json(self.arguments)
+        if self._arguments_parser.failed:
+            return None
+
+        return self._arguments_parser.value
+
+    def get_argument(self, key: str) -> Any:
+        """
+        Argument streamed so far, unlike arguments_dict it does not join a long string argument not asked for.
+        """
+        if self._arguments_parser.failed:
+            return None
+
+        return self._arguments_parser.get(key)
+
+    @property
+    def arguments_are_json(self) -> bool | None:
+        """
+        Whether the arguments are a JSON object, models sometimes send just the code instead.
+        None until the first non whitespace character comes in.
+        """
+        if self._arguments_start is None:
+            return None
 
+        return self._arguments_start == "{"
 
-class GPTPartialToolsCall(BaseModel):
-    id: str = ""
-    type: str = ""
-    function: GPTPartialFunctionCall = GPTPartialFunctionCall()
+    def append_arguments(self, delta: str):
+        self._arguments.append(delta)
+        self._new_arguments.append(delta)
 
+        if self._arguments_start is None and delta.strip():
+            self._arguments_start = delta.strip()[0]
 
-class GPTPartialMessage(BaseModel):
-    role: GPTRole | None = None
-    content_builder: list[str] | None = None
+        for key, string_delta in self._arguments_parser.feed(delta).items():
+            self._new_string_arguments.setdefault(key, []).append(string_delta)
 
-    tool_calls: list[GPTPartialToolsCall] = []
-    name: str | None = None
+    def pop_arguments_deltas(self) -> tuple[str, dict[str, str]]:
+        """
+        Arguments text, and how string values of the top level arguments grew, since the last call.
+        """
+        arguments_delta = "".join(self._new_arguments)
+        string_deltas = {key: "".join(deltas) for key, deltas in self._new_string_arguments.items()}
+
+        self._new_arguments = []
+        self._new_string_arguments = {}
+
+        return arguments_delta, string_deltas
+
+
+class GPTPartialToolsCall:
+    __slots__ = ("id", "type", "function")
+
+    def __init__(self, id: str = ""):
+        self.id = id
+        self.type = ""
+        self.function = GPTPartialFunctionCall()
+
+
+class GPTPartialMessage:
+    __slots__ = ("role", "_content", "tool_calls", "name")
+
+    def __init__(self):
+        self.role: GPTRole | None = None
+        self._content = TextBuilder()
+        self.tool_calls: list[GPTPartialToolsCall] = []
+        self.name: str | None = None
 
     @property
-    def content(self):
-        if not self.content_builder:
-            return None
+    def content(self) -> str | None:
+        return self._content.value
 
-        self.content_builder = ["".join(self.content_builder)]
-        return self.content_builder[0]
+    def append_content(self, delta: str):
+        self._content.append(delta)
 
 
-class GPTPartialChoice(BaseModel):
-    index: int = 0
-    message: GPTPartialMessage = GPTPartialMessage()
-    role: str = ""
-    finnish_reason: str = ""
+class GPTPartialChoice:
+    __slots__ = ("index", "message", "role", "finnish_reason")
 
+    def __init__(self):
+        self.index = 0
+        self.message = GPTPartialMessage()
+        self.role = ""
+        self.finnish_reason = ""
 
-class GPTPartialResponse(BaseModel):
-    id: str = ""
-    object: str = ""
-    created: int = 0
-    model: str = ""
-    choices: list[GPTPartialChoice] = []
+
+class GPTPartialResponse:
+    __slots__ = ("id", "object", "created", "model", "choices")
+
+    def __init__(self):
+        self.id = ""
+        self.object = ""
+        self.created = 0
+        self.model = ""
+        self.choices: list[GPTPartialChoice] = []
 
     def to_final_response(self):
         return GPTResponse(
@@ -139,17 +214,15 @@ class GPTPartialResponse(BaseModel):
                 if isinstance(chunk_choice, StreamingChoices):
                     chunk_delta = chunk_choice.delta
 
-                    if "name" in chunk_delta:
+                    # Only the first chunk carries them, the following ones have them set to None
+                    if "name" in chunk_delta and chunk_delta["name"] is not None:
                         message.name = chunk_delta["name"]
 
-                    if "role" in chunk_delta:
+                    if "role" in chunk_delta and chunk_delta["role"] is not None:
                         message.role = chunk_delta["role"]
 
                     if "content" in chunk_delta and chunk_delta["content"] is not None:
-                        if message.content_builder is None:
-                            message.content_builder = []
-
-                        message.content_builder.append(chunk_delta["content"])
+                        message.append_content(chunk_delta["content"])
 
                     if "tool_calls" in chunk_delta:
                         assert isinstance(chunk_delta, Delta)
@@ -177,6 +250,6 @@ class GPTPartialResponse(BaseModel):
                                         message.tool_calls[chunk_tool_index].function.name = chunk_tool_function.name
 
                                     if chunk_tool_function.arguments is not None:
-                                        message.tool_calls[chunk_tool_index].function.arguments_builder.append(
+                                        message.tool_calls[chunk_tool_index].function.append_arguments(
                                             chunk_tool_function.arguments
                                         )
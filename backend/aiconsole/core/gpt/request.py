@@ -18,10 +18,21 @@ import json
 import logging
 from typing import Any, Literal
 
-import tiktoken
 from pydantic import BaseModel
 
-from aiconsole.core.gpt.consts import MODEL_DATA, GPTMode, GPTModel
+from aiconsole.core.gpt.consts import MODEL_DATA, GPTMode, GPTPriority
+from aiconsole.core.gpt.context_planner import (
+    ContextPlan,
+    ContextPlanner,
+    default_context_planner,
+)
+from aiconsole.core.gpt.model_router import model_router
+from aiconsole.core.gpt.retry_policy import RetryPolicy
+from aiconsole.core.gpt.token_counter import (
+    count_tokens_of_parts,
+    get_encoding,
+    token_count_cache,
+)
 from aiconsole.core.gpt.token_error import TokenError
 from aiconsole.core.gpt.types import (
     EnforcedFunctionCall,
@@ -63,6 +74,11 @@ class GPTRequest:
         presence_penalty: float = 0,
         min_tokens: int = 0,
         preferred_tokens: int = 0,
+        context_planner: ContextPlanner | None = default_context_planner,
+        cache: bool | None = None,
+        retry_policy: RetryPolicy | None = None,
+        priority: GPTPriority = GPTPriority.INTERACTIVE,
+        caller: str | None = None,
     ):
         self.system_message = system_message
         self.messages = messages
@@ -71,7 +87,25 @@ class GPTRequest:
         self.temperature = temperature
         self.gpt_mode = gpt_mode
         self.presence_penalty = presence_penalty
+        # Whether the response may come from the response cache, None for deterministic requests only
+        self.cache = cache
+        self.retry_policy = retry_policy
+        self.priority = priority
+        # Execution mode and agent making the request, for the request metrics
+        self.caller = caller
         self.max_tokens = 0
+        self.context_plan: ContextPlan | None = None
+        self._preferred_tokens = preferred_tokens
+
+        self.model = model_router.route(
+            gpt_mode,
+            lambda model: self.count_tokens_for_model(model) + EXTRA_BUFFER_FOR_ENCODING_OVERHEAD,
+            min_tokens=min_tokens,
+            preferred_tokens=preferred_tokens,
+        )
+
+        if context_planner is not None:
+            self._plan_context(context_planner, min_tokens=min_tokens, preferred_tokens=preferred_tokens)
 
         # Checks if the given prompt can fit within a specified range of token lengths for the specified AI model.
 
@@ -91,6 +125,46 @@ class GPTRequest:
 
         self.max_tokens = min(available_tokens, preferred_tokens)
 
+    def _plan_context(self, context_planner: ContextPlanner, min_tokens: int, preferred_tokens: int):
+        encoding = get_encoding(self.model_data.encoding)
+
+        context_tokens = self.model_max_tokens
+        if context_planner.max_context_tokens is not None:
+            context_tokens = min(context_tokens, context_planner.max_context_tokens)
+
+        fixed_tokens = count_tokens_of_parts(encoding, [json.dumps(f.model_dump()) for f in self.tools]) + 1
+        if self.system_message:
+            fixed_tokens += self.count_message_tokens(
+                GPTRequestTextMessage(role="system", content=self.system_message), encoding
+            )
+
+        budget = context_tokens - EXTRA_BUFFER_FOR_ENCODING_OVERHEAD - fixed_tokens - max(min_tokens, preferred_tokens)
+
+        def count_message_tokens(message: GPTRequestMessage) -> int:
+            return self.count_message_tokens(message, encoding)
+
+        self.context_plan = context_planner.plan(self.messages, count_message_tokens, budget)
+
+        # Rather a shorter completion than a history missing messages
+        if self.context_plan.dropped_messages and min_tokens < preferred_tokens:
+            budget += preferred_tokens - min_tokens
+            self.context_plan = context_planner.plan(self.messages, count_message_tokens, budget)
+
+        self.messages = self.context_plan.messages
+
+        if self.context_plan.notice:
+            self.system_message = (
+                f"{self.system_message}\n\n{self.context_plan.notice}"
+                if self.system_message
+                else self.context_plan.notice
+            )
+
+        if self.context_plan.elided:
+            _log.info(
+                f"Fitted the history into {budget} tokens, dropped {self.context_plan.dropped_messages} messages"
+                f" and truncated {len(self.context_plan.truncated_tool_outputs)} tool outputs"
+            )
+
     def get_messages_dump(self):
         return [message.model_dump() for message in self.all_messages]
 
@@ -101,42 +175,54 @@ class GPTRequest:
         else:
             return self.messages
 
-    @property
-    def model(self):
-        return self.get_model(self.gpt_mode)
-
     @property
     def model_data(self):
         return MODEL_DATA[self.model]
 
     @property
     def model_max_tokens(self):
-        if self.gpt_mode == GPTMode.SPEED:
-            return MODEL_DATA[GPTModel.GPT_35_TURBO_16k_0613].max_tokens
-
         return self.model_data.max_tokens
 
-    def count_tokens(self):
-        encoding = tiktoken.encoding_for_model(self.model_data.encoding)
+    def escalate(self) -> bool:
+        """
+        Switches to a model of the route with a larger context, returns False if there is none.
+        """
+        model = model_router.escalate(self.gpt_mode, self.model)
 
-        if self.tools:
-            functions_tokens = len(encoding.encode(",".join(json.dumps(f.model_dump()) for f in self.tools)))
-        else:
-            functions_tokens = 0
-        return self.count_messages_tokens(encoding) + functions_tokens
+        if model is None:
+            return False
+
+        self.model = model
+        available_tokens = self.model_max_tokens - self.count_tokens() - EXTRA_BUFFER_FOR_ENCODING_OVERHEAD
+        self.max_tokens = max(self.max_tokens, min(available_tokens, self._preferred_tokens))
+
+        return True
+
+    def count_tokens(self):
+        return self.count_tokens_for_model(self.model)
 
     def count_tokens_for_model(self, model):
-        encoding = tiktoken.encoding_for_model(MODEL_DATA[model].encoding)
-        return self.count_messages_tokens(encoding)
+        encoding = get_encoding(MODEL_DATA[model].encoding)
+
+        functions_tokens = count_tokens_of_parts(encoding, [json.dumps(f.model_dump()) for f in self.tools])
+
+        return self.count_messages_tokens(encoding) + functions_tokens
 
     def count_messages_tokens(self, encoding):
-        messages_str = json.dumps(self.get_messages_dump())
-        messages_tokens = len(encoding.encode(messages_str))
+        # Counted per message, so only messages not seen in earlier requests get encoded
+        messages = self.all_messages
 
-        return messages_tokens
+        if not messages:
+            return 0
+
+        return sum(token_count_cache.count_message(encoding, message) for message in messages) + len(messages) + 1
+
+    def count_message_tokens(self, message: GPTRequestMessage, encoding) -> int:
+        # Same as the share of a single message in count_messages_tokens
+        return token_count_cache.count_message(encoding, message) + 1
 
     def count_tokens_output(self, message_content: str, message_function_call: dict | None):
-        encoding = tiktoken.encoding_for_model(self.model_data.encoding)
+        encoding = get_encoding(self.model_data.encoding)
 
         return len(encoding.encode(message_content)) + (
             len(encoding.encode(json.dumps(message_function_call))) if message_function_call else 0
@@ -159,14 +245,3 @@ class GPTRequest:
             raise TokenError(
                 f"Exceeded the token limit by {self.max_tokens - (used_tokens - model_max_tokens)}, delete/edit some messages or reorganise materials."
             )
-
-    def get_model(self, mode: GPTMode) -> str:
-        model = GPTModel.GPT_4_11106_PREVIEW
-        # if mode == GPTMode.SPEED:
-        #     model = GPTModel.GPT_35_TURBO_16k_0613
-        #     used_tokens = self.count_tokens_for_model(model) + self.max_tokens
-        #
-        #     if used_tokens < MODEL_DATA[GPTModel.GPT_35_TURBO_0613].max_tokens * 0.9:
-        #        model = GPTModel.GPT_35_TURBO_0613
-
-        return model.value
@@ -0,0 +1,113 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Latency and size records of GPT requests, aggregated in memory, to see where the time of a chat turn goes.
+
+"""
+
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from aiconsole.consts import GPT_METRICS_MAX_RECORDS
+
+_PERCENTILES = (50, 90, 99)
+_MEASURES = (
+    "queue_wait_s",
+    "time_to_first_token_s",
+    "duration_s",
+    "tokens_per_second",
+    "prompt_tokens",
+    "completion_tokens",
+)
+
+
+@dataclass
+class GPTRequestRecord:
+    model: str
+    # Execution mode and agent which made the request, e.g. "interpreter/assistant"
+    caller: str | None = None
+    started_at: float = field(default_factory=time.time)
+    attempts: int = 0
+    cached: bool = False
+    # Waiting for the rate limits, over all attempts
+    queue_wait_s: float = 0
+    # From sending the successful attempt to its first chunk
+    time_to_first_token_s: float | None = None
+    # Of the whole request, including waits and failed attempts
+    duration_s: float | None = None
+    tokens_per_second: float | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    # Nearest rank
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(records: list[GPTRequestRecord]) -> dict:
+    summary: dict = {
+        "count": len(records),
+        "errors": sum(1 for record in records if record.error is not None),
+        "cached": sum(1 for record in records if record.cached),
+        "retries": sum(max(0, record.attempts - 1) for record in records),
+    }
+
+    for measure in _MEASURES:
+        values = sorted(value for record in records if (value := getattr(record, measure)) is not None)
+
+        summary[measure] = {f"p{p}": percentile(values, p) for p in _PERCENTILES} if values else None
+
+    return summary
+
+
+class GPTRequestMetrics:
+    """
+    Keeps the most recent records, so the aggregates follow the current behaviour of the models.
+    """
+
+    def __init__(self, max_records: int = GPT_METRICS_MAX_RECORDS):
+        self.records: deque[GPTRequestRecord] = deque(maxlen=max_records)
+
+    def add(self, record: GPTRequestRecord):
+        self.records.append(record)
+
+    def _group(self, key: str) -> dict[str, list[GPTRequestRecord]]:
+        groups: dict[str, list[GPTRequestRecord]] = {}
+
+        for record in self.records:
+            groups.setdefault(str(getattr(record, key)), []).append(record)
+
+        return groups
+
+    def stats(self, recent: int = 20) -> dict:
+        return {
+            "all": summarize(list(self.records)),
+            "by_model": {model: summarize(records) for model, records in self._group("model").items()},
+            "by_caller": {caller: summarize(records) for caller, records in self._group("caller").items()},
+            "recent": [record.to_dict() for record in list(self.records)[-recent:]],
+        }
+
+
+gpt_request_metrics = GPTRequestMetrics()
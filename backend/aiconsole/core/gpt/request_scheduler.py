@@ -0,0 +1,241 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Process wide scheduling of LLM requests, so concurrent chats share the provider's rate limits instead of all running
+into them and slowing down through retries.
+
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable
+
+from aiconsole.consts import GPT_RATE_LIMITS
+from aiconsole.core.gpt.consts import GPTPriority
+
+_log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Allows up to per_minute units a minute, in bursts of up to a minute's worth.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.level
+
+    def time_until(self, amount: float) -> float:
+        self._refill()
+        return max(0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class GPTRequestTicket:
+    """
+    A request waiting for its turn, position is 0 for the next one to go.
+    """
+
+    def __init__(self, limiter: "_ModelLimiter", priority: GPTPriority, seq: int, tokens: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._limiter = limiter
+        self._seq = seq
+
+    def __lt__(self, other: "GPTRequestTicket") -> bool:
+        return (self.priority, self._seq) < (other.priority, other._seq)
+
+    @property
+    def position(self) -> int | None:
+        if self.future.done():
+            return None
+
+        return sum(1 for ticket in self._limiter.queue if ticket < self and not ticket.future.done())
+
+
+class _ModelLimiter:
+    def __init__(self, requests_per_minute: int | None, tokens_per_minute: int | None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.queue: list[GPTRequestTicket] = []
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    def pump(self):
+        """
+        Lets waiting requests through in priority order, for as long as the limits allow.
+        """
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        while self.queue:
+            ticket = self.queue[0]
+
+            if ticket.future.done():  # Cancelled while waiting
+                heapq.heappop(self.queue)
+                continue
+
+            delay = max(
+                self.requests.time_until(1) if self.requests else 0,
+                self.tokens.time_until(ticket.tokens) if self.tokens else 0,
+            )
+
+            if delay > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self.pump)
+                return
+
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(ticket.tokens)
+
+            heapq.heappop(self.queue)
+            ticket.future.set_result(None)
+
+
+class _WaitStats:
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, wait_s: float):
+        self.count += 1
+        self.total_s += wait_s
+        self.max_s = max(self.max_s, wait_s)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "average_s": self.total_s / self.count if self.count else 0,
+            "max_s": self.max_s,
+        }
+
+
+class GPTRequestScheduler:
+    """
+    Token bucket limits of requests and tokens per minute for each model, with requests let through by priority
+    (interactive agent turns before director analysis), first come first served within a priority.
+
+    Models without configured limits are not limited. Projects set the limits of their OpenAI tier in the
+    [rate_limits] table of their settings, e.g. "gpt-4-0613" = { requests_per_minute = 500, tokens_per_minute = 10000 }.
+    """
+
+    def __init__(self, limits: dict[str, tuple[int | None, int | None]] = GPT_RATE_LIMITS):
+        self.default_limits = dict(limits)
+        self.limits = dict(self.default_limits)
+        self._limiters: dict[str, _ModelLimiter] = {}
+        self._seq = itertools.count()
+        self._waits: dict[GPTPriority, _WaitStats] = {priority: _WaitStats() for priority in GPTPriority}
+
+    def configure(self, limits: dict[str, dict[str, int]]):
+        previous_limits = self.limits
+        self.limits = dict(self.default_limits)
+
+        for model, model_limits in limits.items():
+            unknown_keys = set(model_limits) - {"requests_per_minute", "tokens_per_minute"}
+
+            if unknown_keys:
+                _log.warning(f"Ignoring unknown rate limits of {model}: {unknown_keys}")
+
+            self.limits[model] = (model_limits.get("requests_per_minute"), model_limits.get("tokens_per_minute"))
+
+        for model, old_limiter in list(self._limiters.items()):
+            if self.limits.get(model) == previous_limits.get(model):
+                continue
+
+            # Requests waiting for the old limits wait for the new ones, in the same order
+            limiter = _ModelLimiter(*self.limits.get(model, (None, None)))
+            limiter.queue = old_limiter.queue
+            for ticket in limiter.queue:
+                ticket._limiter = limiter
+
+            if old_limiter._wakeup is not None:
+                old_limiter._wakeup.cancel()
+
+            self._limiters[model] = limiter
+            limiter.pump()
+
+    def _limiter(self, model: str) -> _ModelLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = _ModelLimiter(*self.limits.get(model, (None, None)))
+
+        return self._limiters[model]
+
+    def enqueue(self, model: str, tokens: int, priority: GPTPriority = GPTPriority.INTERACTIVE) -> GPTRequestTicket:
+        limiter = self._limiter(model)
+        ticket = GPTRequestTicket(limiter, priority, next(self._seq), tokens)
+
+        heapq.heappush(limiter.queue, ticket)
+        limiter.pump()
+
+        return ticket
+
+    async def wait(self, ticket: GPTRequestTicket):
+        try:
+            await asyncio.shield(ticket.future)
+        except asyncio.CancelledError:
+            if not ticket.future.done():
+                ticket.future.cancel()
+                ticket._limiter.pump()
+            raise
+
+        wait_s = time.monotonic() - ticket.enqueued_at
+        self._waits[ticket.priority].add(wait_s)
+
+        if wait_s > 1:
+            _log.info(f"GPT request waited {wait_s:.1f}s for the rate limits")
+
+    async def acquire(self, model: str, tokens: int, priority: GPTPriority = GPTPriority.INTERACTIVE):
+        await self.wait(self.enqueue(model, tokens, priority))
+
+    def stats(self) -> dict:
+        return {
+            "models": {
+                model: {
+                    "queued": sum(1 for ticket in limiter.queue if not ticket.future.done()),
+                    "requests_available": int(limiter.requests.available()) if limiter.requests else None,
+                    "tokens_available": int(limiter.tokens.available()) if limiter.tokens else None,
+                }
+                for model, limiter in self._limiters.items()
+            },
+            "wait": {priority.name.lower(): stats.to_dict() for priority, stats in self._waits.items()},
+        }
+
+
+gpt_request_scheduler = GPTRequestScheduler()
@@ -0,0 +1,240 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Disk cache of complete LLM responses, keyed by the canonical form of the request, so identical requests (e.g. an
+analysis re-run on an unchanged chat, or a replayed test) do not go back to the provider.
+
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from litellm import ModelResponse
+from litellm.utils import Delta, StreamingChoices
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
+
+from aiconsole.consts import (
+    GPT_CACHE_ENABLED,
+    GPT_CACHE_MAX_AGE_S,
+    GPT_CACHE_MAX_BYTES,
+)
+from aiconsole.core.gpt.types import GPTResponse
+
+_log = logging.getLogger(__name__)
+
+
+class GPTResponseCache:
+    def __init__(
+        self,
+        directory: Path | None = None,
+        enabled: bool = GPT_CACHE_ENABLED,
+        max_bytes: int = GPT_CACHE_MAX_BYTES,
+        max_age_s: float = GPT_CACHE_MAX_AGE_S,
+    ):
+        self._directory = directory
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def directory(self) -> Path | None:
+        if self._directory is not None:
+            return self._directory
+
+        from aiconsole.core.project.paths import get_gpt_cache_directory
+        from aiconsole.core.project.project import is_project_initialized
+
+        # Cached responses belong to a project
+        if not is_project_initialized():
+            return None
+
+        return get_gpt_cache_directory()
+
+    def should_cache(self, request_dict: dict, force: bool | None = None) -> bool:
+        """
+        force=None caches deterministic requests only, True caches any request and False none.
+        """
+        if not self.enabled or force is False:
+            return False
+
+        return force or request_dict.get("temperature", 1) == 0
+
+    def key(self, request_dict: dict) -> str:
+        canonical = json.dumps(request_dict, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def get(self, key: str) -> GPTResponse | None:
+        directory = self.directory
+        response = None
+
+        if directory is not None:
+            response = await asyncio.to_thread(self._read, directory / f"{key}.json")
+
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return response
+
+    async def put(self, key: str, response: GPTResponse):
+        directory = self.directory
+
+        if directory is None:
+            return
+
+        await asyncio.to_thread(self._write, directory, key, response)
+        self.stores += 1
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+    def _read(self, path: Path) -> GPTResponse | None:
+        try:
+            stat = path.stat()
+
+            if time.time() - stat.st_mtime > self.max_age_s:
+                path.unlink(missing_ok=True)
+                self.evictions += 1
+                return None
+
+            with path.open("r", encoding="utf8") as file:
+                return GPTResponse.model_validate_json(file.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            _log.warning(f"Ignoring unreadable cached response {path}: {e}")
+            return None
+
+    def _write(self, directory: Path, key: str, response: GPTResponse):
+        directory.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = directory / f"{key}.json.tmp"
+        with tmp_path.open("w", encoding="utf8") as file:
+            file.write(response.model_dump_json())
+        os.replace(tmp_path, directory / f"{key}.json")
+
+        self._evict(directory)
+
+    def _evict(self, directory: Path):
+        entries = []
+        now = time.time()
+
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+
+                stat = entry.stat()
+
+                if now - stat.st_mtime > self.max_age_s:
+                    os.unlink(entry.path)
+                    self.evictions += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        # Oldest first
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            os.unlink(path)
+            total -= size
+            self.evictions += 1
+
+
+def response_to_chunks(response: GPTResponse, chunk_chars: int | None = None) -> list[ModelResponse]:
+    """
+    Replays a complete response as the stream of chunks it could have been received as, with texts split into
+    pieces of chunk_chars characters (or sent whole).
+    """
+    chunks = []
+
+    for choice in response.choices:
+        message = choice.message
+        pieces = _split(message.content, chunk_chars)
+
+        deltas = [Delta(role=message.role, content=pieces[0] if pieces else None)]
+        deltas.extend(Delta(content=piece) for piece in pieces[1:])
+
+        for index, tool_call in enumerate(message.tool_calls):
+            for i, piece in enumerate(_split(tool_call.function.arguments, chunk_chars) or [""]):
+                deltas.append(
+                    Delta(
+                        tool_calls=[
+                            ChoiceDeltaToolCall(
+                                index=index,
+                                id=tool_call.id if i == 0 else None,
+                                type="function" if i == 0 else None,
+                                function=ChoiceDeltaToolCallFunction(
+                                    name=tool_call.function.name if i == 0 else None, arguments=piece
+                                ),
+                            )
+                        ]
+                    )
+                )
+
+        for i, delta in enumerate(deltas):
+            chunk = ModelResponse(id=response.id, created=response.created, model=response.model, stream=True)
+            chunk.choices = [
+                StreamingChoices(
+                    index=choice.index,
+                    delta=delta,
+                    finish_reason=(choice.finnish_reason or None) if i == len(deltas) - 1 else None,
+                )
+            ]
+            chunks.append(chunk)
+
+    return chunks
+
+
+def _split(text: str | None, chunk_chars: int | None) -> list[str]:
+    if not text:
+        return []
+
+    if chunk_chars is None:
+        return [text]
+
+    return [text[i : i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+
+gpt_response_cache = GPTResponseCache()
@@ -0,0 +1,141 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Retrying failed and stalled LLM requests.
+
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+from openai import OpenAIError
+
+from aiconsole.consts import (
+    GPT_FIRST_TOKEN_TIMEOUT_S,
+    GPT_RETRY_BASE_DELAY_S,
+    GPT_RETRY_MAX_ATTEMPTS,
+    GPT_RETRY_MAX_DELAY_S,
+    GPT_STALL_TIMEOUT_S,
+)
+
+# Request timeout, conflict and rate limiting, anything else below 500 will fail again the same way
+_RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+_log = logging.getLogger(__name__)
+
+
+class GPTStreamTimeoutError(Exception):
+    pass
+
+
+# Errors of the provider (litellm's subclass the ones of openai) and of the connection to it, anything else is a bug
+# which fails again the same way
+_RETRYABLE_ERRORS = (OpenAIError, ConnectionError, TimeoutError, GPTStreamTimeoutError)
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = GPT_RETRY_MAX_ATTEMPTS
+    base_delay_s: float = GPT_RETRY_BASE_DELAY_S
+    max_delay_s: float = GPT_RETRY_MAX_DELAY_S
+    # Share of the backoff delay which is randomised, so clients which failed together do not retry together
+    jitter: float = 0.5
+    first_token_timeout_s: float | None = GPT_FIRST_TOKEN_TIMEOUT_S
+    stall_timeout_s: float | None = GPT_STALL_TIMEOUT_S
+    # Send a second, identical request if the first one has not produced a token by then, whichever is first wins
+    hedge_after_s: float | None = None
+
+    def is_retryable(self, error: Exception) -> bool:
+        if not isinstance(error, _RETRYABLE_ERRORS):
+            return False
+
+        status_code = getattr(error, "status_code", None)
+
+        if isinstance(status_code, int) and 400 <= status_code < 500:
+            return status_code in _RETRYABLE_STATUS_CODES
+
+        # Server errors, timeouts, dropped connections and the like
+        return True
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """
+        Seconds to wait before retrying after the given attempt (counted from 0) failed.
+        """
+        retry_after = _retry_after(error)
+
+        if retry_after is not None:
+            return retry_after
+
+        delay = min(self.max_delay_s, self.base_delay_s * 2**attempt)
+
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+
+    if not headers:
+        return None
+
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+
+    return None
+
+
+async def wait_for_chunk(iterator, timeout_s: float | None, what: str):
+    """
+    Next chunk of a stream, None at its end.
+    """
+    try:
+        return await asyncio.wait_for(iterator.__anext__(), timeout_s)
+    except StopAsyncIteration:
+        return None
+    except asyncio.TimeoutError:
+        raise GPTStreamTimeoutError(f"No {what} in {timeout_s}s")
+
+
+async def close_stream(iterator):
+    """
+    Closes a stream which is not read to its end, so that its connection is not left open until it is collected.
+    """
+    aclose = getattr(iterator, "aclose", None)
+
+    if aclose is None:
+        return
+
+    try:
+        await aclose()
+    except Exception as e:
+        _log.debug(f"Failed to close a GPT stream: {e}")
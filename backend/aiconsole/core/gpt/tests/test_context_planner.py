@@ -0,0 +1,114 @@
+import pytest
+
+from aiconsole.core.gpt import request
+from aiconsole.core.gpt.consts import GPTMode
+from aiconsole.core.gpt.context_planner import TrimmingContextPlanner
+from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.token_counter import token_count_cache
+from aiconsole.core.gpt.types import (
+    GPTFunctionCall,
+    GPTRequestMessage,
+    GPTRequestTextMessage,
+    GPTRequestToolMessage,
+    GPTToolCall,
+)
+
+
+def _count(message: GPTRequestMessage) -> int:
+    return len(message.content or "") + 1
+
+
+def _turn(i: int, output: str) -> list[GPTRequestMessage]:
+    return [
+        GPTRequestTextMessage(role="user", content=f"question {i}"),
+        GPTRequestTextMessage(
+            role="assistant",
+            content="",
+            tool_calls=[GPTToolCall(id=f"call_{i}", function=GPTFunctionCall(name="python", arguments="{}"))],
+        ),
+        GPTRequestToolMessage(tool_call_id=f"call_{i}", content=output),
+    ]
+
+
+def test_should_keep_messages_which_fit():
+    messages = _turn(0, "output")
+
+    plan = TrimmingContextPlanner().plan(messages, _count, budget=1000)
+
+    assert plan.messages is messages
+    assert not plan.elided
+
+
+def test_should_truncate_old_tool_outputs_first():
+    messages = [*_turn(0, "x" * 10_000), *_turn(1, "y" * 10_000)]
+    planner = TrimmingContextPlanner(keep_recent_messages=3, tool_output_head_chars=100, tool_output_tail_chars=100)
+
+    plan = planner.plan(messages, _count, budget=10_500)
+
+    assert plan.truncated_tool_outputs == ["call_0"]
+    assert plan.dropped_messages == 0
+    assert plan.messages[2].content.startswith("x" * 100)
+    assert plan.messages[5].content == "y" * 10_000
+    assert plan.tokens <= 10_500
+
+
+def test_should_drop_oldest_turns_with_their_tool_outputs():
+    messages = [message for i in range(10) for message in _turn(i, "z" * 100)]
+    planner = TrimmingContextPlanner(keep_recent_messages=3)
+
+    plan = planner.plan(messages, _count, budget=500)
+
+    assert plan.dropped_messages > 0
+    assert plan.notice is not None
+    # Tool outputs belong to the assistant message calling the tool, they are dropped together
+    assert not isinstance(plan.messages[0], GPTRequestToolMessage)
+    assert plan.messages[-1] == messages[-1]
+    assert plan.tokens <= 500
+    notice_tokens = _count(GPTRequestTextMessage(role="system", content=plan.notice))
+    assert plan.tokens == sum(_count(message) for message in plan.messages) + notice_tokens
+
+
+class _WordEncoding:
+    name = "words"
+
+    def encode(self, text: str) -> list[str]:
+        return text.split()
+
+
+@pytest.fixture
+def words(monkeypatch):
+    monkeypatch.setattr(request, "get_encoding", lambda model: _WordEncoding())
+    token_count_cache.clear()
+
+
+def _request(planner: TrimmingContextPlanner) -> GPTRequest:
+    messages = [GPTRequestTextMessage(role="user", content=f"question {i} " + "word " * 100) for i in range(10)]
+
+    return GPTRequest(
+        system_message="system",
+        messages=messages,
+        gpt_mode=GPTMode.QUALITY,
+        min_tokens=100,
+        preferred_tokens=1000,
+        context_planner=planner,
+    )
+
+
+def test_request_should_shorten_the_completion_before_dropping_messages(words):
+    full_request = _request(TrimmingContextPlanner())
+    # Fits the history with the minimal completion, but not with the preferred one
+    max_context_tokens = full_request.count_tokens() + request.EXTRA_BUFFER_FOR_ENCODING_OVERHEAD + 500
+
+    plan = _request(TrimmingContextPlanner(max_context_tokens=max_context_tokens)).context_plan
+
+    assert plan is not None and not plan.elided
+
+
+def test_request_should_tell_about_dropped_messages_in_its_system_message(words):
+    limited_request = _request(
+        TrimmingContextPlanner(max_context_tokens=_request(TrimmingContextPlanner()).count_tokens())
+    )
+
+    assert limited_request.context_plan is not None and limited_request.context_plan.notice
+    assert limited_request.system_message == f"system\n\n{limited_request.context_plan.notice}"
+    assert all(message.role == "user" for message in limited_request.messages)
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from aiconsole.core.gpt.consts import GPTMode
+from aiconsole.core.gpt.fake_provider import FakeGPTProvider
+from aiconsole.core.gpt.gpt_executor import GPTExecutor
+from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.types import (
+    GPTChoice,
+    GPTFunctionCall,
+    GPTRequestTextMessage,
+    GPTResponse,
+    GPTResponseMessage,
+    GPTToolCall,
+)
+
+SCRIPTED = GPTResponse(
+    id="scripted",
+    choices=[
+        GPTChoice(
+            index=0,
+            message=GPTResponseMessage(
+                role="assistant",
+                content="Let me run that",
+                tool_calls=[
+                    GPTToolCall(
+                        id="call", function=GPTFunctionCall(name="python", arguments='{"code": "print(\\"hi\\")"}')
+                    )
+                ],
+            ),
+            finnish_reason="tool_calls",
+        )
+    ],
+)
+
+
+def _request(content: str) -> GPTRequest:
+    return GPTRequest(
+        system_message="",
+        messages=[GPTRequestTextMessage(role="user", content=content)],
+        gpt_mode=GPTMode.QUALITY,
+        preferred_tokens=100,
+    )
+
+
+@pytest.mark.asyncio
+async def test_should_stream_scripted_response():
+    provider = FakeGPTProvider([SCRIPTED], tokens_per_second=0, time_to_first_token_s=0)
+    executor = GPTExecutor(provider.acompletion)
+
+    chunks = [chunk async for chunk in executor.execute(_request("Hi"))]
+
+    assert len(chunks) > 1
+    assert executor.response.choices == SCRIPTED.choices
+    assert executor.response.choices[0].message.tool_calls[0].function.arguments_dict == {"code": 'print("hi")'}
+    assert provider.requests[0]["messages"][-1]["content"] == "Hi"
+
+
+@pytest.mark.asyncio
+async def test_should_pace_chunks():
+    provider = FakeGPTProvider(tokens_per_second=200, time_to_first_token_s=0.05)
+    executor = GPTExecutor(provider.acompletion)
+
+    start = time.perf_counter()
+    chunks = [chunk async for chunk in executor.execute(_request("x" * 40))]
+    elapsed = time.perf_counter() - start
+
+    assert executor.response.choices[0].message.content == "This is a fake response to: " + "x" * 40
+    assert elapsed >= 0.05 + (len(chunks) - 1) / 200
@@ -0,0 +1,80 @@
+import pytest
+
+from aiconsole.core.gpt.consts import GPTMode, GPTModel
+from aiconsole.core.gpt.model_router import ModelRouter, model_router
+from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.types import GPTRequestTextMessage
+
+ROUTES = {GPTMode.SPEED: [GPTModel.GPT_35_TURBO_0613, GPTModel.GPT_35_TURBO_16k_0613, GPTModel.GPT_4_11106_PREVIEW]}
+
+
+def test_should_pick_the_first_model_which_fits_the_preferred_tokens():
+    router = ModelRouter(ROUTES)
+
+    def route(used_tokens: int) -> str:
+        return router.route(GPTMode.SPEED, lambda model: used_tokens, min_tokens=250, preferred_tokens=2000)
+
+    assert route(1000) == GPTModel.GPT_35_TURBO_0613
+    assert route(3000) == GPTModel.GPT_35_TURBO_16k_0613
+    # Fits the minimal completion in the 4k model, but the preferred one only in the 16k one
+    assert route(3800) == GPTModel.GPT_35_TURBO_16k_0613
+    assert route(20000) == GPTModel.GPT_4_11106_PREVIEW
+    assert route(200000) == GPTModel.GPT_4_11106_PREVIEW
+
+
+def test_should_count_tokens_once_per_encoding():
+    router = ModelRouter(ROUTES)
+    counted: list[str] = []
+
+    def count_tokens(model: str) -> int:
+        counted.append(model)
+        return 200000
+
+    router.route(GPTMode.SPEED, count_tokens, min_tokens=250, preferred_tokens=2000)
+
+    assert counted == [GPTModel.GPT_35_TURBO_0613, GPTModel.GPT_4_11106_PREVIEW]
+
+
+def test_should_escalate_to_larger_contexts():
+    router = ModelRouter(ROUTES)
+
+    assert router.escalate(GPTMode.SPEED, GPTModel.GPT_35_TURBO_0613) == GPTModel.GPT_35_TURBO_16k_0613
+    assert router.escalate(GPTMode.SPEED, GPTModel.GPT_4_11106_PREVIEW) is None
+
+
+def test_should_take_routes_from_settings():
+    router = ModelRouter(ROUTES)
+
+    router.configure({"speed": [GPTModel.GPT_4_0613, "unknown-model"], "unknown-mode": [GPTModel.GPT_4_0613]})
+    assert router.candidates(GPTMode.SPEED) == [GPTModel.GPT_4_0613]
+    assert all(type(model) is str for model in router.candidates(GPTMode.SPEED))
+
+    router.configure({})
+    assert router.candidates(GPTMode.SPEED) == ROUTES[GPTMode.SPEED]
+
+
+@pytest.mark.parametrize(
+    "mode, expected",
+    [
+        (GPTMode.QUALITY, GPTModel.GPT_4_11106_PREVIEW),
+        (GPTMode.SPEED, GPTModel.GPT_35_TURBO_16k_0613),
+        (GPTMode.COST, GPTModel.GPT_35_TURBO_0613),
+    ],
+)
+def test_request_should_use_the_model_of_its_mode(mode: GPTMode, expected: str):
+    request = GPTRequest(
+        system_message="",
+        messages=[GPTRequestTextMessage(role="user", content="Hi")],
+        gpt_mode=mode,
+        min_tokens=250,
+        preferred_tokens=2000,
+    )
+
+    assert request.model == expected
+    assert type(request.model) is str
+    assert request.max_tokens == 2000
+
+    if mode != GPTMode.QUALITY:
+        assert request.escalate()
+        assert request.model == model_router.candidates(mode)[1]
+        assert type(request.model) is str
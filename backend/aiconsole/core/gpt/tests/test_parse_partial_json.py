@@ -0,0 +1,94 @@
+import json
+
+from aiconsole.core.gpt import parse_partial_json as parse_partial_json_module
+from aiconsole.core.gpt.parse_partial_json import (
+    IncrementalJSONParser,
+    parse_partial_json,
+)
+
+ARGUMENTS = {
+    "headline": "Print é and \U0001f600",
+    "code": 'print("a \\"quoted\\" \\\\ path")\n\tx = [1, 2]',
+    "options": {"timeout": 1.5e3, "retry": True, "env": None, "tags": ["a", "b"], "empty": []},
+}
+
+
+def _feed_in_chunks(text: str, size: int, read_value: bool = True) -> tuple[IncrementalJSONParser, dict[str, str]]:
+    parser = IncrementalJSONParser()
+    deltas: dict[str, str] = {}
+
+    for i in range(0, len(text), size):
+        for key, delta in parser.feed(text[i : i + size]).items():
+            deltas[key] = deltas.get(key, "") + delta
+
+        if read_value:
+            parser.value  # Reading the partial value must not disturb parsing
+
+    return parser, deltas
+
+
+def test_should_parse_any_chunking():
+    text = json.dumps(ARGUMENTS)
+
+    for size in range(1, 12):
+        parser, deltas = _feed_in_chunks(text, size)
+
+        assert not parser.failed
+        assert parser.value == ARGUMENTS
+        assert deltas == {"headline": ARGUMENTS["headline"], "code": ARGUMENTS["code"]}
+
+
+def test_should_expose_partial_values():
+    assert parse_partial_json('{"code": "print(1)\nprint(2') == {"code": "print(1)\nprint(2"}
+    assert parse_partial_json('{"a": 12') == {"a": 12}
+    assert parse_partial_json('{"a": [1, 2, tr') is None
+    assert parse_partial_json('{"a": 1, "b') == {"a": 1}
+
+
+def test_should_only_join_the_string_asked_for():
+    parser = IncrementalJSONParser()
+    parser.feed('{"agent_id": "coder", "ids": ["a", "b')
+    parser.feed('c"], "thinking": "long')
+
+    assert parser.get("ids") == ["a", "bc"]
+    assert parser.get("thinking") == "long"
+
+    parser.feed(" text")
+
+    assert parser.get("agent_id") == "coder"
+    assert parser._string == ["long", " text"]
+    assert parser.get("thinking") == "long text"
+
+
+def test_should_fail_on_text_which_is_not_json():
+    assert parse_partial_json("print(1)") is None
+    assert parse_partial_json('{"a": 1} print(1)') is None
+
+
+class _CountingPattern:
+    """
+    Counts the characters the parser scans for the end of strings.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.scanned = 0
+
+    def search(self, text: str, pos: int):
+        match = self.pattern.search(text, pos)
+        self.scanned += (match.end() if match else len(text)) - pos
+        return match
+
+
+def test_should_scan_every_character_once(monkeypatch):
+    pattern = _CountingPattern(parse_partial_json_module._STRING_SPECIAL)
+    monkeypatch.setattr(parse_partial_json_module, "_STRING_SPECIAL", pattern)
+    code = "x = 1\n" * 10_000
+    text = json.dumps({"code": code})
+
+    parser, deltas = _feed_in_chunks(text, 8, read_value=False)
+
+    assert not parser.failed
+    assert deltas == {"code": code}
+    # Re-parsing everything on every chunk scans the text again for each of its chunks
+    assert pattern.scanned <= len(text)
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from litellm import ModelResponse
+from litellm.utils import Delta, StreamingChoices
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
+
+from aiconsole.core.gpt.partial import GPTPartialResponse
+from aiconsole.utils.text_builder import TextBuilder
+
+CHUNK = "x = 1\n"
+
+
+def _chunk(delta: Delta) -> ModelResponse:
+    response = ModelResponse(id="response", stream=True)
+    response.choices = [StreamingChoices(index=0, delta=delta)]
+    return response
+
+
+def _content_chunks(count: int) -> list[ModelResponse]:
+    return [_chunk(Delta(content=CHUNK)) for _ in range(count)]
+
+
+def _tool_call_chunks(count: int) -> list[ModelResponse]:
+    arguments = json.dumps({"headline": "Headline", "code": CHUNK * count})
+    pieces = [arguments[i : i + len(CHUNK)] for i in range(0, len(arguments), len(CHUNK))]
+
+    return [
+        _chunk(
+            Delta(
+                tool_calls=[
+                    ChoiceDeltaToolCall(
+                        index=0,
+                        id="call" if i == 0 else None,
+                        type="function" if i == 0 else None,
+                        function=ChoiceDeltaToolCallFunction(name="python" if i == 0 else None, arguments=piece),
+                    )
+                ]
+            )
+        )
+        for i, piece in enumerate(pieces)
+    ]
+
+
+@pytest.fixture
+def joins(monkeypatch) -> list[int]:
+    """
+    Number of times a TextBuilder joined its chunks.
+    """
+    joins = [0]
+    value = TextBuilder.value.fget
+
+    def counting_value(builder: TextBuilder):
+        if len(builder._chunks) > 1:
+            joins[0] += 1
+
+        return value(builder)
+
+    monkeypatch.setattr(TextBuilder, "value", property(counting_value))
+    return joins
+
+
+def test_should_join_content_once_per_read_of_new_chunks(joins: list[int]):
+    response = GPTPartialResponse()
+
+    for chunk in _content_chunks(1_000):
+        response.apply_chunk(chunk)
+
+        # Consumers read the accumulated state after every chunk, reading it again does not join again
+        response.choices[0].message.content
+        response.choices[0].message.content
+
+    assert joins[0] == 999
+    assert response.to_final_response().choices[0].message.content == CHUNK * 1_000
+
+
+def test_should_not_join_tool_call_arguments_consumed_as_deltas(joins: list[int]):
+    response = GPTPartialResponse()
+    code_deltas = []
+
+    for chunk in _tool_call_chunks(1_000):
+        response.apply_chunk(chunk)
+
+        for tool_call in response.choices[0].message.tool_calls:
+            code_deltas.append(tool_call.function.pop_arguments_deltas()[1].get("code", ""))
+
+    assert joins[0] == 0
+    assert "".join(code_deltas) == CHUNK * 1_000
+    assert response.to_final_response().choices[0].message.tool_calls[0].function.arguments_dict == {
+        "headline": "Headline",
+        "code": CHUNK * 1_000,
+    }
@@ -0,0 +1,66 @@
+import pytest
+
+from aiconsole.core.gpt.consts import GPTMode
+from aiconsole.core.gpt.fake_provider import FakeGPTProvider
+from aiconsole.core.gpt.gpt_executor import GPTExecutor
+from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.request_metrics import (
+    GPTRequestMetrics,
+    GPTRequestRecord,
+    gpt_request_metrics,
+    percentile,
+)
+from aiconsole.core.gpt.types import GPTRequestTextMessage
+
+
+def test_should_compute_nearest_rank_percentiles():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 90) == 7
+
+
+def test_should_aggregate_by_model_and_caller():
+    metrics = GPTRequestMetrics(max_records=3)
+
+    metrics.add(GPTRequestRecord(model="old", duration_s=100))
+    for duration_s in (1, 2):
+        metrics.add(GPTRequestRecord(model="a", caller="director", duration_s=duration_s, attempts=2))
+    metrics.add(GPTRequestRecord(model="b", caller="normal/assistant", error="TimeoutError", attempts=1))
+
+    stats = metrics.stats()
+
+    assert stats["all"]["count"] == 3
+    assert stats["all"]["errors"] == 1
+    assert stats["all"]["retries"] == 2
+    assert stats["all"]["duration_s"] == {"p50": 1, "p90": 2, "p99": 2}
+    assert set(stats["by_model"]) == {"a", "b"}
+    assert stats["by_caller"]["director"]["count"] == 2
+    assert stats["by_caller"]["normal/assistant"]["duration_s"] is None
+
+
+@pytest.mark.asyncio
+async def test_should_record_every_request():
+    provider = FakeGPTProvider(tokens_per_second=1000, time_to_first_token_s=0.05)
+    executor = GPTExecutor(provider.acompletion)
+    request = GPTRequest(
+        system_message="",
+        messages=[GPTRequestTextMessage(role="user", content="Hi")],
+        gpt_mode=GPTMode.QUALITY,
+        preferred_tokens=100,
+        caller="normal/assistant",
+    )
+
+    [chunk async for chunk in executor.execute(request)]
+
+    record = executor.record
+    assert record is gpt_request_metrics.records[-1]
+    assert record.caller == "normal/assistant"
+    assert record.attempts == 1
+    assert record.error is None
+    assert record.time_to_first_token_s >= 0.05
+    assert record.duration_s >= record.time_to_first_token_s
+    assert record.prompt_tokens == request.count_tokens()
+    assert record.completion_tokens > 0
+    assert record.tokens_per_second > 0
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from aiconsole.core.gpt.consts import GPTPriority
+from aiconsole.core.gpt.request_scheduler import GPTRequestScheduler, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_should_refill_over_time():
+    clock = _Clock()
+    bucket = TokenBucket(60, clock)
+
+    bucket.take(60)
+    assert bucket.time_until(30) == 30
+
+    clock.now = 10
+    assert bucket.available() == 10
+    assert bucket.time_until(30) == 20
+
+    clock.now = 1000
+    assert bucket.available() == 60
+    # More than fits in the bucket only waits for a full bucket
+    assert bucket.time_until(100) == 0
+
+
+@pytest.mark.asyncio
+async def test_should_let_interactive_requests_go_first():
+    # 6000 requests a minute, one every 10ms once the burst of one is used up
+    scheduler = GPTRequestScheduler({"model": (6000, None)})
+    scheduler._limiter("model").requests.capacity = 1
+    scheduler._limiter("model").requests.level = 1
+
+    order = []
+
+    async def request(name: str, priority: GPTPriority):
+        await scheduler.acquire("model", 100, priority)
+        order.append(name)
+
+    await request("first", GPTPriority.ANALYSIS)
+    await asyncio.gather(
+        request("analysis 1", GPTPriority.ANALYSIS),
+        request("analysis 2", GPTPriority.ANALYSIS),
+        request("interactive", GPTPriority.INTERACTIVE),
+    )
+
+    assert order == ["first", "interactive", "analysis 1", "analysis 2"]
+    assert scheduler.stats()["wait"]["analysis"]["count"] == 3
+    assert scheduler.stats()["wait"]["interactive"]["max_s"] > 0
+
+
+@pytest.mark.asyncio
+async def test_should_expose_queue_positions():
+    scheduler = GPTRequestScheduler({"model": (None, 60)})
+
+    first = scheduler.enqueue("model", 60, GPTPriority.INTERACTIVE)
+    analysis = scheduler.enqueue("model", 60, GPTPriority.ANALYSIS)
+    interactive = scheduler.enqueue("model", 60, GPTPriority.INTERACTIVE)
+
+    assert first.position is None  # Went through right away
+    assert interactive.position == 0
+    assert analysis.position == 1
+    assert scheduler.stats()["models"]["model"]["queued"] == 2
+
+    waiting = asyncio.create_task(scheduler.wait(interactive))
+    await asyncio.sleep(0)
+    waiting.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert analysis.position == 0
+    assert scheduler.stats()["models"]["model"]["queued"] == 1
+    analysis.future.cancel()
+
+
+@pytest.mark.asyncio
+async def test_should_not_limit_unknown_models():
+    scheduler = GPTRequestScheduler({})
+
+    await asyncio.wait_for(asyncio.gather(*[scheduler.acquire("model", 10**9) for _ in range(100)]), 1)
+
+
+@pytest.mark.asyncio
+async def test_should_let_waiting_requests_through_when_limits_are_lifted():
+    scheduler = GPTRequestScheduler({"model": (None, 60)})
+
+    scheduler.enqueue("model", 60)
+    waiting = scheduler.enqueue("model", 60)
+    assert waiting.position == 0
+
+    scheduler.configure({"model": {"requests_per_minute": 6000}, "other": {"tokens_per_minute": 100}})
+
+    await asyncio.wait_for(scheduler.wait(waiting), 1)
+    assert scheduler.limits == {"model": (6000, None), "other": (None, 100)}
+
+    scheduler.configure({})
+    assert scheduler.limits == {"model": (None, 60)}
@@ -0,0 +1,91 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from aiconsole.core.gpt.partial import GPTPartialResponse
+from aiconsole.core.gpt.response_cache import GPTResponseCache, response_to_chunks
+from aiconsole.core.gpt.types import (
+    GPTChoice,
+    GPTFunctionCall,
+    GPTResponse,
+    GPTResponseMessage,
+    GPTToolCall,
+)
+
+RESPONSE = GPTResponse(
+    id="response",
+    model="model",
+    choices=[
+        GPTChoice(
+            index=0,
+            message=GPTResponseMessage(
+                role="assistant",
+                content="Running it",
+                tool_calls=[
+                    GPTToolCall(id="call", function=GPTFunctionCall(name="python", arguments='{"code": "print(1)"}'))
+                ],
+            ),
+            finnish_reason="tool_calls",
+        )
+    ],
+)
+
+
+def test_should_only_cache_deterministic_requests_unless_forced(tmp_path: Path):
+    cache = GPTResponseCache(tmp_path, enabled=True)
+
+    assert cache.should_cache({"temperature": 0})
+    assert not cache.should_cache({"temperature": 1})
+    assert cache.should_cache({"temperature": 1}, force=True)
+    assert not cache.should_cache({"temperature": 0}, force=False)
+    assert not GPTResponseCache(tmp_path, enabled=False).should_cache({"temperature": 0}, force=True)
+
+
+def test_should_key_requests_canonically(tmp_path: Path):
+    cache = GPTResponseCache(tmp_path, enabled=True)
+
+    assert cache.key({"model": "a", "temperature": 0}) == cache.key({"temperature": 0, "model": "a"})
+    assert cache.key({"model": "a", "temperature": 0}) != cache.key({"model": "b", "temperature": 0})
+
+
+@pytest.mark.asyncio
+async def test_should_store_and_expire_responses(tmp_path: Path):
+    cache = GPTResponseCache(tmp_path, enabled=True, max_age_s=60)
+
+    assert await cache.get("key") is None
+    await cache.put("key", RESPONSE)
+    assert await cache.get("key") == RESPONSE
+
+    old = time.time() - 120
+    os.utime(tmp_path / "key.json", (old, old))
+
+    assert await cache.get("key") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_should_evict_oldest_responses_over_size(tmp_path: Path):
+    cache = GPTResponseCache(tmp_path, enabled=True)
+
+    await cache.put("first", RESPONSE)
+    old = time.time() - 10
+    os.utime(tmp_path / "first.json", (old, old))
+
+    cache.max_bytes = (tmp_path / "first.json").stat().st_size * 1.5
+    await cache.put("second", RESPONSE)
+
+    assert not (tmp_path / "first.json").exists()
+    assert (tmp_path / "second.json").exists()
+
+
+def test_should_replay_response_as_chunks():
+    partial = GPTPartialResponse()
+
+    for chunk in response_to_chunks(RESPONSE):
+        partial.apply_chunk(chunk)
+
+    assert partial.to_final_response().choices == RESPONSE.choices
@@ -0,0 +1,182 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from openai import OpenAIError
+
+from aiconsole.core.gpt.consts import GPTMode
+from aiconsole.core.gpt.fake_provider import FakeGPTProvider
+from aiconsole.core.gpt.gpt_executor import GPTExecutor
+from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.retry_policy import GPTStreamTimeoutError, RetryPolicy
+from aiconsole.core.gpt.types import CLEAR_STR, GPTRequestTextMessage
+
+
+class _StatusError(OpenAIError):
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"Status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class _FlakyProvider:
+    """
+    Fails in the given ways, then streams like the fake provider.
+    """
+
+    def __init__(self, failures: list[str], delay_s: float = 0.05):
+        self.failures = failures
+        self.delay_s = delay_s
+        self.calls = 0
+        self.fake = FakeGPTProvider(tokens_per_second=0, time_to_first_token_s=0)
+        # Kept, so that streams are not closed by being collected
+        self.streams = []
+
+    async def acompletion(self, **request):
+        self.calls += 1
+        failure = self.failures.pop(0) if self.failures else None
+
+        if failure == "error":
+            raise _StatusError(500)
+
+        if failure == "fatal":
+            raise _StatusError(400)
+
+        stream = await self.fake.acompletion(**request)
+
+        if failure is None:
+            return stream
+
+        async def slow_stream():
+            if failure == "slow_first_token":
+                await asyncio.sleep(self.delay_s)
+
+            async for chunk in stream:
+                yield chunk
+
+                if failure == "stall":
+                    await asyncio.sleep(self.delay_s)
+
+        self.streams.append(slow_stream())
+        return self.streams[-1]
+
+    @property
+    def all_streams_closed(self) -> bool:
+        return all(stream.ag_frame is None for stream in self.streams)
+
+
+def _request(policy: RetryPolicy) -> GPTRequest:
+    return GPTRequest(
+        system_message="",
+        messages=[GPTRequestTextMessage(role="user", content="Hi")],
+        gpt_mode=GPTMode.QUALITY,
+        preferred_tokens=100,
+        retry_policy=policy,
+    )
+
+
+def _policy(**kwargs) -> RetryPolicy:
+    return RetryPolicy(**{"base_delay_s": 0, "first_token_timeout_s": 0.02, "stall_timeout_s": 0.02, **kwargs})
+
+
+def test_should_only_retry_transient_errors():
+    policy = RetryPolicy()
+
+    assert policy.is_retryable(_StatusError(500))
+    assert policy.is_retryable(_StatusError(429))
+    assert policy.is_retryable(GPTStreamTimeoutError())
+    assert policy.is_retryable(ConnectionError())
+    assert not policy.is_retryable(_StatusError(400))
+    assert not policy.is_retryable(_StatusError(404))
+    assert not policy.is_retryable(TypeError())
+    assert not policy.is_retryable(KeyError("choices"))
+
+
+def test_should_back_off_exponentially_unless_told_when_to_retry():
+    policy = RetryPolicy(base_delay_s=1, max_delay_s=5, jitter=0.5)
+
+    assert 0.5 <= policy.delay(0, Exception()) <= 1
+    assert 2 <= policy.delay(2, Exception()) <= 4
+    assert 2.5 <= policy.delay(10, Exception()) <= 5
+    assert policy.delay(0, _StatusError(429, {"retry-after": "7"})) == 7
+    assert policy.delay(0, _StatusError(429, {"retry-after-ms": "250"})) == 0.25
+
+
+@pytest.mark.asyncio
+async def test_should_retry_after_errors_and_timeouts():
+    provider = _FlakyProvider(["error", "slow_first_token", "stall"])
+    executor = GPTExecutor(provider.acompletion)
+
+    chunks = [chunk async for chunk in executor.execute(_request(_policy(max_attempts=4)))]
+
+    assert provider.calls == 4
+    # Only the stalled attempt got to stream something before failing
+    assert chunks.count(CLEAR_STR) == 1
+    assert executor.response.choices[0].message.content == "This is a fake response to: Hi"
+    assert provider.all_streams_closed
+
+
+@pytest.mark.asyncio
+async def test_should_give_up_on_fatal_errors():
+    provider = _FlakyProvider(["fatal"])
+    executor = GPTExecutor(provider.acompletion)
+
+    with pytest.raises(_StatusError):
+        [chunk async for chunk in executor.execute(_request(_policy()))]
+
+    assert provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_should_give_up_after_max_attempts():
+    provider = _FlakyProvider(["error", "error", "error"])
+    executor = GPTExecutor(provider.acompletion)
+
+    with pytest.raises(_StatusError):
+        [chunk async for chunk in executor.execute(_request(_policy(max_attempts=2)))]
+
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_should_hedge_slow_requests():
+    provider = _FlakyProvider(["slow_first_token"], delay_s=1)
+    executor = GPTExecutor(provider.acompletion)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    request = _request(_policy(first_token_timeout_s=2, hedge_after_s=0.02))
+    chunks = [chunk async for chunk in executor.execute(request)]
+
+    assert loop.time() - start < 0.5
+    assert provider.calls == 2
+    assert CLEAR_STR not in chunks
+    assert executor.response.choices[0].message.content == "This is a fake response to: Hi"
+
+
+@pytest.mark.asyncio
+async def test_should_close_the_stream_of_a_losing_hedge():
+    first_token = asyncio.Event()
+    streams = []
+
+    async def provider(**request):
+        hedge = bool(streams)
+
+        async def stream():
+            if hedge:
+                first_token.set()
+            else:
+                await first_token.wait()
+
+            yield (await (await FakeGPTProvider(tokens_per_second=0).acompletion(**request)).__anext__())
+
+        streams.append(stream())
+        return streams[-1]
+
+    executor = GPTExecutor(provider)
+    request = _request(_policy(first_token_timeout_s=2, hedge_after_s=0.02))
+
+    [chunk async for chunk in executor.execute(request)]
+
+    assert len(streams) == 2
+    assert all(stream.ag_frame is None for stream in streams)
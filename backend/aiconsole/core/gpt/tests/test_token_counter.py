@@ -0,0 +1,79 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from aiconsole.core.gpt import request, token_counter
+from aiconsole.core.gpt.consts import GPTMode
+from aiconsole.core.gpt.request import GPTRequest
+from aiconsole.core.gpt.token_counter import token_count_cache
+from aiconsole.core.gpt.types import GPTRequestTextMessage
+
+
+class _WordEncoding:
+    """
+    Stands in for a tiktoken encoding, whose files can not be downloaded in every environment.
+    """
+
+    name = "words"
+
+    def __init__(self):
+        self.encoded_chars = 0
+
+    def encode(self, text: str) -> list[str]:
+        self.encoded_chars += len(text)
+        return text.split()
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    encoding = _WordEncoding()
+    monkeypatch.setattr(request, "get_encoding", lambda model: encoding)
+    token_count_cache.clear()
+    return encoding
+
+
+@pytest.fixture
+def dumped(monkeypatch):
+    dumped: list[str] = []
+
+    def dumps(value):
+        dumped.append(json.dumps(value))
+        return dumped[-1]
+
+    monkeypatch.setattr(token_counter, "json", SimpleNamespace(dumps=dumps))
+    return dumped
+
+
+def _request(contents: list[str]) -> GPTRequest:
+    # Messages are built anew for every request, like convert_messages does, sharing their strings with the chat
+    messages = [GPTRequestTextMessage(role="user", content=content) for content in contents]
+    return GPTRequest(system_message="system", messages=messages, gpt_mode=GPTMode.QUALITY, preferred_tokens=1000)
+
+
+@pytest.mark.parametrize("length", [10, 1000])
+def test_should_only_dump_and_encode_new_messages(encoding: _WordEncoding, dumped: list[str], length: int):
+    contents = [f"message {i} " + "word " * 100 for i in range(length)]
+    _request(contents).validate_request()
+
+    encoding.encoded_chars = 0
+    dumped.clear()
+    contents.append("reply")
+
+    next_request = _request(contents)
+    next_request.validate_request()
+
+    # Only the new message is dumped and encoded, no matter how long the history is
+    assert dumped == ['{"role": "user", "content": "reply"}']
+    assert encoding.encoded_chars == len(dumped[0])
+
+    cached_count = next_request.count_tokens()
+    token_count_cache.clear()
+    assert next_request.count_tokens() == cached_count
+
+
+def test_should_count_changed_message_again(encoding: _WordEncoding):
+    first = _request(["Hello"]).count_tokens()
+    second = _request(["Hello world"]).count_tokens()
+
+    assert second == first + 1
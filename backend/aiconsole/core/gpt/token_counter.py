@@ -0,0 +1,111 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Token counting with counts of already encoded texts cached across requests, so a chat history is not
+re-tokenised in full for every LLM call.
+
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from functools import cache
+from typing import Any
+
+import tiktoken
+from pydantic import BaseModel
+
+from aiconsole.consts import GPT_TOKEN_COUNT_CACHE_SIZE
+
+
+@cache
+def get_encoding(model: str) -> tiktoken.Encoding:
+    return tiktoken.encoding_for_model(model)
+
+
+class TokenCountCache:
+    def __init__(self, size: int = GPT_TOKEN_COUNT_CACHE_SIZE):
+        self.size = size
+        self._counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+        # Counts of whole messages by their field values. Messages built from a chat share their strings with it,
+        # and Python caches the hash of a string, so an unchanged message is found without going over its text.
+        self._message_counts: OrderedDict[tuple, int] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, encoding: tiktoken.Encoding, text: str) -> int:
+        key = (encoding.name, hashlib.blake2b(text.encode(), digest_size=16).digest())
+        count = self._counts.get(key)
+
+        if count is not None:
+            self.hits += 1
+            self._counts.move_to_end(key)
+            return count
+
+        self.misses += 1
+        count = self._counts[key] = len(encoding.encode(text))
+
+        if len(self._counts) > self.size:
+            self._counts.popitem(last=False)
+
+        return count
+
+    def count_message(self, encoding: tiktoken.Encoding, message: BaseModel) -> int:
+        key = (encoding.name, _message_key(message))
+        count = self._message_counts.get(key)
+
+        if count is not None:
+            self.hits += 1
+            self._message_counts.move_to_end(key)
+            return count
+
+        count = self._message_counts[key] = self.count(encoding, json.dumps(message.model_dump()))
+
+        if len(self._message_counts) > self.size:
+            self._message_counts.popitem(last=False)
+
+        return count
+
+    def clear(self):
+        self._counts.clear()
+        self._message_counts.clear()
+
+
+token_count_cache = TokenCountCache()
+
+
+def _message_key(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return (type(value), *(_message_key(field) for field in value.__dict__.values()))
+
+    if isinstance(value, list):
+        return tuple(_message_key(item) for item in value)
+
+    return value
+
+
+def count_tokens_of_parts(encoding: tiktoken.Encoding, parts: list[str]) -> int:
+    """
+    Tokens of the parts joined into a single JSON-like list, each part counted (and cached) on its own.
+    Separators and brackets are approximated as one token each.
+    """
+    if not parts:
+        return 0
+
+    return sum(token_count_cache.count(encoding, part) for part in parts) + len(parts) + 1
@@ -17,6 +17,7 @@
 import os
 from pathlib import Path
 
+from aiconsole.consts import GPT_CACHE_DIRECTORY
 from aiconsole.core.assets.asset import AssetType
 from aiconsole.core.project.project import is_project_initialized
 from aiconsole.utils.resource_to_path import resource_to_path
@@ -45,6 +46,12 @@ def get_aic_directory(project_path: Path | None = None):
     return get_project_directory(project_path) / ".aic"
 
 
+def get_gpt_cache_directory(project_path: Path | None = None):
+    if not is_project_initialized() and not project_path:
+        raise ValueError("Project settings are not initialized")
+    return get_aic_directory(project_path) / GPT_CACHE_DIRECTORY
+
+
 def get_project_directory(project_path: Path | None = None):
     if not is_project_initialized() and not project_path:
         raise ValueError("Project settings are not initialized")
@@ -17,7 +17,7 @@
 import os
 import sys
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, cast
 
 from fastapi import BackgroundTasks
 
@@ -29,10 +29,13 @@ from aiconsole.api.websockets.server_messages import (
     ProjectOpenedServerMessage,
 )
 from aiconsole.core.assets.asset import AssetType
+from aiconsole.core.assets.materials.material import Material, MaterialContentType
+from aiconsole.core.code_running.interpreter_pool import interpreter_pool
 from aiconsole.core.code_running.run_code import reset_code_interpreters
 from aiconsole.core.code_running.virtual_env.create_dedicated_venv import (
     create_dedicated_venv,
 )
+from aiconsole_toolkit.env import get_current_project_venv_bin_path
 
 if TYPE_CHECKING:
     from aiconsole.core.assets import assets
@@ -44,6 +47,8 @@ _project_initialized = False
 
 
 async def _clear_project():
+    from aiconsole.core.chat.chat_cache import chat_cache
+
     global _materials
     global _agents
     global _project_initialized
@@ -55,6 +60,9 @@ async def _clear_project():
         _agents.stop()
 
     reset_code_interpreters()
+    interpreter_pool.close()
+    await interpreter_pool.wait_closed()
+    chat_cache.stop()
 
     _materials = None
     _agents = None
@@ -98,7 +106,12 @@ async def close_project():
 
 async def reinitialize_project():
     from aiconsole.core.assets import assets
-    from aiconsole.core.project.paths import get_project_directory, get_project_name
+    from aiconsole.core.chat.chat_cache import chat_cache
+    from aiconsole.core.project.paths import (
+        get_history_directory,
+        get_project_directory,
+        get_project_name,
+    )
     from aiconsole.core.recent_projects.recent_projects import add_to_recent_projects
     from aiconsole.core.settings.project_settings import reload_settings
 
@@ -118,6 +131,7 @@ async def reinitialize_project():
 
     _agents = assets.Assets(asset_type=AssetType.AGENT)
     _materials = assets.Assets(asset_type=AssetType.MATERIAL)
+    chat_cache.start(get_history_directory())
 
     await ProjectOpenedServerMessage(path=str(get_project_directory()), name=get_project_name()).send_to_all()
 
@@ -125,6 +139,29 @@ async def reinitialize_project():
     await _agents.reload(initial=True)
     await reload_settings(initial=True)
 
+    _start_interpreter_pool()
+
+
+def _start_interpreter_pool():
+    # Before the venv of the project is created interpreters would run the system python, the pool is started once
+    # it is there
+    if not _materials or not get_current_project_venv_bin_path().exists():
+        return
+
+    interpreter_pool.start(
+        [
+            cast(Material, material)
+            for material in _materials.all_assets()
+            if cast(Material, material).content_type == MaterialContentType.API
+        ]
+    )
+
+
+async def _create_dedicated_venv_and_start_interpreter_pool():
+    await create_dedicated_venv()
+    # Interpreters started while the venv was missing or its dependencies were being installed are replaced
+    _start_interpreter_pool()
+
 
 async def choose_project(path: Path, background_tasks: BackgroundTasks):
     if not path.exists():
@@ -136,4 +173,4 @@ async def choose_project(path: Path, background_tasks: BackgroundTasks):
 
     await reinitialize_project()
 
-    background_tasks.add_task(create_dedicated_venv)
+    background_tasks.add_task(_create_dedicated_venv_and_start_interpreter_pool)
@@ -20,10 +20,7 @@ from pathlib import Path
 from appdirs import user_config_dir
 
 from aiconsole.consts import MAX_RECENT_PROJECTS
-from aiconsole.core.chat.list_possible_historic_chat_ids import (
-    list_possible_historic_chat_ids,
-)
-from aiconsole.core.chat.load_chat_history import load_chat_history
+from aiconsole.core.chat.chat_headlines_index import get_chat_headlines_index
 from aiconsole.core.recent_projects.recent_project import RecentProject
 
 
@@ -77,9 +74,7 @@ async def get_recent_project() -> list[RecentProject]:
             RecentProject(
                 name=os.path.basename(path),
                 path=path,
-                recent_chats=[
-                    (await load_chat_history(id, path)).name for id in list_possible_historic_chat_ids(path)[:4]
-                ],
+                recent_chats=[headline.name for headline in get_chat_headlines_index(path).headlines(limit=4)],
             )
         )
 
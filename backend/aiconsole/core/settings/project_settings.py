@@ -23,12 +23,15 @@ import tomlkit
 import tomlkit.container
 import tomlkit.exceptions
 from appdirs import user_config_dir
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from tomlkit import TOMLDocument
 from watchdog.observers import Observer
 
 from aiconsole.api.websockets.server_messages import SettingsServerMessage
 from aiconsole.core.assets.asset import AssetStatus, AssetType
+from aiconsole.core.gpt.context_planner import default_context_planner
+from aiconsole.core.gpt.model_router import model_router
+from aiconsole.core.gpt.request_scheduler import gpt_request_scheduler
 from aiconsole.core.project import project
 from aiconsole.core.project.paths import get_project_directory
 from aiconsole.core.project.project import is_project_initialized
@@ -55,12 +58,18 @@ class PartialSettingsAndToGlobal(PartialSettingsData):
 
 
 class SettingsData(BaseModel):
+    # Pydantic reserves the model_ prefix of model_routes for its own attributes
+    model_config = ConfigDict(protected_namespaces=())
+
     code_autorun: bool = False
     openai_api_key: str | None = None
     username: str | None = None
     email: str | None = None
     materials: dict[str, AssetStatus] = {}
     agents: dict[str, AssetStatus] = {}
+    model_routes: dict[str, list[str]] = {}
+    context_max_tokens: int | None = None
+    rate_limits: dict[str, dict[str, int]] = {}
 
 
 def _load_from_path(file_path: Path) -> dict[str, Any]:
@@ -77,6 +86,18 @@ def _set_openai_api_key_environment(settings: SettingsData) -> None:
     litellm.openai_key = openai_api_key or "invalid key"
 
 
+def _set_model_routes(settings: SettingsData) -> None:
+    model_router.configure(settings.model_routes)
+
+
+def _set_context_max_tokens(settings: SettingsData) -> None:
+    default_context_planner.max_context_tokens = settings.context_max_tokens
+
+
+def _set_rate_limits(settings: SettingsData) -> None:
+    gpt_request_scheduler.configure(settings.rate_limits)
+
+
 class Settings:
     def __init__(self, project_path: Path | None = None):
         self._suppress_notification_until = None
@@ -208,6 +229,9 @@ class Settings:
             email=settings.get("settings", {}).get("email", None),  # Load email
             materials=materials,
             agents=agents,
+            model_routes=settings.get("model_routes", {}),
+            context_max_tokens=settings.get("settings", {}).get("context_max_tokens", None),
+            rate_limits=settings.get("rate_limits", {}),
         )
 
         # Enforce only one forced agent
@@ -217,6 +241,9 @@ class Settings:
                 settings_data.agents[agent] = AssetStatus.ENABLED
 
         _set_openai_api_key_environment(settings_data)
+        _set_model_routes(settings_data)
+        _set_context_max_tokens(settings_data)
+        _set_rate_limits(settings_data)
 
         _log.info("Loaded settings")
         return settings_data
@@ -0,0 +1,154 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, ClassVar
+
+from pydantic import BaseModel, GetJsonSchemaHandler, model_validator
+from pydantic.json_schema import JsonSchemaValue
+from pydantic_core import CoreSchema
+
+
+class TextBuilder:
+    """
+    Append efficient string. Appended chunks are only joined when the value is read, so streaming n characters
+    in small deltas costs O(n) instead of the O(n^2) of repeated str concatenation.
+    """
+
+    __slots__ = ("_chunks", "_is_none")
+
+    def __init__(self, value: str | None = None):
+        self._chunks: list[str] = [] if value is None else [value]
+        self._is_none = value is None
+
+    @property
+    def value(self) -> str | None:
+        if self._is_none:
+            return None
+
+        if len(self._chunks) != 1:
+            self._chunks = ["".join(self._chunks)]
+
+        return self._chunks[0]
+
+    def append(self, delta: str):
+        self._chunks.append(delta)
+        self._is_none = False
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, TextBuilder) and self.value == other.value
+
+    def __repr__(self):
+        return repr(self.value)
+
+
+def text_property(name: str) -> property:
+    """
+    str property backed by the TextBuilder stored in the private attribute _<name>.
+    """
+
+    def getter(self) -> str:
+        return getattr(self, f"_{name}").value
+
+    def setter(self, value: str | None):
+        setattr(self, f"_{name}", TextBuilder(value))
+
+    getter.__name__ = name
+
+    return property(getter, setter)
+
+
+class TextBuildersModel(BaseModel):
+    """
+    Model with text fields that are appended to while streaming.
+
+    Each field listed in text_fields (name -> whether it can be None) is declared by the subclass as a private
+    _<name> TextBuilder attribute exposed as a computed str property, so it is still read, assigned, validated and
+    serialised as a regular str field.
+    """
+
+    text_fields: ClassVar[dict[str, bool]] = {}
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _validate_text_fields(cls, data: Any, handler):
+        if not isinstance(data, dict):
+            return handler(data)
+
+        data = dict(data)
+        texts = {name: data.pop(name) for name in cls.text_fields if name in data}
+
+        for name, optional in cls.text_fields.items():
+            if name not in texts and not optional:
+                raise ValueError(f"{name} is required")
+
+            if name in texts and not isinstance(texts[name], str) and not (texts[name] is None and optional):
+                raise ValueError(f"{name} must be a string")
+
+        instance = handler(data)
+
+        for name, value in texts.items():
+            setattr(instance, f"_{name}", TextBuilder(value))
+
+        return instance
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, core_schema: CoreSchema, handler: GetJsonSchemaHandler) -> JsonSchemaValue:
+        # Described as the regular str fields they are validated as, instead of read only computed fields
+        json_schema = handler.resolve_ref_schema(handler(core_schema))
+        properties = json_schema.setdefault("properties", {})
+        required = json_schema.setdefault("required", [])
+
+        for name, optional in cls.text_fields.items():
+            title = name.replace("_", " ").title()
+
+            if optional:
+                properties[name] = {"anyOf": [{"type": "string"}, {"type": "null"}], "default": None, "title": title}
+
+                if name in required:
+                    required.remove(name)
+            else:
+                properties[name] = {"title": title, "type": "string"}
+
+                if name not in required:
+                    required.append(name)
+
+        return json_schema
+
+    def __copy__(self):
+        copy = super().__copy__()
+
+        # Builders are mutable, a copy appended to must not change the original
+        for name in self.text_fields:
+            setattr(copy, f"_{name}", TextBuilder(getattr(self, name)))
+
+        return copy
+
+    def model_copy(self, *, update: dict[str, Any] | None = None, deep: bool = False):
+        update = dict(update or {})
+        texts = {name: update.pop(name) for name in self.text_fields if name in update}
+
+        copy = super().model_copy(update=update, deep=deep)
+
+        for name, value in texts.items():
+            setattr(copy, f"_{name}", TextBuilder(value))
+
+        return copy
+
+    def append_text(self, name: str, delta: str):
+        getattr(self, f"_{name}").append(delta)
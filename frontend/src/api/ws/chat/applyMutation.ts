@@ -160,6 +160,9 @@ export function applyMutation(chat: Chat, mutation: ChatMutation) {
     case 'SetIsExecutingToolCallMutation':
       getToolCallLocation(chat, mutation.tool_call_id).tool_call.is_executing = mutation.is_executing;
       break;
+    case 'SetExecutionStatusToolCallMutation':
+      getToolCallLocation(chat, mutation.tool_call_id).tool_call.execution_status = mutation.execution_status;
+      break;
 
     default:
       console.error('Unknown mutation type: ', mutation);
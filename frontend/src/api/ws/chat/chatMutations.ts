@@ -1,4 +1,5 @@
 import { GPTRoleSchema, LanguageStrSchema } from '@/types/editables/assetTypes';
+import { ExecutionStatusSchema } from '@/types/editables/chatTypes';
 import { z } from 'zod';
 
 export const LockAcquiredMutationSchema = z.object({
@@ -186,6 +187,14 @@ export const SetIsExecutingToolCallMutationSchema = z.object({
 
 export type SetIsExecutingToolCallMutation = z.infer<typeof SetIsExecutingToolCallMutationSchema>;
 
+export const SetExecutionStatusToolCallMutationSchema = z.object({
+  type: z.literal('SetExecutionStatusToolCallMutation'),
+  tool_call_id: z.string(),
+  execution_status: ExecutionStatusSchema.nullable(),
+});
+
+export type SetExecutionStatusToolCallMutation = z.infer<typeof SetExecutionStatusToolCallMutationSchema>;
+
 export const CreateMessageMutationSchema = z.object({
   type: z.literal('CreateMessageMutation'),
   message_group_id: z.string(),
@@ -267,6 +276,7 @@ export const ChatMutationSchema = z.union([
   AppendToOutputToolCallMutationSchema,
   SetIsStreamingToolCallMutationSchema,
   SetIsExecutingToolCallMutationSchema,
+  SetExecutionStatusToolCallMutationSchema,
 ]);
 
 export type ChatMutation = z.infer<typeof ChatMutationSchema>;
@@ -49,6 +49,7 @@ export type ReleaseLockClientMessage = z.infer<typeof ReleaseLockClientMessageSc
 export const OpenChatClientMessageSchema = BaseClientMessageSchema.extend({
   type: z.literal('OpenChatClientMessage'),
   chat_id: z.string(),
+  from_seq: z.number().optional(),
 });
 
 export type OpenChatClientMessage = z.infer<typeof OpenChatClientMessageSchema>;
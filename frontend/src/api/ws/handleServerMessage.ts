@@ -93,14 +93,40 @@ export async function handleServerMessage(message: ServerMessage) {
         throw new Error('Chat is not initialized');
       }
       applyMutation(chat, message.mutation);
+      if (message.seq != null) {
+        chat.mutation_seq = message.seq;
+      }
       useChatStore.setState({ chat });
       break;
     }
+    case 'ChatMutationAcknowledgedServerMessage': {
+      // Our own mutation, already applied locally. Mutations of others may have overtaken it.
+      const chat = useChatStore.getState().chat;
+      if (chat && chat.id === message.chat_id && message.seq > chat.mutation_seq) {
+        useChatStore.setState({ chat: { ...chat, mutation_seq: message.seq } });
+      }
+      break;
+    }
     case 'ChatOpenedServerMessage':
       useChatStore.setState({
         chat: message.chat,
       });
       break;
+    case 'ChatCaughtUpServerMessage': {
+      const chat = deepCopyChat(useChatStore.getState().chat);
+      if (!chat || chat.id !== message.chat_id) {
+        break;
+      }
+      for (const { seq, mutation } of message.mutations) {
+        if (seq > chat.mutation_seq) {
+          applyMutation(chat, mutation);
+        }
+      }
+      chat.lock_id = message.lock_id;
+      chat.mutation_seq = message.mutation_seq;
+      useChatStore.setState({ chat });
+      break;
+    }
     default:
       console.error('Unknown message type: ', message);
   }
@@ -95,10 +95,20 @@ export const NotifyAboutChatMutationServerMessageSchema = BaseServerMessageSchem
   request_id: z.string(),
   chat_id: z.string(),
   mutation: ChatMutationSchema, // Assuming ChatMutationSchema is defined
+  seq: z.number().nullable().optional(),
 });
 
 export type NotifyAboutChatMutationServerMessage = z.infer<typeof NotifyAboutChatMutationServerMessageSchema>;
 
+export const ChatMutationAcknowledgedServerMessageSchema = BaseServerMessageSchema.extend({
+  type: z.literal('ChatMutationAcknowledgedServerMessage'),
+  request_id: z.string(),
+  chat_id: z.string(),
+  seq: z.number(),
+});
+
+export type ChatMutationAcknowledgedServerMessage = z.infer<typeof ChatMutationAcknowledgedServerMessageSchema>;
+
 export const ChatOpenedServerMessageSchema = BaseServerMessageSchema.extend({
   type: z.literal('ChatOpenedServerMessage'),
   chat: ChatSchema,
@@ -106,6 +116,22 @@ export const ChatOpenedServerMessageSchema = BaseServerMessageSchema.extend({
 
 export type ChatOpenedServerMessage = z.infer<typeof ChatOpenedServerMessageSchema>;
 
+export const SequencedChatMutationSchema = z.object({
+  seq: z.number(),
+  request_id: z.string(),
+  mutation: ChatMutationSchema,
+});
+
+export const ChatCaughtUpServerMessageSchema = BaseServerMessageSchema.extend({
+  type: z.literal('ChatCaughtUpServerMessage'),
+  chat_id: z.string(),
+  lock_id: z.string().nullable().optional(),
+  mutation_seq: z.number(),
+  mutations: z.array(SequencedChatMutationSchema),
+});
+
+export type ChatCaughtUpServerMessage = z.infer<typeof ChatCaughtUpServerMessageSchema>;
+
 export const ServerMessageSchema = z.union([
   NotificationServerMessageSchema,
   DebugJSONServerMessageSchema,
@@ -117,7 +143,9 @@ export const ServerMessageSchema = z.union([
   AssetsUpdatedServerMessageSchema,
   SettingsServerMessageSchema,
   NotifyAboutChatMutationServerMessageSchema,
+  ChatMutationAcknowledgedServerMessageSchema,
   ChatOpenedServerMessageSchema,
+  ChatCaughtUpServerMessageSchema,
 ]);
 
 export type ServerMessage = z.infer<typeof ServerMessageSchema>;
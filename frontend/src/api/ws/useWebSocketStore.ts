@@ -18,6 +18,7 @@ import ReconnectingWebSocket from 'reconnecting-websocket';
 import { ErrorEvent } from 'reconnecting-websocket/events';
 import { create } from 'zustand';
 import { useAPIStore } from '../../store/useAPIStore';
+import { useChatStore } from '../../store/editables/chat/useChatStore';
 import { ClientMessage } from './clientMessages';
 import { handleServerMessage } from './handleServerMessage';
 import { ServerMessage } from './serverMessages';
@@ -49,10 +50,19 @@ export const useWebSocketStore = create<WebSockeStore>((set, get) => ({
     const getBaseHostWithPort = useAPIStore.getState().getBaseHostWithPort;
     const ws = new ReconnectingWebSocket(`ws://${getBaseHostWithPort()}/ws`);
 
+    let wasConnected = false;
+
     ws.onopen = () => {
       set({ ws });
 
       console.log('WebSocket connection established');
+
+      // After a reconnect only ask for the mutations of the open chat that were missed in the meantime
+      const chat = useChatStore.getState().chat;
+      if (wasConnected && chat) {
+        get().sendMessage({ type: 'OpenChatClientMessage', chat_id: chat.id, from_seq: chat.mutation_seq });
+      }
+      wasConnected = true;
     };
 
     ws.onmessage = async (e: MessageEvent) => {
@@ -1,6 +1,15 @@
 import { z } from 'zod';
 import { EditableObjectSchema, GPTRoleSchema } from './assetTypes'; // Import necessary types and schemas
 
+export const ExecutionStatusSchema = z.object({
+  state: z.enum(['completed', 'timed_out', 'cpu_limit_exceeded', 'interrupted']),
+  duration_s: z.number(),
+  cpu_s: z.number().nullable().optional(),
+  killed: z.boolean(),
+});
+
+export type ExecutionStatus = z.infer<typeof ExecutionStatusSchema>;
+
 export const AICToolCallSchema = z.object({
   id: z.string(),
   language: z.string().optional(),
@@ -9,6 +18,7 @@ export const AICToolCallSchema = z.object({
   code: z.string(),
   headline: z.string(),
   output: z.string().optional(),
+  execution_status: ExecutionStatusSchema.nullable().optional(),
 });
 
 export type AICToolCall = z.infer<typeof AICToolCallSchema>;
@@ -44,11 +54,12 @@ export const ChatHeadlineSchema = EditableObjectSchema.extend({
 export type ChatHeadline = z.infer<typeof ChatHeadlineSchema>;
 
 export const ChatSchema = EditableObjectSchema.extend({
-  lock_id: z.string().optional(),
+  lock_id: z.string().nullable().optional(),
   title_edited: z.boolean(),
   last_modified: z.string(),
   message_groups: z.array(AICMessageGroupSchema),
   is_analysis_in_progress: z.boolean(),
+  mutation_seq: z.number(),
 });
 
 export type Chat = z.infer<typeof ChatSchema>;
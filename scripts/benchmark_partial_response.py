@@ -0,0 +1,64 @@
+# The AIConsole Project
+#
+# Copyright 2023 10Clouds
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Chunks per second GPTPartialResponse applies for short and long content and tool call streams, the rate should not
+drop with the length of the response. Run from the backend directory: python ../scripts/benchmark_partial_response.py
+
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from litellm import ModelResponse  # noqa: E402
+
+from aiconsole.core.gpt.partial import GPTPartialResponse  # noqa: E402
+from aiconsole.core.gpt.tests.test_partial_response import (  # noqa: E402
+    _content_chunks,
+    _tool_call_chunks,
+)
+
+
+def _chunks_per_second(chunks: list[ModelResponse]) -> float:
+    response = GPTPartialResponse()
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        response.apply_chunk(chunk)
+
+        # Consumers read the accumulated state after every chunk
+        message = response.choices[0].message
+        message.content
+        for tool_call in message.tool_calls:
+            tool_call.function.pop_arguments_deltas()
+
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def main():
+    for name, make_chunks in [("content", _content_chunks), ("tool calls", _tool_call_chunks)]:
+        short_rate = _chunks_per_second(make_chunks(1_000))
+        long_rate = _chunks_per_second(make_chunks(10_000))
+
+        print(f"{name}: {short_rate:.0f} chunks/s short, {long_rate:.0f} chunks/s long")
+
+
+if __name__ == "__main__":
+    main()